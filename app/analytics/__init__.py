@@ -1,5 +1,33 @@
 """Analytics modules for advanced risk intelligence."""
 
-from app.analytics.risk_propagation import RiskPropagationEngine, PropagationResult
+from app.analytics.csr import CSRGraph
+from app.analytics.incremental import IncrementalRiskPropagator, IncrementalUpdate
+from app.analytics.overlay import OverlayGraph
+from app.analytics.path_between import PathBetweenResult, find_paths_between
+from app.analytics.risk_propagation import (
+    BatchPropagationResult,
+    PointPropagationResult,
+    PropagationResult,
+    RiskPropagationEngine,
+)
+from app.analytics.shared_csr import SharedCSRGraph
+from app.analytics.snapshot import PropagationSnapshot, PropagationSnapshotStore
+from app.analytics.tracing import TraceStats, iter_trace_paths
 
-__all__ = ["RiskPropagationEngine", "PropagationResult"]
+__all__ = [
+    "BatchPropagationResult",
+    "CSRGraph",
+    "IncrementalRiskPropagator",
+    "IncrementalUpdate",
+    "OverlayGraph",
+    "PathBetweenResult",
+    "PointPropagationResult",
+    "RiskPropagationEngine",
+    "PropagationResult",
+    "PropagationSnapshot",
+    "PropagationSnapshotStore",
+    "SharedCSRGraph",
+    "TraceStats",
+    "find_paths_between",
+    "iter_trace_paths",
+]
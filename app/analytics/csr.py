@@ -0,0 +1,81 @@
+"""Compressed sparse row (CSR) graph layout for vectorized risk propagation."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List
+
+import networkx as nx
+import numpy as np
+
+DEFAULT_RISK_TRANSFER = 0.8
+
+
+@dataclass(frozen=True, eq=False)
+class CSRGraph:
+    """Immutable interned-ID adjacency compiled from a directed graph.
+
+    Node ``i`` owns the out-edges ``targets[offsets[i]:offsets[i + 1]]`` with the
+    matching ``weights`` (the edge ``risk_transfer``). Out-edge order follows the
+    source graph so traversal order, and therefore tie-breaking, is preserved.
+    """
+
+    node_ids: List[str]
+    index: Dict[str, int]
+    offsets: np.ndarray
+    targets: np.ndarray
+    weights: np.ndarray
+
+    @classmethod
+    def from_networkx(
+        cls,
+        graph: nx.DiGraph,
+        default_transfer: float = DEFAULT_RISK_TRANSFER,
+    ) -> "CSRGraph":
+        node_ids = list(graph.nodes)
+        index = {node: idx for idx, node in enumerate(node_ids)}
+
+        offsets = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        targets: List[int] = []
+        weights: List[float] = []
+        for idx, node in enumerate(node_ids):
+            for nxt, edge in graph.adj[node].items():
+                targets.append(index[nxt])
+                weights.append(float(edge.get("risk_transfer", default_transfer)))
+            offsets[idx + 1] = len(targets)
+
+        return cls(
+            node_ids=node_ids,
+            index=index,
+            offsets=offsets,
+            targets=np.asarray(targets, dtype=np.int64),
+            weights=np.asarray(weights, dtype=np.float64),
+        )
+
+    def __contains__(self, node_id: object) -> bool:
+        return node_id in self.index
+
+    def number_of_nodes(self) -> int:
+        return len(self.node_ids)
+
+    def number_of_edges(self) -> int:
+        return int(self.targets.shape[0])
+
+    def expand(self, frontier: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Return ``(edge_positions, owner_positions)`` for all out-edges of ``frontier``.
+
+        ``owner_positions[k]`` is the index into ``frontier`` of the node owning edge
+        ``edge_positions[k]``; edges are emitted in frontier order.
+        """
+
+        starts = self.offsets[frontier]
+        counts = self.offsets[frontier + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+
+        owners = np.repeat(np.arange(frontier.shape[0], dtype=np.int64), counts)
+        run_starts = np.cumsum(counts) - counts
+        edges = np.arange(total, dtype=np.int64) - run_starts[owners] + starts[owners]
+        return edges, owners
@@ -0,0 +1,279 @@
+"""Incremental risk propagation that keeps scores live as edges arrive."""
+
+from __future__ import annotations
+
+import heapq
+from collections.abc import MutableMapping
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
+
+import networkx as nx
+
+from app.analytics.csr import DEFAULT_RISK_TRANSFER
+from app.analytics.overlay import OverlayGraph
+from app.analytics.risk_propagation import PropagationResult
+
+# (depth, signal, source seed)
+Label = Tuple[int, float, str]
+
+
+@dataclass(frozen=True)
+class IncrementalUpdate:
+    """Outcome of applying one graph mutation to the propagation state."""
+
+    touched: int
+    changed: FrozenSet[str]
+
+
+class _CopyOnWriteDict(MutableMapping):
+    """Mapping that reads through to a parent and keeps writes and deletes local."""
+
+    __slots__ = ("_parent", "_local", "_deleted")
+
+    def __init__(self, parent: MutableMapping):
+        self._parent = parent
+        self._local: Dict[str, Any] = {}
+        self._deleted: Set[str] = set()
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._local:
+            return self._local[key]
+        if key in self._deleted:
+            raise KeyError(key)
+        return self._parent[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._local[key] = value
+        self._deleted.discard(key)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self._local.pop(key, None)
+        self._deleted.add(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._local
+        for key in self._parent:
+            if key not in self._local and key not in self._deleted:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+@dataclass
+class _RelaxationPass:
+    """Work queue and bookkeeping for one batch of relaxations."""
+
+    heap: List[tuple[float, int, int, str, str]] = field(default_factory=list)
+    dirty: Set[str] = field(default_factory=set)
+    offered: Set[str] = field(default_factory=set)
+    sequence: int = 0
+
+    def push(self, node: str, depth: int, signal: float, origin: str) -> None:
+        heapq.heappush(self.heap, (-signal, depth, self.sequence, node, origin))
+        self.sequence += 1
+
+
+class IncrementalRiskPropagator:
+    """Maintain hop-bounded max-product propagation state under edge updates.
+
+    Every node keeps its Pareto set of ``(depth, signal, source)`` labels: a label
+    is kept only if no other label reaches the node in fewer or equal hops with an
+    equal or stronger signal. That is exactly the state needed to extend walks
+    when a new edge appears, so inserting or strengthening an edge only relaxes
+    the region downstream of it. Weakening an edge recomputes the nodes within
+    ``max_hops`` downstream of it. Scores match :meth:`RiskPropagationEngine.run`
+    on the current graph; when two sources tie at the engine's 4-decimal rounding
+    the dominant source is the one with the stronger unrounded signal.
+    """
+
+    def __init__(
+        self,
+        graph: nx.DiGraph,
+        seed_scores: Dict[str, float],
+        max_hops: int = 4,
+        decay: float = 0.7,
+        min_signal: float = 0.01,
+    ):
+        self.graph = graph
+        self.seed_scores = dict(seed_scores)
+        self.max_hops = max_hops
+        self.decay = decay
+        self.min_signal = min_signal
+
+        self.scores: MutableMapping[str, float] = {}
+        self.dominant_source: MutableMapping[str, str] = {}
+        self._labels: MutableMapping[str, List[Label]] = {}
+        self.rebuild()
+
+    def rebuild(self) -> IncrementalUpdate:
+        """Recompute the full state from the seeds."""
+
+        self.scores = {node: 0.0 for node in self.graph.nodes}
+        self.dominant_source = {}
+        self._labels = {}
+        return self._recompute(set(self.graph.nodes))
+
+    def add_edge(self, source_id: str, target_id: str, **attrs) -> IncrementalUpdate:
+        """Insert or update an edge and relax only the affected downstream region."""
+
+        previous = self.graph.get_edge_data(source_id, target_id)
+        previous_transfer = self._transfer(previous) if previous is not None else None
+        self.graph.add_edge(source_id, target_id, **attrs)
+        for node in (source_id, target_id):
+            self.scores.setdefault(node, 0.0)
+
+        transfer = self._transfer(self.graph[source_id][target_id])
+        if previous_transfer is not None and transfer < previous_transfer:
+            return self._recompute(self._downstream_region(target_id))
+
+        relaxation = _RelaxationPass()
+        self._extend(relaxation, source_id, target_id, transfer)
+        return self._finish(relaxation)
+
+    def fork(self) -> "IncrementalRiskPropagator":
+        """Copy-on-write child for what-if updates.
+
+        The child reads this propagator's graph and labels through overlays and
+        writes only the entries its own updates change, so applying a
+        hypothetical edge costs the size of its downstream delta, not the graph.
+        """
+
+        child = object.__new__(type(self))
+        child.__dict__.update(self.__dict__)
+        child.graph = OverlayGraph(self.graph)
+        child.scores = _CopyOnWriteDict(self.scores)
+        child.dominant_source = _CopyOnWriteDict(self.dominant_source)
+        child._labels = _CopyOnWriteDict(self._labels)
+        return child
+
+    def score(self, node_id: str, default: float = 0.0) -> float:
+        return self.scores.get(node_id, default)
+
+    def result(self) -> PropagationResult:
+        return PropagationResult(
+            scores=dict(self.scores),
+            dominant_source=dict(self.dominant_source),
+        )
+
+    def _recompute(self, region: Set[str]) -> IncrementalUpdate:
+        """Drop and rebuild the labels of ``region`` from seeds and outside inputs."""
+
+        for node in region:
+            self._labels[node] = []
+
+        relaxation = _RelaxationPass(dirty=set(region), offered=set(region))
+        for seed, score in self.seed_scores.items():
+            if seed in region and seed in self.graph:
+                self._insert(seed, 0, score, seed)
+                relaxation.push(seed, 0, score, seed)
+
+        for node in region:
+            for pred in self.graph.predecessors(node):
+                if pred not in region:
+                    self._extend(relaxation, pred, node, self._transfer(self.graph[pred][node]))
+        return self._finish(relaxation)
+
+    def _finish(self, relaxation: _RelaxationPass) -> IncrementalUpdate:
+        self._relax(relaxation)
+        changed = self._refresh(relaxation.dirty)
+        return IncrementalUpdate(touched=len(relaxation.offered), changed=changed)
+
+    def _downstream_region(self, start: str) -> Set[str]:
+        """Nodes whose labels may depend on an edge ending at ``start``."""
+
+        region = {start}
+        frontier = [start]
+        for _ in range(self.max_hops - 1):
+            nxt_frontier = []
+            for node in frontier:
+                for nxt in self.graph.successors(node):
+                    if nxt not in region:
+                        region.add(nxt)
+                        nxt_frontier.append(nxt)
+            frontier = nxt_frontier
+        return region
+
+    def _relax(self, relaxation: _RelaxationPass) -> None:
+        """Expand newly inserted labels strongest-first until nothing improves."""
+
+        while relaxation.heap:
+            negative_signal, depth, _, node, origin = heapq.heappop(relaxation.heap)
+            signal = -negative_signal
+            if depth >= self.max_hops or (depth, signal, origin) not in self._labels.get(node, ()):
+                continue
+            for nxt in self.graph.successors(node):
+                transfer = self._transfer(self.graph[node][nxt])
+                self._offer(relaxation, nxt, depth + 1, signal * transfer * self.decay, origin)
+
+    def _extend(
+        self,
+        relaxation: _RelaxationPass,
+        source_id: str,
+        target_id: str,
+        transfer: float,
+    ) -> None:
+        """Offer every label of ``source_id`` across the edge to ``target_id``."""
+
+        for depth, signal, origin in list(self._labels.get(source_id, [])):
+            if depth < self.max_hops:
+                propagated = signal * transfer * self.decay
+                self._offer(relaxation, target_id, depth + 1, propagated, origin)
+
+    def _offer(
+        self,
+        relaxation: _RelaxationPass,
+        node: str,
+        depth: int,
+        signal: float,
+        origin: str,
+    ) -> None:
+        relaxation.offered.add(node)
+        if signal < self.min_signal or signal <= 0.0:
+            return
+        if self._insert(node, depth, signal, origin):
+            relaxation.dirty.add(node)
+            relaxation.push(node, depth, signal, origin)
+
+    def _insert(self, node: str, depth: int, signal: float, origin: str) -> bool:
+        labels = self._labels.get(node, [])
+        for label_depth, label_signal, _ in labels:
+            if label_depth <= depth and label_signal >= signal:
+                return False
+        # Replace rather than mutate so forks never write through to a parent's list.
+        kept = [label for label in labels if not (label[0] >= depth and label[1] <= signal)]
+        kept.append((depth, signal, origin))
+        kept.sort(key=lambda label: label[0])
+        self._labels[node] = kept
+        return True
+
+    def _refresh(self, nodes: Set[str]) -> FrozenSet[str]:
+        """Recompute public score/source for ``nodes``; return those that changed."""
+
+        changed = set()
+        for node in nodes:
+            before = (self.scores.get(node, 0.0), self.dominant_source.get(node))
+            best = self._best_label(node)
+            if best is None:
+                self.scores[node] = 0.0
+                self.dominant_source.pop(node, None)
+            else:
+                depth, signal, origin = best
+                is_own_seed = depth == 0 and origin == node
+                self.scores[node] = max(0.0, signal) if is_own_seed else round(signal, 4)
+                self.dominant_source[node] = origin
+            if (self.scores[node], self.dominant_source.get(node)) != before:
+                changed.add(node)
+        return frozenset(changed)
+
+    def _best_label(self, node: str) -> Optional[Label]:
+        labels = self._labels.get(node)
+        if not labels:
+            return None
+        return max(labels, key=lambda label: (label[1], -label[0]))
+
+    @staticmethod
+    def _transfer(edge: Optional[dict]) -> float:
+        return float((edge or {}).get("risk_transfer", DEFAULT_RISK_TRANSFER))
@@ -0,0 +1,141 @@
+"""Copy-on-write overlay graph for what-if simulations."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator
+
+import networkx as nx
+
+
+class _MergedView(Mapping):
+    """Read-only merge of a base mapping and overlay entries (overlay wins)."""
+
+    __slots__ = ("_base", "_overlay")
+
+    def __init__(self, base: Mapping, overlay: Mapping):
+        self._base = base
+        self._overlay = overlay
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        if key in self._overlay:
+            return self._overlay[key]
+        return self._base[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._base
+        for key in self._overlay:
+            if key not in self._base:
+                yield key
+
+    def __len__(self) -> int:
+        return len(self._base) + sum(1 for key in self._overlay if key not in self._base)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._overlay or key in self._base
+
+
+class OverlayGraph:
+    """Hypothetical nodes and edges layered over an unmodified base ``DiGraph``.
+
+    Implements the subset of the networkx API used by the propagation engine
+    (``nodes``, ``in``, ``successors``, ``predecessors``, ``graph[u][v]`` and
+    ``adj``). Writes never touch the base graph; memory is proportional to the
+    size of the what-if change.
+    """
+
+    def __init__(self, base: nx.DiGraph):
+        self.base = base
+        self._nodes: Dict[str, Dict[str, Any]] = {}
+        self._succ: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._pred: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    def add_node(self, node_id: str, **attrs: Any) -> None:
+        if node_id in self._nodes:
+            self._nodes[node_id].update(attrs)
+        elif node_id in self.base:
+            self._nodes[node_id] = {**self.base.nodes[node_id], **attrs}
+        else:
+            self._nodes[node_id] = dict(attrs)
+
+    def add_edge(self, source_id: str, target_id: str, **attrs: Any) -> None:
+        for node in (source_id, target_id):
+            if node not in self:
+                self.add_node(node)
+
+        edge = self._succ.get(source_id, {}).get(target_id)
+        if edge is None:
+            base_edge = self.base.adj[source_id].get(target_id) if source_id in self.base else None
+            edge = dict(base_edge) if base_edge is not None else {}
+            self._succ.setdefault(source_id, {})[target_id] = edge
+            self._pred.setdefault(target_id, {})[source_id] = edge
+        edge.update(attrs)
+
+    @property
+    def nodes(self) -> _MergedView:
+        return _MergedView(self.base.nodes, self._nodes)
+
+    @property
+    def adj(self) -> Mapping:
+        return _NodeAdjacency(self)
+
+    def __contains__(self, node_id: object) -> bool:
+        return node_id in self._nodes or node_id in self.base
+
+    def __getitem__(self, node_id: str) -> _MergedView:
+        base = self.base.adj[node_id] if node_id in self.base else {}
+        return _MergedView(base, self._succ.get(node_id, {}))
+
+    def successors(self, node_id: str) -> Iterator[str]:
+        if node_id not in self:
+            raise nx.NetworkXError(f"The node {node_id} is not in the digraph.")
+        return iter(self[node_id])
+
+    def predecessors(self, node_id: str) -> Iterator[str]:
+        if node_id not in self:
+            raise nx.NetworkXError(f"The node {node_id} is not in the digraph.")
+        base = self.base.pred[node_id] if node_id in self.base else {}
+        return iter(_MergedView(base, self._pred.get(node_id, {})))
+
+    def get_edge_data(self, source_id: str, target_id: str, default: Any = None) -> Any:
+        if source_id not in self or target_id not in self[source_id]:
+            return default
+        return self[source_id][target_id]
+
+    def number_of_nodes(self) -> int:
+        return len(self.nodes)
+
+    def number_of_edges(self) -> int:
+        added = sum(
+            1
+            for source_id, targets in self._succ.items()
+            for target_id in targets
+            if not self.base.has_edge(source_id, target_id)
+        )
+        return self.base.number_of_edges() + added
+
+    def overlay_size(self) -> Dict[str, int]:
+        """Number of nodes and edges held by the overlay itself."""
+
+        edges = sum(len(targets) for targets in self._succ.values())
+        return {"nodes": len(self._nodes), "edges": edges}
+
+
+class _NodeAdjacency(Mapping):
+    """``graph.adj`` equivalent for :class:`OverlayGraph`."""
+
+    __slots__ = ("_graph",)
+
+    def __init__(self, graph: OverlayGraph):
+        self._graph = graph
+
+    def __getitem__(self, node_id: str) -> _MergedView:
+        if node_id not in self._graph:
+            raise KeyError(node_id)
+        return self._graph[node_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._graph.nodes)
+
+    def __len__(self) -> int:
+        return len(self._graph.nodes)
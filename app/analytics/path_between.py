@@ -0,0 +1,210 @@
+"""Bidirectional bounded path search between two entities."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.analytics.csr import DEFAULT_RISK_TRANSFER
+from app.backends import GraphBackend
+
+# node -> (best transfer product, neighbour it was reached through)
+_Layer = Dict[str, Tuple[float, Optional[str]]]
+
+
+@dataclass(frozen=True)
+class PathBetweenResult:
+    """Shortest and highest-risk connections from ``source_id`` to ``target_id``."""
+
+    source_id: str
+    target_id: str
+    max_hops: int
+    shortest_path: Optional[List[str]]
+    highest_risk_path: Optional[List[str]]
+    highest_risk_product: float
+    states_explored: int
+
+    @property
+    def connected(self) -> bool:
+        return self.shortest_path is not None
+
+
+def find_paths_between(
+    backend: GraphBackend,
+    source_id: str,
+    target_id: str,
+    max_hops: int,
+) -> PathBetweenResult:
+    """Search forward from the source and backward from the target until they meet.
+
+    The shortest path comes from a level-synchronous bidirectional BFS that always
+    expands the smaller frontier. The highest-risk path maximises the product of
+    edge ``risk_transfer`` values: hop-bounded best products are computed forward
+    for ``ceil(max_hops / 2)`` hops and backward for the rest, then joined at the
+    best meeting node. Transfers are at most 1, so cycles never improve a product
+    and any loop in the joined walk is cut out.
+    """
+
+    shortest, explored = _shortest_path(backend, source_id, target_id, max_hops)
+    if shortest is None:
+        return PathBetweenResult(source_id, target_id, max_hops, None, None, 0.0, explored)
+
+    forward_hops = (max_hops + 1) // 2
+    forward = _best_products(
+        source_id, forward_hops, backend.successors, lambda u, v: _transfer(backend, u, v)
+    )
+    backward = _best_products(
+        target_id,
+        max_hops - forward_hops,
+        backend.predecessors,
+        lambda u, v: _transfer(backend, v, u),
+    )
+    explored += sum(len(layer) for layer in forward) + sum(len(layer) for layer in backward)
+
+    best_product, meeting = 0.0, None
+    forward_best = _flatten(forward)
+    backward_best = _flatten(backward)
+    for node, product in forward_best.items():
+        joined = product * backward_best.get(node, 0.0)
+        if joined > best_product:
+            best_product, meeting = joined, node
+
+    if meeting is None:
+        return PathBetweenResult(source_id, target_id, max_hops, shortest, shortest, 0.0, explored)
+
+    walk = _unwind(forward, meeting)[::-1] + _unwind(backward, meeting)[1:]
+    risky = _erase_loops(walk)
+    product = 1.0
+    for source, target in zip(risky, risky[1:]):
+        product *= _transfer(backend, source, target)
+    return PathBetweenResult(
+        source_id, target_id, max_hops, shortest, risky, round(product, 6), explored
+    )
+
+
+def _shortest_path(
+    backend: GraphBackend,
+    source_id: str,
+    target_id: str,
+    max_hops: int,
+) -> Tuple[Optional[List[str]], int]:
+    if source_id == target_id:
+        return [source_id], 1
+
+    forward: Dict[str, Optional[str]] = {source_id: None}
+    backward: Dict[str, Optional[str]] = {target_id: None}
+    forward_depth = {source_id: 0}
+    backward_depth = {target_id: 0}
+    forward_frontier, backward_frontier = [source_id], [target_id]
+    hops = 0
+
+    while forward_frontier and backward_frontier and hops < max_hops:
+        hops += 1
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier = _expand(forward_frontier, backend.successors, forward, forward_depth)
+            fresh, other_depth, fresh_depth = forward_frontier, backward_depth, forward_depth
+        else:
+            backward_frontier = _expand(
+                backward_frontier, backend.predecessors, backward, backward_depth
+            )
+            fresh, other_depth, fresh_depth = backward_frontier, forward_depth, backward_depth
+
+        meets = [node for node in fresh if node in other_depth]
+        if meets:
+            meeting = min(meets, key=lambda node: fresh_depth[node] + other_depth[node])
+            path = _unwind_parents(forward, meeting)[::-1] + _unwind_parents(backward, meeting)[1:]
+            return path, len(forward) + len(backward)
+
+    return None, len(forward) + len(backward)
+
+
+def _expand(
+    frontier: List[str],
+    neighbours: Callable[[str], Iterable[str]],
+    parents: Dict[str, Optional[str]],
+    depth: Dict[str, int],
+) -> List[str]:
+    nxt_frontier = []
+    for node in frontier:
+        for nxt in neighbours(node):
+            if nxt not in parents:
+                parents[nxt] = node
+                depth[nxt] = depth[node] + 1
+                nxt_frontier.append(nxt)
+    return nxt_frontier
+
+
+def _best_products(
+    start: str,
+    hops: int,
+    neighbours: Callable[[str], Iterable[str]],
+    transfer: Callable[[str, str], float],
+) -> List[_Layer]:
+    """Hop-bounded Bellman-Ford: ``layers[d]`` holds nodes whose best product improved at hop ``d``."""
+
+    layers: List[_Layer] = [{start: (1.0, None)}]
+    best = {start: 1.0}
+    for _ in range(hops):
+        layer: _Layer = {}
+        for node, (product, _) in layers[-1].items():
+            for nxt in neighbours(node):
+                candidate = product * transfer(node, nxt)
+                if candidate > best.get(nxt, 0.0):
+                    best[nxt] = candidate
+                    layer[nxt] = (candidate, node)
+        if not layer:
+            break
+        layers.append(layer)
+    return layers
+
+
+def _flatten(layers: List[_Layer]) -> Dict[str, float]:
+    best: Dict[str, float] = {}
+    for layer in layers:
+        for node, (product, _) in layer.items():
+            best[node] = product
+    return best
+
+
+def _unwind(layers: List[_Layer], node: str) -> List[str]:
+    """Follow parents from ``node`` back to the layer start, respecting hop order."""
+
+    path = [node]
+    depth = len(layers) - 1
+    while True:
+        while node not in layers[depth]:
+            depth -= 1
+        parent = layers[depth][node][1]
+        if parent is None:
+            return path
+        path.append(parent)
+        node, depth = parent, depth - 1
+
+
+def _unwind_parents(parents: Dict[str, Optional[str]], node: str) -> List[str]:
+    path = [node]
+    parent = parents[node]
+    while parent is not None:
+        path.append(parent)
+        parent = parents[parent]
+    return path
+
+
+def _erase_loops(walk: List[str]) -> List[str]:
+    path: List[str] = []
+    position: Dict[str, int] = {}
+    for node in walk:
+        if node in position:
+            for dropped in path[position[node] + 1 :]:
+                del position[dropped]
+            del path[position[node] + 1 :]
+            continue
+        position[node] = len(path)
+        path.append(node)
+    return path
+
+
+def _transfer(backend: GraphBackend, source_id: str, target_id: str) -> float:
+    return float(
+        backend.edge_view(source_id, target_id).get("risk_transfer", DEFAULT_RISK_TRANSFER)
+    )
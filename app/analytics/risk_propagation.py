@@ -2,10 +2,14 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Dict, Iterable
+import heapq
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Protocol, Sequence, Tuple, Union
 
 import networkx as nx
+import numpy as np
+
+from app.analytics.csr import DEFAULT_RISK_TRANSFER, CSRGraph
 
 
 @dataclass(frozen=True)
@@ -14,26 +18,135 @@ class PropagationResult:
 
     scores: Dict[str, float]
     dominant_source: Dict[str, str]
+    stats: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class PointPropagationResult:
+    """Propagated score of a single node, computed from its reverse-reachable cone."""
+
+    node_id: str
+    score: float
+    dominant_source: Optional[str]
+    cone_size: int
+    stats: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass(frozen=True, eq=False)
+class BatchPropagationResult:
+    """Propagated scores for many seed sets, stored as a node x seed-set matrix.
+
+    ``values[i, j]`` is the unrounded signal reaching node ``i`` under seed set
+    ``j`` and ``sources[i, j]`` indexes ``seed_names[j]`` (``-1`` when unreached).
+    """
+
+    node_ids: List[str]
+    index: Dict[str, int]
+    seed_names: List[List[str]]
+    values: np.ndarray
+    sources: np.ndarray
+    propagated: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.seed_names)
+
+    def score(self, node_id: str, column: int, default: float = 0.0) -> float:
+        idx = self.index.get(node_id)
+        if idx is None:
+            return default
+        value = float(self.values[idx, column])
+        return round(value, 4) if self.propagated[idx, column] else value
+
+    def source(self, node_id: str, column: int) -> Optional[str]:
+        idx = self.index.get(node_id)
+        if idx is None or self.sources[idx, column] < 0:
+            return None
+        return self.seed_names[column][self.sources[idx, column]]
+
+    def result(self, column: int) -> PropagationResult:
+        """Materialize one column as a :class:`PropagationResult`."""
+
+        scores: Dict[str, float] = dict.fromkeys(self.node_ids, 0.0)
+        dominant_source: Dict[str, str] = {}
+        names = self.seed_names[column]
+        reached = np.flatnonzero(self.sources[:, column] >= 0)
+        for idx in reached:
+            node = self.node_ids[idx]
+            value = float(self.values[idx, column])
+            scores[node] = round(value, 4) if self.propagated[idx, column] else value
+            dominant_source[node] = names[self.sources[idx, column]]
+        return PropagationResult(scores=scores, dominant_source=dominant_source)
+
+
+class SelfPropagatingGraph(Protocol):
+    """A graph that runs propagation itself, e.g. ``ShardedGraphBackend`` inside its shards."""
+
+    def propagate(
+        self,
+        seed_scores: Dict[str, float],
+        max_hops: int,
+        decay: float,
+        min_signal: float,
+        default_transfer: float,
+    ) -> Tuple[Dict[str, float], Dict[str, str], Dict[str, int]]: ...
 
 
 class RiskPropagationEngine:
-    """Propagate initial risk across a directed graph using edge weights and decay."""
+    """Propagate initial risk across a directed graph using edge weights and decay.
+
+    ``mode="reference"`` walks the networkx graph entry by entry. ``mode="csr"``
+    compiles the graph into a :class:`CSRGraph` (or reuses a precompiled one) and
+    applies each hop as a vectorized frontier update. ``mode="best_first"`` settles
+    ``(node, depth)`` states strongest-first and skips dominated ones. All modes
+    produce the same scores. They report the same ``dominant_source`` for every
+    node whose strongest signal is unique; when two seeds reach a node with
+    exactly equal signal, each mode credits the one it arrived through first,
+    and that order differs between modes. A graph with its own
+    ``propagate`` method (:class:`SelfPropagatingGraph`, such as the sharded
+    backend) always propagates itself with the CSR hop semantics, whatever ``mode``
+    is set.
+    """
 
-    def __init__(self, decay: float = 0.7, min_signal: float = 0.01):
+    MODES = ("reference", "csr", "best_first")
+
+    def __init__(self, decay: float = 0.7, min_signal: float = 0.01, mode: str = "reference"):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown propagation mode {mode!r}; expected one of {self.MODES}")
         self.decay = decay
         self.min_signal = min_signal
+        self.mode = mode
 
     def run(
         self,
-        graph: nx.DiGraph,
+        graph: Union[nx.DiGraph, CSRGraph, SelfPropagatingGraph],
         seed_scores: Dict[str, float],
         max_hops: int = 4,
     ) -> PropagationResult:
         """Propagate risk from seed nodes up to max_hops.
 
-        Edge attribute `risk_transfer` is used as weight when present.
+        Edge attribute `risk_transfer` is used as weight when present. ``mode`` is
+        ignored for graphs that provide ``propagate``.
         """
 
+        propagate = getattr(graph, "propagate", None)
+        if propagate is not None:
+            scores, dominant_source, stats = propagate(
+                seed_scores, max_hops, self.decay, self.min_signal, DEFAULT_RISK_TRANSFER
+            )
+            return PropagationResult(scores=scores, dominant_source=dominant_source, stats=stats)
+        if self.mode == "csr" or isinstance(graph, CSRGraph):
+            csr = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph)
+            return self._run_csr(csr, seed_scores, max_hops)
+        if self.mode == "best_first":
+            return self._run_best_first(graph, seed_scores, max_hops)
+        return self._run_reference(graph, seed_scores, max_hops)
+
+    def _run_reference(
+        self,
+        graph: nx.DiGraph,
+        seed_scores: Dict[str, float],
+        max_hops: int,
+    ) -> PropagationResult:
         scores: Dict[str, float] = {node: 0.0 for node in graph.nodes}
         dominant_source: Dict[str, str] = {}
 
@@ -46,22 +159,290 @@ class RiskPropagationEngine:
                 scores[seed] = max(scores[seed], score)
                 dominant_source[seed] = seed
 
+        expanded = pruned = 0
         pending = list(frontier)
         while pending:
             node, incoming_risk, source, depth = pending.pop(0)
             if depth >= max_hops:
                 continue
 
+            expanded += 1
             for nxt in graph.successors(node):
                 edge = graph[node][nxt]
                 transfer = float(edge.get("risk_transfer", 0.8))
                 propagated = incoming_risk * transfer * self.decay
                 if propagated < self.min_signal:
+                    pruned += 1
                     continue
 
                 if propagated > scores.get(nxt, 0.0):
                     scores[nxt] = round(propagated, 4)
                     dominant_source[nxt] = source
                     pending.append((nxt, propagated, source, depth + 1))
+                else:
+                    pruned += 1
 
-        return PropagationResult(scores=scores, dominant_source=dominant_source)
+        return PropagationResult(
+            scores=scores,
+            dominant_source=dominant_source,
+            stats={"states_expanded": expanded, "states_pruned": pruned},
+        )
+
+    def _run_best_first(
+        self,
+        graph: nx.DiGraph,
+        seed_scores: Dict[str, float],
+        max_hops: int,
+    ) -> PropagationResult:
+        """Dijkstra-style propagation in max-product space with a hop dimension.
+
+        States ``(node, depth)`` are popped strongest-first, so the first settled
+        state of a node fixes its score. A later state is only useful if it has a
+        strictly smaller depth than every settled state of that node; anything
+        else is dominated on both score and depth and is dropped. Assumes
+        ``risk_transfer * decay <= 1`` so signals never grow along a path. Equal
+        signals pop in push order, so a tied dominant source can differ from the
+        other modes. This saves work where the FIFO walk would raise a node's score
+        several times, such as dense fan-in reached by weak signals first; on
+        sparse graphs both expand about as many states.
+        """
+
+        scores: Dict[str, float] = {node: 0.0 for node in graph.nodes}
+        dominant_source: Dict[str, str] = {}
+        settled_depth: Dict[str, int] = {}
+
+        heap: List[tuple[float, int, int, str, str]] = []
+        sequence = 0
+        for seed, score in seed_scores.items():
+            if seed in scores:
+                scores[seed] = max(scores[seed], score)
+                dominant_source[seed] = seed
+                heapq.heappush(heap, (-score, 0, sequence, seed, seed))
+                sequence += 1
+
+        expanded = pruned = 0
+        while heap:
+            negative_risk, depth, _, node, source = heapq.heappop(heap)
+            if depth >= settled_depth.get(node, max_hops + 1):
+                pruned += 1
+                continue
+
+            if node not in settled_depth and not (depth == 0 and source == node):
+                scores[node] = round(-negative_risk, 4)
+                dominant_source[node] = source
+            settled_depth[node] = depth
+            if depth >= max_hops:
+                continue
+
+            expanded += 1
+            for nxt in graph.successors(node):
+                transfer = float(graph[node][nxt].get("risk_transfer", 0.8))
+                propagated = -negative_risk * transfer * self.decay
+                if (
+                    propagated < self.min_signal
+                    or propagated <= 0.0
+                    or depth + 1 >= settled_depth.get(nxt, max_hops + 1)
+                ):
+                    pruned += 1
+                    continue
+                heapq.heappush(heap, (-propagated, depth + 1, sequence, nxt, source))
+                sequence += 1
+
+        return PropagationResult(
+            scores=scores,
+            dominant_source=dominant_source,
+            stats={"states_expanded": expanded, "states_pruned": pruned},
+        )
+
+    def score_node(
+        self,
+        graph: nx.DiGraph,
+        seed_scores: Dict[str, float],
+        node_id: str,
+        max_hops: int = 4,
+    ) -> PointPropagationResult:
+        """Score one node without propagating over the whole graph.
+
+        Walks predecessors backwards from ``node_id`` for up to ``max_hops`` to find
+        the cone of nodes that can still reach it, then runs best-first propagation
+        restricted to states that can arrive within the remaining hop budget. The
+        first settled state at ``node_id`` is its final score, so the search stops
+        there. Returns the same score as :meth:`run`, and the same dominant source
+        unless the node's strongest signal is tied between seeds.
+        """
+
+        if node_id not in graph:
+            return PointPropagationResult(
+                node_id=node_id, score=0.0, dominant_source=None, cone_size=0
+            )
+
+        distance: Dict[str, int] = {node_id: 0}
+        frontier = [node_id]
+        for hop in range(1, max_hops + 1):
+            reached = []
+            for node in frontier:
+                for pred in graph.predecessors(node):
+                    if pred not in distance:
+                        distance[pred] = hop
+                        reached.append(pred)
+            frontier = reached
+
+        heap: List[tuple[float, int, int, str, str]] = []
+        sequence = 0
+        for seed, score in seed_scores.items():
+            if seed in distance:
+                heapq.heappush(heap, (-score, 0, sequence, seed, seed))
+                sequence += 1
+
+        settled_depth: Dict[str, int] = {}
+        expanded = pruned = 0
+        score, dominant = 0.0, None
+        while heap:
+            negative_risk, depth, _, node, source = heapq.heappop(heap)
+            if depth >= settled_depth.get(node, max_hops + 1):
+                pruned += 1
+                continue
+            if node == node_id:
+                own_seed = depth == 0 and source == node
+                score = max(0.0, -negative_risk) if own_seed else round(-negative_risk, 4)
+                dominant = source
+                break
+
+            settled_depth[node] = depth
+            if depth >= max_hops:
+                continue
+
+            expanded += 1
+            for nxt in graph.successors(node):
+                remaining = distance.get(nxt)
+                if remaining is None or depth + 1 + remaining > max_hops:
+                    continue
+                transfer = float(graph[node][nxt].get("risk_transfer", 0.8))
+                propagated = -negative_risk * transfer * self.decay
+                if (
+                    propagated < self.min_signal
+                    or propagated <= 0.0
+                    or depth + 1 >= settled_depth.get(nxt, max_hops + 1)
+                ):
+                    pruned += 1
+                    continue
+                heapq.heappush(heap, (-propagated, depth + 1, sequence, nxt, source))
+                sequence += 1
+
+        return PointPropagationResult(
+            node_id=node_id,
+            score=score,
+            dominant_source=dominant,
+            cone_size=len(distance),
+            stats={"states_expanded": expanded, "states_pruned": pruned},
+        )
+
+    def run_batch(
+        self,
+        graph: Union[nx.DiGraph, CSRGraph],
+        seed_sets: Sequence[Dict[str, float]],
+        max_hops: int = 4,
+    ) -> "BatchPropagationResult":
+        """Propagate several independent seed sets in a single pass.
+
+        Scores are held as a node x seed-set matrix; column ``i`` equals
+        ``run(graph, seed_sets[i], max_hops)``. Always uses the CSR layout.
+        """
+
+        csr = graph if isinstance(graph, CSRGraph) else CSRGraph.from_networkx(graph)
+        return self._propagate_csr(csr, seed_sets, max_hops)
+
+    def _run_csr(
+        self,
+        csr: CSRGraph,
+        seed_scores: Dict[str, float],
+        max_hops: int,
+    ) -> PropagationResult:
+        return self._propagate_csr(csr, [seed_scores], max_hops).result(0)
+
+    def _propagate_csr(
+        self,
+        csr: CSRGraph,
+        seed_sets: Sequence[Dict[str, float]],
+        max_hops: int,
+    ) -> "BatchPropagationResult":
+        """Hop-synchronous max-product propagation over CSR arrays.
+
+        The frontier is a list of ``(node, column)`` states. Every hop expands the
+        whole frontier at once, keeps the strongest candidate per target and column
+        (earliest in traversal order on ties) and advances only states whose stored
+        score improved. Scores match the reference queue per column; tied dominant
+        sources may not.
+        """
+
+        width = len(seed_sets)
+        shape = (csr.number_of_nodes(), width)
+        values = np.zeros(shape, dtype=np.float64)
+        stored = np.zeros(shape, dtype=np.float64)
+        sources = np.full(shape, -1, dtype=np.int64)
+        propagated = np.zeros(shape, dtype=bool)
+
+        seed_names: List[List[str]] = []
+        frontier_nodes: List[int] = []
+        frontier_columns: List[int] = []
+        frontier_values: List[float] = []
+        frontier_origins: List[int] = []
+        for column, seed_scores in enumerate(seed_sets):
+            names = [seed for seed in seed_scores if seed in csr]
+            seed_names.append(names)
+            for position, seed in enumerate(names):
+                idx = csr.index[seed]
+                values[idx, column] = max(0.0, seed_scores[seed])
+                stored[idx, column] = values[idx, column]
+                sources[idx, column] = position
+                frontier_nodes.append(idx)
+                frontier_columns.append(column)
+                frontier_values.append(float(seed_scores[seed]))
+                frontier_origins.append(position)
+
+        frontier = np.asarray(frontier_nodes, dtype=np.int64)
+        columns = np.asarray(frontier_columns, dtype=np.int64)
+        risk = np.asarray(frontier_values, dtype=np.float64)
+        origins = np.asarray(frontier_origins, dtype=np.int64)
+
+        for _ in range(max_hops):
+            if frontier.size == 0:
+                break
+            edges, owners = csr.expand(frontier)
+            if edges.size == 0:
+                break
+
+            candidates = risk[owners] * csr.weights[edges] * self.decay
+            keep = candidates >= self.min_signal
+            edges, owners, candidates = edges[keep], owners[keep], candidates[keep]
+            targets = csr.targets[edges]
+            keys = targets * width + columns[owners]
+
+            # Stable sort keeps traversal order among equal (key, score) pairs.
+            order = np.lexsort((-candidates, keys))
+            first = np.ones(order.shape[0], dtype=bool)
+            first[1:] = keys[order[1:]] != keys[order[:-1]]
+            winners = np.sort(order[first])
+
+            target_columns = columns[owners[winners]]
+            improved = candidates[winners] > stored[targets[winners], target_columns]
+            winners = winners[improved]
+
+            frontier = targets[winners]
+            columns = target_columns[improved]
+            risk = candidates[winners]
+            origins = origins[owners[winners]]
+
+            stored[frontier, columns] = np.round(risk, 4)
+            values[frontier, columns] = risk
+            sources[frontier, columns] = origins
+            propagated[frontier, columns] = True
+
+        return BatchPropagationResult(
+            node_ids=csr.node_ids,
+            index=csr.index,
+            seed_names=seed_names,
+            values=values,
+            sources=sources,
+            propagated=propagated,
+        )
@@ -0,0 +1,286 @@
+"""CSR risk graphs published in shared memory for multi-process workers.
+
+Layout (little-endian), following the memory-mapped graph snapshot format::
+
+    preamble   8s magic | u32 format version | u32 header length
+    header     JSON: epoch, node/edge counts, section directory
+    sections   64-byte aligned arrays: offsets, targets, weights, id_offsets, id_bytes
+
+The publisher writes the magic last, so a process that sees it can trust the
+sections. Attached graphs view the CSR arrays in place. The node ID list and
+its index are decoded in every process, and each worker still keeps its own
+reference graph for point queries, simulations and writes. What is shared is
+the compiled CSR arrays that snapshot builds read.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import struct
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.analytics.csr import CSRGraph
+from app.analytics.risk_propagation import (
+    BatchPropagationResult,
+    PropagationResult,
+    RiskPropagationEngine,
+)
+
+MAGIC = b"BTCSR\x00\x00\x00"
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct("<8sII")
+_ALIGN = 64
+
+# (seed_names, reached rows, values, sources, propagated) for the reached rows only.
+SparseBatch = Tuple[List[List[str]], np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def _untrack(segment: SharedMemory) -> None:
+    """Stop this process's resource tracker from unlinking a segment it only attached to.
+
+    Opening an existing segment registers it like a created one, so without
+    this the segment disappears when the first attached worker exits.
+    """
+
+    if os.name == "posix":
+        resource_tracker.unregister(segment._name, "shared_memory")  # type: ignore[attr-defined]
+
+
+@dataclass(frozen=True, eq=False)
+class SharedCSRGraph(CSRGraph):
+    """:class:`CSRGraph` whose arrays live in a named shared memory segment.
+
+    One process calls :meth:`publish`; every other process, including
+    propagation pool workers, calls :meth:`attach` with the same name and
+    reads the same physical pages. ``epoch`` is the graph version the arrays
+    were compiled from.
+    """
+
+    epoch: int = 0
+    segment: Optional[SharedMemory] = field(default=None, repr=False)
+    owner: bool = False
+
+    @property
+    def name(self) -> str:
+        if self.segment is None:
+            raise ValueError("Shared graph is closed")
+        return self.segment.name.lstrip("/")
+
+    @classmethod
+    def publish(cls, csr: CSRGraph, name: str, epoch: int = 0) -> "SharedCSRGraph":
+        """Copy ``csr`` into a new segment called ``name``; raises ``FileExistsError`` if taken."""
+
+        encoded_ids = [node_id.encode("utf-8") for node_id in csr.node_ids]
+        id_offsets = np.zeros(len(encoded_ids) + 1, dtype=np.int64)
+        np.cumsum([len(raw) for raw in encoded_ids], out=id_offsets[1:])
+        sections: Dict[str, np.ndarray] = {
+            "offsets": np.ascontiguousarray(csr.offsets, dtype="<i8"),
+            "targets": np.ascontiguousarray(csr.targets, dtype="<i8"),
+            "weights": np.ascontiguousarray(csr.weights, dtype="<f8"),
+            "id_offsets": id_offsets.astype("<i8"),
+            "id_bytes": np.frombuffer(b"".join(encoded_ids), dtype=np.uint8),
+        }
+
+        directory: Dict[str, List[Any]] = {}
+        offset = 0
+        for section, array in sections.items():
+            directory[section] = [array.dtype.str, offset, int(array.shape[0])]
+            offset = _aligned(offset + array.nbytes)
+        header = json.dumps(
+            {
+                "epoch": epoch,
+                "nodes": csr.number_of_nodes(),
+                "edges": csr.number_of_edges(),
+                "sections": directory,
+            },
+            separators=(",", ":"),
+        ).encode("utf-8")
+        data_start = _aligned(_PREAMBLE.size + len(header))
+
+        segment = SharedMemory(name, create=True, size=max(data_start + offset, 1))
+        buffer = segment.buf
+        buffer[_PREAMBLE.size : _PREAMBLE.size + len(header)] = header
+        for section, array in sections.items():
+            start = data_start + directory[section][1]
+            buffer[start : start + array.nbytes] = array.tobytes()
+        # Publish: attachers wait for the magic, so it goes in after everything else.
+        buffer[: _PREAMBLE.size] = _PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header))
+        return cls._from_segment(segment, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, timeout: float = 10.0) -> "SharedCSRGraph":
+        """Map the segment ``name``, waiting up to ``timeout`` seconds for its publisher.
+
+        Raises ``FileNotFoundError`` if no segment with that name exists.
+        """
+
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                segment = SharedMemory(name)
+            except ValueError:
+                # Created but not sized yet: the publisher is still between open and truncate.
+                pass
+            else:
+                _untrack(segment)
+                if bytes(segment.buf[: len(MAGIC)]) == MAGIC:
+                    return cls._from_segment(segment, owner=False)
+                segment.close()
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Shared graph {name!r} was not published within {timeout}s")
+            time.sleep(0.01)
+
+    @classmethod
+    def _from_segment(cls, segment: SharedMemory, owner: bool) -> "SharedCSRGraph":
+        _, version, header_length = _PREAMBLE.unpack_from(segment.buf, 0)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported shared graph format version {version}")
+        header = json.loads(bytes(segment.buf[_PREAMBLE.size : _PREAMBLE.size + header_length]))
+        data_start = _aligned(_PREAMBLE.size + header_length)
+
+        arrays: Dict[str, np.ndarray] = {}
+        for section, (dtype, offset, count) in header["sections"].items():
+            array = np.frombuffer(segment.buf, dtype=dtype, count=count, offset=data_start + offset)
+            array.flags.writeable = False
+            arrays[section] = array
+
+        raw, id_offsets = arrays["id_bytes"].tobytes(), arrays["id_offsets"]
+        node_ids = [
+            raw[id_offsets[idx] : id_offsets[idx + 1]].decode("utf-8")
+            for idx in range(header["nodes"])
+        ]
+        return cls(
+            node_ids=node_ids,
+            index={node: idx for idx, node in enumerate(node_ids)},
+            offsets=arrays["offsets"],
+            targets=arrays["targets"],
+            weights=arrays["weights"],
+            epoch=header["epoch"],
+            segment=segment,
+            owner=owner,
+        )
+
+    def close(self) -> None:
+        """Unmap the segment, and remove its name if this process published it.
+
+        The arrays view the segment in place, so they are swapped for empty ones
+        first and the graph reads as empty afterwards. Other processes keep their
+        own mappings. Closing twice is a no-op.
+        """
+
+        segment = self.segment
+        if segment is None:
+            return
+        # Frozen dataclass: the segment can only be unmapped once nothing views it.
+        for name, value in (
+            ("node_ids", []),
+            ("index", {}),
+            ("offsets", np.zeros(1, dtype=np.int64)),
+            ("targets", np.empty(0, dtype=np.int64)),
+            ("weights", np.empty(0, dtype=np.float64)),
+            ("segment", None),
+        ):
+            object.__setattr__(self, name, value)
+        segment.close()
+        if self.owner:
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                # Already removed, e.g. by a resource tracker at shutdown.
+                pass
+
+
+_attached: Dict[str, SharedCSRGraph] = {}
+
+
+def attach_shared_graph(name: str) -> SharedCSRGraph:
+    """Attach ``name`` once per process; used as the propagation pool initializer.
+
+    The mapping is closed at interpreter exit, before the segment is finalized.
+    """
+
+    graph = _attached.get(name)
+    if graph is None:
+        graph = _attached[name] = SharedCSRGraph.attach(name)
+        atexit.register(graph.close)
+    return graph
+
+
+def propagate_shared(
+    name: str,
+    seed_sets: List[Dict[str, float]],
+    max_hops: int,
+    decay: float,
+    min_signal: float,
+) -> SparseBatch:
+    """Pool task: propagate ``seed_sets`` over the attached graph ``name``.
+
+    Only the reached rows are sent back, so the reply scales with the
+    propagated region rather than with the graph.
+    """
+
+    engine = RiskPropagationEngine(decay=decay, min_signal=min_signal, mode="csr")
+    batch = engine.run_batch(attach_shared_graph(name), seed_sets, max_hops=max_hops)
+    rows = np.flatnonzero((batch.sources >= 0).any(axis=1))
+    return batch.seed_names, rows, batch.values[rows], batch.sources[rows], batch.propagated[rows]
+
+
+def propagate_in_processes(
+    executor: Executor,
+    graph: SharedCSRGraph,
+    engine: RiskPropagationEngine,
+    seed_sets: List[Dict[str, float]],
+    max_hops: int,
+    workers: int,
+) -> List[PropagationResult]:
+    """Split ``seed_sets`` across ``workers`` pool processes attached to ``graph``.
+
+    Results match ``engine.run_batch(graph, seed_sets, max_hops)`` column for column.
+    """
+
+    chunk = -(-len(seed_sets) // max(workers, 1)) or 1
+    futures = [
+        executor.submit(
+            propagate_shared,
+            graph.name,
+            seed_sets[start : start + chunk],
+            max_hops,
+            engine.decay,
+            engine.min_signal,
+        )
+        for start in range(0, len(seed_sets), chunk)
+    ]
+
+    results: List[PropagationResult] = []
+    shape = (graph.number_of_nodes(),)
+    for future in futures:
+        seed_names, rows, values, sources, propagated = future.result()
+        width = len(seed_names)
+        batch = BatchPropagationResult(
+            node_ids=graph.node_ids,
+            index=graph.index,
+            seed_names=seed_names,
+            values=np.zeros(shape + (width,), dtype=np.float64),
+            sources=np.full(shape + (width,), -1, dtype=sources.dtype),
+            propagated=np.zeros(shape + (width,), dtype=bool),
+        )
+        batch.values[rows], batch.sources[rows], batch.propagated[rows] = (
+            values,
+            sources,
+            propagated,
+        )
+        results.extend(batch.result(column) for column in range(width))
+    return results
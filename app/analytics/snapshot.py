@@ -0,0 +1,166 @@
+"""Versioned propagation snapshots shared across risk endpoints."""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.analytics.risk_propagation import PropagationResult
+
+SeedKey = Tuple[Tuple[str, float], ...]
+SnapshotBuilder = Callable[[List[Dict[str, float]], int], Tuple[int, List[PropagationResult]]]
+
+
+def seed_key(seed_scores: Dict[str, float]) -> SeedKey:
+    """Order-independent hashable key for a seed set."""
+
+    return tuple(sorted(seed_scores.items()))
+
+
+@dataclass(frozen=True)
+class PropagationSnapshot:
+    """Immutable propagation result for one ``(graph epoch, seed set, max_hops)``."""
+
+    epoch: int
+    seed_scores: Dict[str, float]
+    max_hops: int
+    result: PropagationResult
+    built_at: float
+    _influence: Dict[float, Dict[str, float]] = field(
+        default_factory=dict, compare=False, repr=False
+    )
+
+    def score(self, node_id: str, default: float = 0.0) -> float:
+        return self.result.scores.get(node_id, default)
+
+    def dominant_source(self, node_id: str, default: str = "unknown") -> str:
+        return self.result.dominant_source.get(node_id, default)
+
+    def influence(self, threshold: float) -> Dict[str, float]:
+        """Nodes scoring at least ``threshold``; computed once per threshold."""
+
+        view = self._influence.get(threshold)
+        if view is None:
+            view = {node: score for node, score in self.result.scores.items() if score >= threshold}
+            self._influence[threshold] = view
+        return view
+
+
+class PropagationSnapshotStore:
+    """Serve propagation snapshots and rebuild them in the background on epoch changes.
+
+    A missing snapshot is built synchronously on first use. Once the graph epoch
+    moves on, readers keep getting the previous snapshot while a rebuild runs on
+    the executor; the finished snapshot replaces the old one in a single dict
+    assignment, so readers never observe a partially built result.
+    """
+
+    def __init__(
+        self,
+        builder: SnapshotBuilder,
+        epoch: Callable[[], int],
+        executor: Executor | None = None,
+    ):
+        self._builder = builder
+        self._epoch = epoch
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="risk-snapshot"
+        )
+        self._snapshots: Dict[Tuple[SeedKey, int], PropagationSnapshot] = {}
+        self._pending: Dict[Tuple[SeedKey, int], Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, seed_scores: Dict[str, float], max_hops: int) -> PropagationSnapshot:
+        return self.get_many([seed_scores], max_hops)[0]
+
+    def peek(self, seed_scores: Dict[str, float], max_hops: int) -> Optional[PropagationSnapshot]:
+        """Return the latest snapshot without blocking; schedule a build if absent or stale."""
+
+        key = (seed_key(seed_scores), max_hops)
+        snapshot = self._snapshots.get(key)
+        if snapshot is None or snapshot.epoch != self._epoch():
+            self._schedule([seed_scores], max_hops)
+        return snapshot
+
+    def get_many(
+        self,
+        seed_sets: Sequence[Dict[str, float]],
+        max_hops: int,
+    ) -> List[PropagationSnapshot]:
+        """Return one snapshot per seed set, building all missing ones in one batch."""
+
+        keys = [(seed_key(seeds), max_hops) for seeds in seed_sets]
+        missing = self._unique(seed_sets, keys, lambda key: key not in self._snapshots)
+        if missing:
+            self._build(missing, max_hops)
+
+        epoch = self._epoch()
+        stale = self._unique(seed_sets, keys, lambda key: self._snapshots[key].epoch != epoch)
+        if stale:
+            self._schedule(stale, max_hops)
+        return [self._snapshots[key] for key in keys]
+
+    def invalidate(self) -> None:
+        """Schedule a rebuild of every known snapshot for the current epoch."""
+
+        by_hops: Dict[int, List[Dict[str, float]]] = {}
+        for snapshot in list(self._snapshots.values()):
+            by_hops.setdefault(snapshot.max_hops, []).append(snapshot.seed_scores)
+        for max_hops, seed_sets in by_hops.items():
+            self._schedule(seed_sets, max_hops)
+
+    def wait(self, timeout: float | None = None) -> None:
+        """Block until scheduled rebuilds finish."""
+
+        with self._lock:
+            pending = list(self._pending.values())
+        wait(pending, timeout=timeout)
+
+    def _schedule(self, seed_sets: List[Dict[str, float]], max_hops: int) -> None:
+        with self._lock:
+            fresh = [
+                seeds for seeds in seed_sets if (seed_key(seeds), max_hops) not in self._pending
+            ]
+            if not fresh:
+                return
+            future = self._executor.submit(self._build, fresh, max_hops)
+            for seeds in fresh:
+                self._pending[(seed_key(seeds), max_hops)] = future
+
+        def _clear(done: Future) -> None:
+            with self._lock:
+                for seeds in fresh:
+                    if self._pending.get((seed_key(seeds), max_hops)) is done:
+                        del self._pending[(seed_key(seeds), max_hops)]
+
+        future.add_done_callback(_clear)
+
+    def _build(self, seed_sets: List[Dict[str, float]], max_hops: int) -> None:
+        epoch, results = self._builder(seed_sets, max_hops)
+        built_at = time.time()
+        for seeds, result in zip(seed_sets, results):
+            key = (seed_key(seeds), max_hops)
+            current = self._snapshots.get(key)
+            if current is None or current.epoch <= epoch:
+                self._snapshots[key] = PropagationSnapshot(
+                    epoch=epoch,
+                    seed_scores=dict(seeds),
+                    max_hops=max_hops,
+                    result=result,
+                    built_at=built_at,
+                )
+
+    @staticmethod
+    def _unique(
+        seed_sets: Sequence[Dict[str, float]],
+        keys: List[Tuple[SeedKey, int]],
+        predicate: Callable[[Tuple[SeedKey, int]], bool],
+    ) -> List[Dict[str, float]]:
+        selected: Dict[Tuple[SeedKey, int], Dict[str, float]] = {}
+        for seeds, key in zip(seed_sets, keys):
+            if key not in selected and predicate(key):
+                selected[key] = seeds
+        return list(selected.values())
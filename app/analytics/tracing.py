@@ -0,0 +1,250 @@
+"""Bounded multi-hop path enumeration for financial flow tracing."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.backends import GraphBackend
+
+
+@dataclass
+class TraceStats:
+    """Counters filled in while a trace generator is consumed."""
+
+    paths: int = 0
+    states: int = 0
+    cycles: int = 0
+    max_depth: int = 0
+    truncated: bool = False
+
+
+class StaleCheckpoint(ValueError):
+    """A checkpoint no longer resumes where it stopped: the graph changed along its path."""
+
+
+@dataclass
+class _Frame:
+    edges: Iterator[Tuple[str, Mapping[str, Any]]]
+    consumed: int = 0
+    extended: bool = False
+    last: Optional[str] = None
+
+
+class TraceWalk:
+    """Resumable depth-first enumeration of maximal money-flow paths.
+
+    Edges below ``min_amount``, or on another ``channel`` when one is given, are
+    never walked; backends with amount and channel indexes skip them without
+    touching their attributes. A path ends when it reaches a node with no
+    qualifying out-edges (``sink``), hits ``max_hops`` (``max_hops``) or steps back
+    onto a node already on the path (``cycle``). Enumeration stops and marks
+    ``stats.truncated`` once ``max_paths`` paths were yielded or ``max_states``
+    edges were walked.
+
+    Between yields the walk can be captured with :meth:`checkpoint` and continued
+    later from that state; each frame resumes at its edge position through
+    ``successors_with_edges(start=...)`` instead of rescanning. A checkpoint
+    holds only the path, the frame positions and the last target each frame
+    walked, which are checked against the graph on resume (``ValueError`` when
+    they do not fit). Writes elsewhere in the graph, or below a frame's position,
+    leave a checkpoint valid; :class:`StaleCheckpoint` is raised when an edge
+    ranked ahead of a frame's position shifted the edge it stopped at. Counters
+    and the ``max_paths``/``max_states`` limits start afresh for every resumed walk.
+    """
+
+    def __init__(
+        self,
+        backend: GraphBackend,
+        source_id: str,
+        max_hops: int,
+        min_amount: float = 0.0,
+        max_paths: int = 1000,
+        max_states: int = 100_000,
+        stats: TraceStats | None = None,
+        checkpoint: Optional[Dict[str, Any]] = None,
+        channel: Optional[str] = None,
+    ):
+        self.backend = backend
+        self.max_hops = max_hops
+        self.min_amount = min_amount
+        self.channel = channel
+        self.max_paths = max_paths
+        self.max_states = max_states
+        self.stats = stats if stats is not None else TraceStats()
+        self._done = False
+
+        if checkpoint is None:
+            self._nodes: List[str] = [source_id]
+            self._frames = [self._frame(source_id)]
+            self._hops: List[Dict[str, Any]] = []
+            return
+
+        self._nodes, consumed, extended, last = self._validated(checkpoint, source_id)
+        self._frames = [self._frame(*frame) for frame in zip(self._nodes, consumed, extended, last)]
+        self._hops = [
+            self._hop(source, target, backend.edge_view(source, target))
+            for source, target in zip(self._nodes, self._nodes[1:])
+        ]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        stats, nodes, hops, frames = self.stats, self._nodes, self._hops, self._frames
+
+        while frames:
+            frame = frames[-1]
+            step = next(frame.edges, None)
+            if step is None:
+                frames.pop()
+                if not frames:
+                    break
+                row = None
+                if not frame.extended:
+                    if stats.paths >= self.max_paths:
+                        break
+                    row = self._path_row(nodes, hops, end="sink")
+                nodes.pop()
+                hops.pop()
+                if row is not None:
+                    yield row
+                continue
+
+            frame.consumed += 1
+            target, edge = step
+            frame.last = target
+            stats.states += 1
+            if stats.states > self.max_states or stats.paths >= self.max_paths:
+                stats.truncated = True
+                break
+            frame.extended = True
+            hop = self._hop(nodes[-1], target, edge)
+
+            if target in nodes:
+                stats.cycles += 1
+                yield self._path_row(nodes + [target], hops + [hop], end="cycle")
+                continue
+
+            if len(hops) + 1 >= self.max_hops:
+                yield self._path_row(nodes + [target], hops + [hop], end="max_hops")
+                continue
+            nodes.append(target)
+            hops.append(hop)
+            frames.append(self._frame(target))
+
+        if frames and stats.paths >= self.max_paths:
+            stats.truncated = True
+        self._done = True
+
+    def checkpoint(self) -> Optional[Dict[str, Any]]:
+        """JSON-serialisable resume state, or ``None`` once the walk has finished."""
+
+        if self._done or not self._frames:
+            return None
+        return {
+            "nodes": list(self._nodes),
+            "consumed": [frame.consumed for frame in self._frames],
+            "extended": [frame.extended for frame in self._frames],
+            "last": [frame.last for frame in self._frames],
+        }
+
+    def _validated(
+        self, checkpoint: Any, source_id: str
+    ) -> Tuple[List[str], List[int], List[bool], List[Optional[str]]]:
+        """Check a checkpoint against the graph; raises ``ValueError`` if it does not fit.
+
+        Path edges are looked up directly and each frame's position is confirmed
+        by reading the one edge it last walked, so no adjacency list is rescanned.
+        """
+
+        if not isinstance(checkpoint, dict):
+            raise ValueError("checkpoint must be an object")
+        nodes, consumed, extended, last = (
+            checkpoint.get("nodes"),
+            checkpoint.get("consumed"),
+            checkpoint.get("extended"),
+            checkpoint.get("last"),
+        )
+        if not (
+            isinstance(nodes, list)
+            and isinstance(consumed, list)
+            and isinstance(extended, list)
+            and isinstance(last, list)
+        ):
+            raise ValueError("checkpoint nodes, consumed, extended and last must be lists")
+        if not 1 <= len(nodes) <= self.max_hops or not (
+            len(nodes) == len(consumed) == len(extended) == len(last)
+        ):
+            raise ValueError("checkpoint frames do not fit max_hops")
+        if nodes[0] != source_id or len(set(nodes)) != len(nodes):
+            raise ValueError("checkpoint path must start at the source and not repeat nodes")
+        for position, node in enumerate(nodes):
+            if not isinstance(node, str) or not self.backend.has_node(node):
+                raise ValueError(f"checkpoint node {node!r} is not in the graph")
+            if position:
+                try:
+                    self.backend.edge_view(nodes[position - 1], node)
+                except KeyError:
+                    raise ValueError("checkpoint path does not follow graph edges") from None
+            offset, target = consumed[position], last[position]
+            if type(offset) is not int or offset < 0 or (offset == 0) != (target is None):
+                raise ValueError(f"checkpoint offset {offset!r} is out of range")
+            if type(extended[position]) is not bool:
+                raise ValueError("checkpoint extended flags must be booleans")
+            if offset:
+                edges = self.backend.successors_with_edges(
+                    node, self.min_amount, offset - 1, self.channel
+                )
+                step = next(iter(edges), None)
+                if step is None:
+                    raise ValueError(f"checkpoint offset {offset!r} is out of range")
+                if step[0] != target:
+                    raise StaleCheckpoint(f"out-edges of {node!r} changed ahead of the cursor")
+        return list(nodes), list(consumed), list(extended), list(last)
+
+    def _frame(
+        self,
+        node_id: str,
+        consumed: int = 0,
+        extended: bool = False,
+        last: Optional[str] = None,
+    ) -> _Frame:
+        edges = self.backend.successors_with_edges(node_id, self.min_amount, consumed, self.channel)
+        return _Frame(iter(edges), consumed, extended, last)
+
+    @staticmethod
+    def _hop(source_id: str, target_id: str, edge: Mapping[str, Any]) -> Dict[str, Any]:
+        return {"from": source_id, "to": target_id, "amount": edge.get("amount", 0), "data": edge}
+
+    def _path_row(self, nodes: List[str], hops: List[Dict[str, Any]], end: str) -> Dict[str, Any]:
+        self.stats.paths += 1
+        self.stats.max_depth = max(self.stats.max_depth, len(hops))
+        amounts = [hop["amount"] for hop in hops]
+        return {
+            "from": nodes[0],
+            "to": nodes[-1],
+            "nodes": list(nodes),
+            "hops": [{**hop, "data": dict(hop["data"])} for hop in hops],
+            "amounts": amounts,
+            "length": len(hops),
+            "cycle": end == "cycle",
+            "end": end,
+        }
+
+
+def iter_trace_paths(
+    backend: GraphBackend,
+    source_id: str,
+    max_hops: int,
+    min_amount: float = 0.0,
+    max_paths: int = 1000,
+    max_states: int = 100_000,
+    stats: TraceStats | None = None,
+    channel: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Yield maximal money-flow paths from ``source_id`` depth-first; see :class:`TraceWalk`."""
+
+    return iter(
+        TraceWalk(
+            backend, source_id, max_hops, min_amount, max_paths, max_states, stats, channel=channel
+        )
+    )
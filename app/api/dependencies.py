@@ -1,14 +1,71 @@
 """API dependencies."""
 
-from app.backends import InMemoryGraphBackend
+from app.backends import (
+    CompactGraphBackend,
+    DurableGraphBackend,
+    GraphBackend,
+    InMemoryGraphBackend,
+    MmapGraphBackend,
+    Neo4jGraphBackend,
+    ShardedGraphBackend,
+    VersionedGraphBackend,
+)
+from app.core.config import settings
 from app.services.ai_service import AIService
+from app.services.ingest_service import IngestService
 from app.services.risk_service import RiskService
 from app.services.trace_service import TraceService
 
-_graph_backend = InMemoryGraphBackend()
+
+def _build_graph_backend() -> GraphBackend:
+    if settings.graph_snapshot_path:
+        return MmapGraphBackend(settings.graph_snapshot_path)
+    if settings.graph_backend == "neo4j":
+        return Neo4jGraphBackend(
+            settings.neo4j_uri,
+            auth=(settings.neo4j_user, settings.neo4j_password or ""),
+            database=settings.neo4j_database,
+            max_pool_size=settings.neo4j_pool_size,
+        )
+    if settings.graph_backend == "sharded":
+        return ShardedGraphBackend(settings.graph_shards)
+    backends = {"compact": CompactGraphBackend, "versioned": VersionedGraphBackend}
+    backend = backends.get(settings.graph_backend, InMemoryGraphBackend)()
+    if settings.graph_wal_dir:
+        return DurableGraphBackend(
+            backend,
+            settings.graph_wal_dir,
+            fsync_interval=settings.graph_wal_fsync_ms / 1000,
+            snapshot_every=settings.graph_wal_snapshot_every,
+        )
+    return backend
+
+
+_graph_backend = _build_graph_backend()
 _trace_service = TraceService(backend=_graph_backend)
 _risk_service = RiskService()
 _ai_service = AIService()
+_ingest_service = IngestService(
+    _trace_service.graph,
+    queue_size=settings.ingest_queue_size,
+    batch_size=settings.ingest_batch_size,
+    flush_interval=settings.ingest_flush_ms / 1000,
+    put_timeout=settings.ingest_put_timeout_ms / 1000,
+    risk_service=_risk_service,
+)
+
+
+def close_graph_backend() -> None:
+    if isinstance(_graph_backend, (DurableGraphBackend, Neo4jGraphBackend, ShardedGraphBackend)):
+        _graph_backend.close()
+
+
+def close_risk_service() -> None:
+    _risk_service.close()
+
+
+async def close_ingest_service() -> None:
+    await _ingest_service.close()
 
 
 def get_trace_service() -> TraceService:
@@ -21,3 +78,7 @@ def get_risk_service() -> RiskService:
 
 def get_ai_service() -> AIService:
     return _ai_service
+
+
+def get_ingest_service() -> IngestService:
+    return _ingest_service
@@ -0,0 +1,18 @@
+"""Transaction ingestion endpoints."""
+
+from fastapi import APIRouter, Depends, Request
+
+from app.api.dependencies import get_ingest_service
+from app.api.streaming import iter_ndjson_lines
+from app.core.config import settings
+from app.services.ingest_service import IngestService
+
+router = APIRouter(prefix="/ingest", tags=["Ingest"])
+
+
+@router.post("/", response_model=dict, status_code=202)
+async def ingest_transactions(
+    http_request: Request, wait: bool = False, service: IngestService = Depends(get_ingest_service)
+):
+    lines = iter_ndjson_lines(http_request, settings.ingest_max_line_bytes)
+    return await service.ingest(lines, wait=wait)
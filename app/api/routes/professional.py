@@ -1,8 +1,11 @@
 """Professional API endpoints for tier-1 workflows."""
 
-from fastapi import APIRouter, Depends
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query, Request
 
 from app.api.dependencies import get_risk_service, get_trace_service
+from app.api.streaming import ndjson_response, wants_ndjson
 from app.schemas.simulate import SimulationRequest
 from app.schemas.trace import TraceRequest
 from app.services.risk_service import RiskService
@@ -14,11 +17,30 @@ router = APIRouter(tags=["Professional API"])
 @router.post("/trace")
 async def trace_alias(
     request: TraceRequest,
+    http_request: Request,
     service: TraceService = Depends(get_trace_service),
 ):
     """Alias endpoint without trailing slash for external integrations."""
 
-    return await service.trace_flow(request.source_id, request.max_hops, request.min_amount)
+    if wants_ndjson(http_request):
+        return ndjson_response(
+            await service.stream_trace(
+                request.source_id,
+                request.max_hops,
+                request.min_amount,
+                request.max_paths,
+                request.channel,
+            )
+        )
+    return await service.trace_flow(
+        request.source_id,
+        request.max_hops,
+        request.min_amount,
+        request.max_paths,
+        request.limit,
+        request.cursor,
+        request.channel,
+    )
 
 
 @router.get("/risk/{entity_id}")
@@ -33,17 +55,25 @@ async def get_risk(
 @router.get("/risk/propagation-map/{entity_id}")
 async def get_propagation_map(
     entity_id: str,
+    http_request: Request,
     service: RiskService = Depends(get_risk_service),
 ):
+    if wants_ndjson(http_request):
+        return ndjson_response(await service.stream_propagation_map(entity_id))
     return await service.propagation_map(entity_id)
 
 
 @router.get("/graph/{entity_id}")
 async def get_graph_entity(
     entity_id: str,
+    http_request: Request,
+    limit: Optional[int] = Query(default=None, ge=1, le=1000),
+    cursor: Optional[str] = None,
     service: TraceService = Depends(get_trace_service),
 ):
-    return await service.graph_snapshot(entity_id)
+    if wants_ndjson(http_request):
+        return ndjson_response(await service.stream_graph(entity_id))
+    return await service.graph_snapshot(entity_id, limit=limit, cursor=cursor)
 
 
 @router.post("/simulate")
@@ -57,3 +87,14 @@ async def simulate_transfer(
         amount=request.amount,
         risk_transfer=request.risk_transfer,
     )
+
+
+@router.post("/simulate/batch")
+async def simulate_transfer_batch(
+    scenarios: List[SimulationRequest],
+    service: RiskService = Depends(get_risk_service),
+):
+    """Stream one NDJSON row per scenario, in completion order, tagged with its index."""
+
+    rows = service.simulate_batch([scenario.model_dump() for scenario in scenarios])
+    return ndjson_response(rows)
@@ -1,18 +1,45 @@
 """Trace endpoints."""
-from fastapi import APIRouter, Depends
-from app.schemas.trace import TraceRequest, TraceResponse
+
+from fastapi import APIRouter, Depends, Request
+from app.api.streaming import ndjson_response, wants_ndjson
+from app.schemas.trace import PathBetweenRequest, TraceRequest, TraceResponse
 from app.services.trace_service import TraceService
 from app.api.dependencies import get_trace_service
 
 router = APIRouter(prefix="/trace", tags=["Trace"])
 
+
 @router.post("/", response_model=dict)
 async def trace_flow(
-    request: TraceRequest,
-    service: TraceService = Depends(get_trace_service)
+    request: TraceRequest, http_request: Request, service: TraceService = Depends(get_trace_service)
 ):
+    if wants_ndjson(http_request):
+        return ndjson_response(
+            await service.stream_trace(
+                request.source_id,
+                request.max_hops,
+                request.min_amount,
+                request.max_paths,
+                request.channel,
+            )
+        )
     return await service.trace_flow(
         request.source_id,
         request.max_hops,
-        request.min_amount
+        request.min_amount,
+        request.max_paths,
+        request.limit,
+        request.cursor,
+        request.channel,
+    )
+
+
+@router.post("/path-between", response_model=dict)
+async def path_between(
+    request: PathBetweenRequest, service: TraceService = Depends(get_trace_service)
+):
+    return await service.path_between(
+        request.source_id,
+        request.target_id,
+        request.max_hops,
     )
@@ -0,0 +1,68 @@
+"""Helpers for streaming API responses."""
+
+from __future__ import annotations
+
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Union
+
+from starlette.concurrency import iterate_in_threadpool
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+
+from app.core.exceptions import PayloadTooLargeError
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+async def _ndjson_lines(rows: AsyncIterable[Any]) -> AsyncIterator[bytes]:
+    async for row in rows:
+        yield (json.dumps(row, default=str) + "\n").encode("utf-8")
+
+
+async def iter_ndjson_lines(request: Request, max_line_bytes: int) -> AsyncIterator[bytes]:
+    """Yield the lines of an NDJSON request body as it arrives.
+
+    The body is read only as fast as lines are consumed, so a slow consumer
+    slows the client down through TCP flow control. A line longer than
+    ``max_line_bytes`` raises :class:`PayloadTooLargeError` (HTTP 413) instead
+    of being buffered.
+    """
+
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            _check_line(line, max_line_bytes)
+            yield line
+        _check_line(pending, max_line_bytes)
+    if pending:
+        yield pending
+
+
+def _check_line(line: bytes, max_line_bytes: int) -> None:
+    if len(line) > max_line_bytes:
+        raise PayloadTooLargeError(
+            "NDJSON line exceeds the maximum length",
+            details={"max_line_bytes": max_line_bytes},
+        )
+
+
+def wants_ndjson(request: Request) -> bool:
+    """True when the client asked for newline-delimited JSON via ``Accept``."""
+
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson_response(rows: Union[Iterable[Any], AsyncIterable[Any]]) -> StreamingResponse:
+    """Stream ``rows`` as newline-delimited JSON, one object per line.
+
+    Synchronous iterables (e.g. graph traversal generators) are advanced on the
+    threadpool so a long traversal never blocks the event loop.
+    """
+
+    if isinstance(rows, AsyncIterable):
+        lines = _ndjson_lines(rows)
+    else:
+        lines = _ndjson_lines(iterate_in_threadpool(iter(rows)))
+    return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE)
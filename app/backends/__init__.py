@@ -1,5 +1,32 @@
 """Graph backend implementations."""
 
-from app.backends.graph_backend import GraphBackend, InMemoryGraphBackend, MockGraphBackend, Neo4jGraphBackend
+from app.backends.async_backend import AsyncGraphBackend, ThreadedGraphBackend
+from app.backends.compact import EDGE_COLUMNS, CompactEdgeView, CompactGraphBackend
+from app.backends.graph_backend import GraphBackend, InMemoryGraphBackend, MockGraphBackend
+from app.backends.loader import LoadReport, load_jsonl
+from app.backends.mmap_graph import MmapGraphBackend, build_graph_snapshot, write_graph_snapshot
+from app.backends.neo4j_backend import Neo4jGraphBackend
+from app.backends.sharded import ShardedGraphBackend
+from app.backends.versioned import GraphVersion, VersionedGraphBackend
+from app.backends.wal import DurableGraphBackend
 
-__all__ = ["GraphBackend", "InMemoryGraphBackend", "MockGraphBackend", "Neo4jGraphBackend"]
+__all__ = [
+    "EDGE_COLUMNS",
+    "AsyncGraphBackend",
+    "CompactEdgeView",
+    "CompactGraphBackend",
+    "DurableGraphBackend",
+    "GraphBackend",
+    "GraphVersion",
+    "InMemoryGraphBackend",
+    "LoadReport",
+    "MmapGraphBackend",
+    "MockGraphBackend",
+    "Neo4jGraphBackend",
+    "ShardedGraphBackend",
+    "ThreadedGraphBackend",
+    "VersionedGraphBackend",
+    "build_graph_snapshot",
+    "load_jsonl",
+    "write_graph_snapshot",
+]
@@ -0,0 +1,90 @@
+"""Read-through cache of per-node out-adjacency for remote graph backends."""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from app.backends.graph_backend import AmountIndex, amount_partitions
+
+
+@dataclass
+class CachedAdjacency:
+    """Out-edges of one node plus its per-channel ascending amount index."""
+
+    edges: Dict[str, Mapping[str, Any]]
+    loaded_at: float
+    partitions: Dict[Optional[str], AmountIndex] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self.partitions = amount_partitions(self.edges.items())
+
+    def successors_with_edges(
+        self,
+        min_amount: float = 0.0,
+        start: int = 0,
+        channel: Optional[str] = None,
+    ) -> Iterator[Tuple[str, Mapping[str, Any]]]:
+        """Qualifying out-edges, largest amount first, from the cached partitions."""
+
+        partition = self.partitions.get(channel)
+        if partition is None:
+            return
+        amounts, targets = partition
+        for position in range(len(targets) - 1 - start, bisect_left(amounts, min_amount) - 1, -1):
+            yield targets[position], self.edges[targets[position]]
+
+
+class AdjacencyCache:
+    """Thread-safe LRU of :class:`CachedAdjacency` entries keyed by node ID.
+
+    Holds at most ``max_size`` nodes. With ``ttl`` an entry expires that many
+    seconds after it was loaded, for stores that other clients also write to.
+    """
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, CachedAdjacency] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, node_id: str) -> Optional[CachedAdjacency]:
+        with self._lock:
+            cached = self._entries.get(node_id)
+            if cached is None:
+                return None
+            if self.ttl is not None and time.monotonic() - cached.loaded_at >= self.ttl:
+                return None
+            self._entries.move_to_end(node_id)
+            return cached
+
+    def store(
+        self, adjacency: Iterable[Tuple[str, Iterable[Tuple[str, Mapping[str, Any]]]]]
+    ) -> Dict[str, CachedAdjacency]:
+        """Cache ``(node_id, [(target, attrs), ...])`` pairs; returns the new entries."""
+
+        now = time.monotonic()
+        loaded = {
+            node_id: CachedAdjacency(
+                {target: MappingProxyType(attrs) for target, attrs in edges}, now
+            )
+            for node_id, edges in adjacency
+        }
+        with self._lock:
+            self._entries.update(loaded)
+            for node_id in loaded:
+                self._entries.move_to_end(node_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return loaded
+
+    def invalidate(self, node_ids: Iterable[str]) -> None:
+        with self._lock:
+            for node_id in node_ids:
+                self._entries.pop(node_id, None)
@@ -0,0 +1,246 @@
+"""Awaitable graph backend contract and a thread-pool adapter for sync backends."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from itertools import islice
+from operator import methodcaller
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from app.backends.graph_backend import EdgeRecord, GraphBackend
+
+T = TypeVar("T")
+
+
+class AsyncGraphBackend(ABC):
+    """Graph store contract for ``async`` callers.
+
+    Every method that can touch storage is awaitable, so a slow traversal or a
+    network round trip suspends only the request that issued it. ``run`` hands a
+    synchronous traversal over :class:`GraphBackend` to the implementation, which
+    decides where it executes (worker thread, remote query, ...).
+    """
+
+    @property
+    def epoch(self) -> int:
+        return 0
+
+    @abstractmethod
+    async def add_node(self, node_id: str, **attrs: Any) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def add_edge(self, source_id: str, target_id: str, **attrs: Any) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def add_edges_bulk(self, edges: Iterable[EdgeRecord]) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def has_node(self, node_id: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def size(self) -> Dict[str, int]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def successors(self, node_id: str) -> List[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def predecessors(self, node_id: str) -> List[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_edge(self, source_id: str, target_id: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def neighbors_with_edges(self, node_id: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def successors_batch(
+        self,
+        node_ids: Sequence[str],
+        min_amount: float = 0.0,
+        limit: Optional[int] = None,
+    ) -> Dict[str, List[Tuple[str, Dict[str, Any]]]]:
+        """Out-edges of many nodes in one call, largest amount first, as ``(target, attrs)``."""
+
+        raise NotImplementedError
+
+    @abstractmethod
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run ``fn(backend, *args)`` against a synchronous view of the graph."""
+
+        raise NotImplementedError
+
+    def pin(self) -> "AsyncGraphBackend":
+        """View whose reads all see the current version; see :meth:`GraphBackend.pin`.
+
+        Implementations without versions return themselves.
+        """
+
+        return self
+
+
+class _ReadWriteLock:
+    """Many concurrent readers or one writer; waiting writers block new readers."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writers_waiting = 0
+        self._writing = False
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        with self._condition:
+            while self._writing or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+class ThreadedGraphBackend(AsyncGraphBackend):
+    """Run a synchronous :class:`GraphBackend` on an executor.
+
+    CPU-bound in-memory traversals move off the event loop onto ``executor`` (a
+    private thread pool of ``max_workers`` by default). When the backend pins
+    immutable versions (:meth:`GraphBackend.pin`), each read runs against the
+    version current at its start and takes no lock. Otherwise reads share a
+    readers-writer lock and writes take it exclusively, so a traversal never sees
+    a half-applied mutation made through this adapter.
+    """
+
+    def __init__(
+        self,
+        backend: GraphBackend,
+        executor: Optional[Executor] = None,
+        max_workers: int = 4,
+    ):
+        self.backend = backend
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="graph-query"
+        )
+        self._lock = _ReadWriteLock()
+        self._versioned = backend.pin() is not backend
+
+    @property
+    def epoch(self) -> int:
+        return self.backend.epoch
+
+    async def add_node(self, node_id: str, **attrs: Any) -> None:
+        await self._write(partial(self.backend.add_node, node_id, **attrs))
+
+    async def add_edge(self, source_id: str, target_id: str, **attrs: Any) -> None:
+        await self._write(partial(self.backend.add_edge, source_id, target_id, **attrs))
+
+    async def add_edges_bulk(self, edges: Iterable[EdgeRecord]) -> int:
+        return await self._write(partial(self.backend.add_edges_bulk, edges))
+
+    async def has_node(self, node_id: str) -> bool:
+        return await self._read(methodcaller("has_node", node_id))
+
+    async def size(self) -> Dict[str, int]:
+        return await self._read(methodcaller("size"))
+
+    async def successors(self, node_id: str) -> List[str]:
+        return await self._read(methodcaller("successors", node_id))
+
+    async def predecessors(self, node_id: str) -> List[str]:
+        return await self._read(methodcaller("predecessors", node_id))
+
+    async def get_edge(self, source_id: str, target_id: str) -> Dict[str, Any]:
+        return await self._read(methodcaller("get_edge", source_id, target_id))
+
+    async def neighbors_with_edges(self, node_id: str) -> Dict[str, Any]:
+        return await self._read(methodcaller("neighbors_with_edges", node_id))
+
+    async def successors_batch(
+        self,
+        node_ids: Sequence[str],
+        min_amount: float = 0.0,
+        limit: Optional[int] = None,
+    ) -> Dict[str, List[Tuple[str, Dict[str, Any]]]]:
+        return await self._read(_successors_batch, list(node_ids), min_amount, limit)
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        return await self._read(fn, *args)
+
+    def pin(self) -> AsyncGraphBackend:
+        """Adapter over the version current now, sharing this adapter's executor."""
+
+        if not self._versioned:
+            return self
+        return ThreadedGraphBackend(self.backend.pin(), executor=self.executor)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
+
+    async def _read(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run ``fn(backend_or_pinned_version, *args)`` on the executor."""
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._read_sync, fn, args)
+
+    async def _write(self, fn: Callable[[], T]) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._write_sync, fn)
+
+    def _read_sync(self, fn: Callable[..., T], args: Tuple[Any, ...]) -> T:
+        if self._versioned:
+            return fn(self.backend.pin(), *args)
+        with self._lock.read():
+            return fn(self.backend, *args)
+
+    def _write_sync(self, fn: Callable[[], T]) -> T:
+        if self._versioned:
+            return fn()
+        with self._lock.write():
+            return fn()
+
+
+def _successors_batch(
+    backend: GraphBackend,
+    node_ids: List[str],
+    min_amount: float,
+    limit: Optional[int],
+) -> Dict[str, List[Tuple[str, Dict[str, Any]]]]:
+    return {
+        node_id: [
+            (target, dict(edge))
+            for target, edge in islice(backend.successors_with_edges(node_id, min_amount), limit)
+        ]
+        for node_id in node_ids
+        if backend.has_node(node_id)
+    }
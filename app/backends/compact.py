@@ -0,0 +1,613 @@
+"""Compact interned-ID graph backend with columnar edge attributes."""
+
+from __future__ import annotations
+
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Protocol, Tuple
+
+import networkx as nx
+import numpy as np
+
+from app.backends.graph_backend import EdgeRecord, GraphBackend
+
+_NUMERIC_COLUMNS = ("amount", "risk", "risk_transfer", "timestamp")
+_COLUMNS = _NUMERIC_COLUMNS + ("channel",)
+_COLUMN_INDEX = {name: col for col, name in enumerate(_COLUMNS)}
+# Edge attributes held in typed columns; the default attribute set for loaders.
+EDGE_COLUMNS: Tuple[str, ...] = _COLUMNS
+_TIMESTAMP = _COLUMN_INDEX["timestamp"]
+_CHANNEL = _COLUMN_INDEX["channel"]
+
+# Per-edge flag bits: bit ``col`` marks a stored column, bit ``_INT_SHIFT + col``
+# an integer-valued number and ``_ISO_TIMESTAMP`` a timestamp given as ISO-8601 "...Z".
+_INT_SHIFT = len(_COLUMNS)
+_ISO_TIMESTAMP = 1 << (2 * len(_COLUMNS))
+_MAX_EXACT_INT = 2**53
+_EPOCH = datetime(1970, 1, 1)
+_NONE = -1
+
+
+class _EdgeTable:
+    """Open-addressing ``(source, target) -> edge id`` map held in two flat arrays."""
+
+    __slots__ = ("_keys", "_values", "_bits", "_used")
+
+    def __init__(self, bits: int = 10):
+        self._bits = bits
+        self._keys = array("q", [_NONE]) * (1 << bits)
+        self._values = array("i", [0]) * (1 << bits)
+        self._used = 0
+
+    def get(self, key: int) -> int:
+        slot = self._slot(key)
+        return self._values[slot] if self._keys[slot] == key else _NONE
+
+    def put(self, key: int, value: int) -> None:
+        if 3 * (self._used + 1) > 2 * len(self._keys):
+            self._grow()
+        slot = self._slot(key)
+        if self._keys[slot] == _NONE:
+            self._keys[slot] = key
+            self._used += 1
+        self._values[slot] = value
+
+    def nbytes(self) -> int:
+        return len(self._keys) * self._keys.itemsize + len(self._values) * self._values.itemsize
+
+    def _slot(self, key: int) -> int:
+        keys, mask = self._keys, len(self._keys) - 1
+        slot = ((key * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> (64 - self._bits)
+        while keys[slot] != _NONE and keys[slot] != key:
+            slot = (slot + 1) & mask
+        return slot
+
+    def _grow(self) -> None:
+        keys, values = self._keys, self._values
+        self._bits += 1
+        self._keys = array("q", [_NONE]) * (1 << self._bits)
+        self._values = array("i", [0]) * (1 << self._bits)
+        for key, value in zip(keys, values):
+            if key != _NONE:
+                slot = self._slot(key)
+                self._keys[slot] = key
+                self._values[slot] = value
+
+
+class _EdgeColumns(Protocol):
+    """Backend storage a :class:`CompactEdgeView` reads from, by edge position."""
+
+    def _edge_value(self, edge: int, name: str) -> Any: ...
+
+    def _edge_keys(self, edge: int) -> List[str]: ...
+
+
+class CompactEdgeView(Mapping):
+    """Read-only live view of one edge's attributes; no per-edge dict is kept."""
+
+    __slots__ = ("_backend", "_edge")
+
+    def __init__(self, backend: _EdgeColumns, edge: int):
+        self._backend = backend
+        self._edge = edge
+
+    def __getitem__(self, key: str) -> Any:
+        return self._backend._edge_value(self._edge, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._backend._edge_keys(self._edge))
+
+    def __len__(self) -> int:
+        return len(self._backend._edge_keys(self._edge))
+
+    def __repr__(self) -> str:
+        return f"CompactEdgeView({dict(self)!r})"
+
+
+class CompactGraphBackend(GraphBackend):
+    """Memory-lean backend: interned node IDs, forward-star adjacency, typed columns.
+
+    Node IDs are interned to ints. Out- and in-edges are singly linked lists kept in
+    ``array`` buffers (head/tail per node, next pointer per edge), so appends never
+    reallocate per-node structures and iteration follows insertion order. The
+    ``amount``, ``risk``, ``risk_transfer`` and ``timestamp`` attributes live in
+    float64 columns and ``channel`` in an interned uint16 column. Any other
+    attribute, or a value a column cannot hold exactly, goes to an int32 column
+    per attribute name holding codes into a shared table of interned values;
+    a column grows only up to the last edge that has the attribute.
+    ``to_networkx`` materialises a detached ``DiGraph`` only when asked.
+    """
+
+    def __init__(self):
+        self._ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._node_attrs: Dict[int, Dict[str, Any]] = {}
+        self._out_head = array("i")
+        self._out_tail = array("i")
+        self._in_head = array("i")
+        self._in_tail = array("i")
+
+        self._source = array("i")
+        self._target = array("i")
+        self._out_next = array("i")
+        self._in_next = array("i")
+        self._numbers = tuple(array("d") for _ in _NUMERIC_COLUMNS)
+        self._channel = array("H")
+        self._flags = array("H")
+        self._channels: List[str] = [""]
+        self._channel_codes: Dict[str, int] = {}
+        # Non-column attributes: name -> per-edge codes into ``_values`` (_NONE if unset).
+        self._extra: Dict[str, array] = {}
+        self._values: List[Any] = []
+        self._value_codes: Dict[Tuple[type, Any], int] = {}
+
+        self._edges = _EdgeTable()
+        # Per source: (ascending amounts, edge positions in the same order).
+        self._amount_index: Dict[int, Tuple[array, array]] = {}
+        self._epoch = 0
+        self._networkx: Optional[Tuple[int, nx.DiGraph]] = None
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+
+    def add_node(self, node_id: str, **attrs: Any) -> None:
+        node = self._intern(node_id)
+        if attrs:
+            self._node_attrs.setdefault(node, {}).update(attrs)
+        self._epoch += 1
+
+    def add_edge(self, source_id: str, target_id: str, **attrs: Any) -> None:
+        self._epoch += 1
+        source, target = self._intern(source_id), self._intern(target_id)
+        key = source << 32 | target
+        edge = self._edges.get(key)
+        index = self._amount_index.get(source)
+        old_amount: Optional[float] = None
+        position: Optional[int] = None
+        created = edge == _NONE
+        if created:
+            edge = self._new_edge(source, target, attrs)
+            self._edges.put(key, edge)
+        else:
+            if index is not None and "amount" in attrs:
+                old_amount = self._amount_key(edge)
+                position = self._unindex(index, edge, old_amount)
+            for name, value in attrs.items():
+                self._set(edge, name, value)
+
+        if index is not None and (created or position is not None):
+            amounts, ordered = index
+            amount = self._amount_key(edge)
+            if position is None or amount != old_amount:
+                position = bisect_right(amounts, amount)
+            amounts.insert(position, amount)
+            ordered.insert(position, edge)
+
+    def add_edges_bulk(self, edges: Iterable[EdgeRecord]) -> int:
+        """Append new edges column-wise and link them into adjacency lists vectorised.
+
+        Records for edges that already exist (or repeat within the batch) are
+        applied afterwards through the per-edge update path, in input order.
+        """
+
+        intern, lookup, encode = self._intern, self._edges.get, self._encode_attrs
+        sources: List[int] = []
+        targets: List[int] = []
+        numbers: List[List[float]] = [[] for _ in _NUMERIC_COLUMNS]
+        channels: List[int] = []
+        flags: List[int] = []
+        extras: Dict[int, Dict[str, Any]] = {}
+        pending: Dict[int, int] = {}
+        updates: List[Tuple[int, Mapping[str, Any]]] = []
+
+        for source_id, target_id, attrs in edges:
+            source, target = intern(source_id), intern(target_id)
+            key = source << 32 | target
+            if key in pending or lookup(key) != _NONE:
+                updates.append((key, attrs))
+                continue
+            pending[key] = len(sources)
+            sources.append(source)
+            targets.append(target)
+            values, channel, bits, extra = encode(attrs)
+            for column, value in zip(numbers, values):
+                column.append(value)
+            channels.append(channel)
+            flags.append(bits)
+            if extra is not None:
+                extras[len(sources) - 1] = extra
+
+        base = len(self._target)
+        if sources:
+            self._append_columns(sources, targets, numbers, channels, flags)
+            put = self._edges.put
+            for key, position in pending.items():
+                put(key, base + position)
+            for position, extra in extras.items():
+                for name, value in extra.items():
+                    self._set_extra(base + position, name, value)
+            self._link(np.asarray(sources), base, self._out_head, self._out_tail, self._out_next)
+            self._link(np.asarray(targets), base, self._in_head, self._in_tail, self._in_next)
+
+        for key, attrs in updates:
+            edge = lookup(key)
+            for name, value in attrs.items():
+                self._set(edge, name, value)
+
+        # Dropped indexes are rebuilt with one sort on the next query.
+        for source in set(sources).union(key >> 32 for key, _ in updates):
+            self._amount_index.pop(source, None)
+        self._epoch += 1
+        return len(sources) + len(updates)
+
+    def successors(self, node_id: str) -> List[str]:
+        return [self._ids[self._target[edge]] for edge in self._out_edges(self._index[node_id])]
+
+    def predecessors(self, node_id: str) -> List[str]:
+        return [self._ids[self._source[edge]] for edge in self._in_edges(self._index[node_id])]
+
+    def get_edge(self, source_id: str, target_id: str) -> Dict[str, Any]:
+        return dict(self.edge_view(source_id, target_id))
+
+    def edge_view(self, source_id: str, target_id: str) -> CompactEdgeView:
+        edge = self._edges.get(self._index[source_id] << 32 | self._index[target_id])
+        if edge == _NONE:
+            raise KeyError((source_id, target_id))
+        return CompactEdgeView(self, edge)
+
+    def successors_with_edges(
+        self,
+        node_id: str,
+        min_amount: float = 0.0,
+        start: int = 0,
+        channel: Optional[str] = None,
+    ) -> Iterator[Tuple[str, CompactEdgeView]]:
+        """Qualifying out-edges, largest amount first; ``start`` offsets into the index.
+
+        ``channel`` is matched against the interned channel column, so edges on
+        other channels are skipped without building their views.
+        """
+
+        amounts, index = self._amount_order(self._index[node_id])
+        lowest = bisect_left(amounts, min_amount)
+        edges: Iterator[int]
+        if channel is None:
+            edges = (index[position] for position in range(len(index) - 1 - start, lowest - 1, -1))
+        else:
+            code, channels = self._channel_codes.get(channel), self._channel
+            matching = (edge for edge in reversed(index[lowest:]) if channels[edge] == code)
+            edges = islice(matching, start, None)
+        for edge in edges:
+            yield self._ids[self._target[edge]], CompactEdgeView(self, edge)
+
+    def nodes_by_attribute(self, name: str, value: Any) -> List[str]:
+        return [
+            self._ids[node] for node, attrs in self._node_attrs.items() if attrs.get(name) == value
+        ]
+
+    def has_node(self, node_id: str) -> bool:
+        return node_id in self._index
+
+    def size(self) -> Dict[str, int]:
+        return {"nodes": len(self._ids), "edges": len(self._target)}
+
+    def neighbors_with_edges(self, node_id: str) -> Dict[str, Any]:
+        outgoing = [
+            {"target": self._ids[self._target[edge]], "edge": dict(CompactEdgeView(self, edge))}
+            for edge in self._out_edges(self._index[node_id])
+        ]
+        return {"entity": node_id, "outgoing": outgoing}
+
+    def to_networkx(self) -> nx.DiGraph:
+        """Detached ``DiGraph`` copy, rebuilt only when the graph changed since the last call."""
+
+        if self._networkx is None or self._networkx[0] != self._epoch:
+            graph = nx.DiGraph()
+            for node, node_id in enumerate(self._ids):
+                graph.add_node(node_id, **self._node_attrs.get(node, {}))
+            for edge in range(len(self._target)):
+                graph.add_edge(
+                    self._ids[self._source[edge]],
+                    self._ids[self._target[edge]],
+                    **dict(CompactEdgeView(self, edge)),
+                )
+            self._networkx = (self._epoch, graph)
+        return self._networkx[1]
+
+    def nbytes(self) -> int:
+        """Bytes held by the adjacency and attribute buffers (excluding node ID strings)."""
+
+        buffers = [
+            self._out_head,
+            self._out_tail,
+            self._in_head,
+            self._in_tail,
+            self._source,
+            self._target,
+            self._out_next,
+            self._in_next,
+            self._channel,
+            self._flags,
+            *self._numbers,
+            *self._extra.values(),
+        ]
+        values = sum(map(sys.getsizeof, self._values)) + sys.getsizeof(self._values)
+        return (
+            sum(len(buffer) * buffer.itemsize for buffer in buffers) + self._edges.nbytes() + values
+        )
+
+    def _intern(self, node_id: str) -> int:
+        node = self._index.get(node_id)
+        if node is None:
+            node = len(self._ids)
+            self._ids.append(node_id)
+            self._index[node_id] = node
+            for column in (self._out_head, self._out_tail, self._in_head, self._in_tail):
+                column.append(_NONE)
+        return node
+
+    def _new_edge(self, source: int, target: int, attrs: Mapping[str, Any]) -> int:
+        numbers, channel, flags, extra = self._encode_attrs(attrs)
+        edge = len(self._target)
+        self._append_columns([source], [target], [[value] for value in numbers], [channel], [flags])
+        if extra is not None:
+            for name, value in extra.items():
+                self._set_extra(edge, name, value)
+
+        if self._out_tail[source] == _NONE:
+            self._out_head[source] = edge
+        else:
+            self._out_next[self._out_tail[source]] = edge
+        self._out_tail[source] = edge
+        if self._in_tail[target] == _NONE:
+            self._in_head[target] = edge
+        else:
+            self._in_next[self._in_tail[target]] = edge
+        self._in_tail[target] = edge
+        return edge
+
+    def _append_columns(
+        self,
+        sources: List[int],
+        targets: List[int],
+        numbers: List[List[float]],
+        channels: List[int],
+        flags: List[int],
+    ) -> None:
+        self._source.extend(sources)
+        self._target.extend(targets)
+        unlinked = array("i", [_NONE]) * len(sources)
+        self._out_next.extend(unlinked)
+        self._in_next.extend(unlinked)
+        for column, values in zip(self._numbers, numbers):
+            column.extend(values)
+        self._channel.extend(channels)
+        self._flags.extend(flags)
+
+    @staticmethod
+    def _link(owners: np.ndarray, base: int, head: array, tail: array, nxt: array) -> None:
+        """Chain edges ``base..base+len(owners)`` onto their owners' lists, keeping input order."""
+
+        order = np.argsort(owners, kind="stable")
+        grouped = owners[order]
+        edges = order + base
+        same = grouped[1:] == grouped[:-1]
+        starts = np.concatenate(([True], ~same))
+        ends = np.concatenate((~same, [True]))
+        owner_ids, firsts, lasts = grouped[starts], edges[starts], edges[ends]
+
+        heads = np.frombuffer(head, dtype=np.int32)
+        tails = np.frombuffer(tail, dtype=np.int32)
+        links = np.frombuffer(nxt, dtype=np.int32)
+        try:
+            links[edges[:-1][same]] = edges[1:][same]
+            previous = tails[owner_ids]
+            attached = previous != _NONE
+            links[previous[attached]] = firsts[attached]
+            heads[owner_ids[~attached]] = firsts[~attached]
+            tails[owner_ids] = lasts
+        finally:
+            # Release the buffer exports so the arrays can grow again.
+            del heads, tails, links
+
+    def _encode_attrs(
+        self, attrs: Mapping[str, Any]
+    ) -> Tuple[List[float], int, int, Optional[Dict[str, Any]]]:
+        """Split ``attrs`` into column values, channel code, flag bits and leftover attributes."""
+
+        numbers = [0.0] * len(_NUMERIC_COLUMNS)
+        channel = flags = 0
+        extra = None
+        for name, value in attrs.items():
+            col = _COLUMN_INDEX.get(name)
+            encoded = None if col is None else self._encode(col, value)
+            if col is None or encoded is None:
+                if extra is None:
+                    extra = {}
+                extra[name] = value
+                continue
+            if col == _CHANNEL:
+                channel = encoded[0]
+            else:
+                numbers[col] = encoded[0]
+            flags |= encoded[1]
+        return numbers, channel, flags, extra
+
+    def _out_edges(self, node: int) -> Iterator[int]:
+        edge = self._out_head[node]
+        while edge != _NONE:
+            yield edge
+            edge = self._out_next[edge]
+
+    def _in_edges(self, node: int) -> Iterator[int]:
+        edge = self._in_head[node]
+        while edge != _NONE:
+            yield edge
+            edge = self._in_next[edge]
+
+    def _set(self, edge: int, name: str, value: Any) -> None:
+        col = _COLUMN_INDEX.get(name)
+        if col is not None and self._store(edge, col, value):
+            codes = self._extra.get(name)
+            if codes is not None and edge < len(codes):
+                codes[edge] = _NONE
+            return
+        if col is not None:
+            self._flags[edge] &= ~self._column_bits(col)
+        self._set_extra(edge, name, value)
+
+    def _set_extra(self, edge: int, name: str, value: Any) -> None:
+        codes = self._extra.get(name)
+        if codes is None:
+            codes = self._extra[name] = array("i")
+        if len(codes) <= edge:
+            codes.extend(array("i", [_NONE]) * (edge + 1 - len(codes)))
+        codes[edge] = self._intern_value(value)
+
+    def _intern_value(self, value: Any) -> int:
+        """Code of ``value`` in the shared value table; unhashable values are not shared."""
+
+        try:
+            # Keyed by type too, so 1, 1.0 and True keep their own codes.
+            key = (type(value), value)
+            code = self._value_codes.get(key)
+        except TypeError:
+            key, code = None, None
+        if code is None:
+            code = len(self._values)
+            self._values.append(value)
+            if key is not None:
+                self._value_codes[key] = code
+        return code
+
+    def _extras(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """``(edge, non-column attributes)`` for every edge that has any, in edge order."""
+
+        by_edge: Dict[int, Dict[str, Any]] = {}
+        for name, codes in self._extra.items():
+            column = np.frombuffer(codes, dtype=np.int32)
+            for edge in np.flatnonzero(column != _NONE).tolist():
+                by_edge.setdefault(edge, {})[name] = self._values[codes[edge]]
+        return iter(sorted(by_edge.items()))
+
+    def _store(self, edge: int, col: int, value: Any) -> bool:
+        encoded = self._encode(col, value)
+        if encoded is None:
+            return False
+        stored, bits = encoded
+        if col == _CHANNEL:
+            self._channel[edge] = stored
+        else:
+            self._numbers[col][edge] = stored
+        self._flags[edge] = (self._flags[edge] & ~self._column_bits(col)) | bits
+        return True
+
+    def _encode(self, col: int, value: Any) -> Optional[Tuple[Any, int]]:
+        """Column value and flag bits for ``value``; ``None`` if the column cannot hold it exactly."""
+
+        if col == _CHANNEL:
+            if not isinstance(value, str):
+                return None
+            code = self._channel_codes.get(value)
+            if code is None:
+                if len(self._channels) > 0xFFFF:
+                    return None
+                code = len(self._channels)
+                self._channels.append(value)
+                self._channel_codes[value] = code
+            return code, 1 << col
+        if isinstance(value, float):
+            return value, 1 << col
+        if isinstance(value, int) and not isinstance(value, bool):
+            if abs(value) > _MAX_EXACT_INT:
+                return None
+            return float(value), (1 << col) | (1 << (_INT_SHIFT + col))
+        if col == _TIMESTAMP and isinstance(value, str):
+            seconds = _parse_utc_iso(value)
+            if seconds is None:
+                return None
+            return seconds, (1 << col) | _ISO_TIMESTAMP
+        return None
+
+    @staticmethod
+    def _column_bits(col: int) -> int:
+        bits = (1 << col) | (1 << (_INT_SHIFT + col))
+        return bits | _ISO_TIMESTAMP if col == _TIMESTAMP else bits
+
+    def _edge_value(self, edge: int, name: str) -> Any:
+        col = _COLUMN_INDEX.get(name)
+        if col is not None:
+            flags = self._flags[edge]
+            if flags & (1 << col):
+                if col == _CHANNEL:
+                    return self._channels[self._channel[edge]]
+                value = self._numbers[col][edge]
+                if flags & (1 << (_INT_SHIFT + col)):
+                    return int(value)
+                if col == _TIMESTAMP and flags & _ISO_TIMESTAMP:
+                    return _format_utc_iso(value)
+                return value
+        codes = self._extra.get(name)
+        if codes is not None and edge < len(codes) and codes[edge] != _NONE:
+            return self._values[codes[edge]]
+        raise KeyError(name)
+
+    def _edge_keys(self, edge: int) -> List[str]:
+        flags = self._flags[edge]
+        keys = [name for col, name in enumerate(_COLUMNS) if flags & (1 << col)]
+        keys.extend(
+            name
+            for name, codes in self._extra.items()
+            if edge < len(codes) and codes[edge] != _NONE
+        )
+        return keys
+
+    def _amount_key(self, edge: int) -> float:
+        return self._numbers[0][edge] if self._flags[edge] & 1 else 0.0
+
+    def _amount_order(self, node: int) -> Tuple[array, array]:
+        index = self._amount_index.get(node)
+        if index is None:
+            ordered = array("i", sorted(self._out_edges(node), key=self._amount_key))
+            index = (array("d", map(self._amount_key, ordered)), ordered)
+            self._amount_index[node] = index
+        return index
+
+    def _unindex(self, index: Tuple[array, array], edge: int, amount: float) -> int:
+        amounts, ordered = index
+        position = bisect_left(amounts, amount)
+        while ordered[position] != edge:
+            position += 1
+        del amounts[position]
+        del ordered[position]
+        return position
+
+
+def _parse_utc_iso(value: str) -> Optional[float]:
+    """Seconds since the epoch for a naive ISO-8601 UTC string ending in ``Z``.
+
+    Returns ``None`` unless the value formats back to exactly the same string.
+    """
+
+    if not value.endswith("Z"):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value[:-1])
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        return None
+    seconds = (parsed - _EPOCH).total_seconds()
+    # Whole-second "YYYY-MM-DDTHH:MM:SSZ" always round-trips; skip the format check.
+    if len(value) == 20 and value[4] == "-" and value[10] == "T" and value[13] == ":":
+        return seconds
+    return seconds if _format_utc_iso(seconds) == value else None
+
+
+def _format_utc_iso(seconds: float) -> str:
+    return (_EPOCH + timedelta(seconds=seconds)).isoformat() + "Z"
@@ -3,10 +3,19 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from itertools import islice
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import networkx as nx
 
+# (source_id, target_id, edge attributes)
+EdgeRecord = Tuple[str, str, Mapping[str, Any]]
+# (ascending amounts, targets in the same order)
+AmountIndex = Tuple[List[float], List[str]]
+
 
 class GraphBackend(ABC):
     """Generic interface for graph backend implementations."""
@@ -19,14 +28,104 @@ class GraphBackend(ABC):
     def add_edge(self, source_id: str, target_id: str, **attrs: Any) -> None:
         raise NotImplementedError
 
+    def add_edges_bulk(self, edges: Iterable[EdgeRecord]) -> int:
+        """Insert or update many edges at once; returns how many records were applied.
+
+        Backends override this to skip per-edge bookkeeping (index maintenance,
+        epoch bumps, round trips); the epoch advances at least once per call.
+        """
+
+        count = 0
+        for source_id, target_id, attrs in edges:
+            self.add_edge(source_id, target_id, **attrs)
+            count += 1
+        return count
+
     @abstractmethod
     def successors(self, node_id: str) -> List[str]:
         raise NotImplementedError
 
+    @abstractmethod
+    def predecessors(self, node_id: str) -> List[str]:
+        raise NotImplementedError
+
     @abstractmethod
     def get_edge(self, source_id: str, target_id: str) -> Dict[str, Any]:
         raise NotImplementedError
 
+    def edge_view(self, source_id: str, target_id: str) -> Mapping[str, Any]:
+        """Read-only edge attributes; backends may return a live view instead of a copy."""
+
+        return self.get_edge(source_id, target_id)
+
+    @property
+    def epoch(self) -> int:
+        """Counter that changes whenever the graph is written; used to expire cursors."""
+
+        return 0
+
+    @property
+    def round_trips(self) -> int:
+        """Storage round trips issued so far by the calling thread (0 for local backends)."""
+
+        return 0
+
+    def pin(self) -> "GraphBackend":
+        """Read-only view that stays at the current epoch while writes continue.
+
+        Multi-version backends return an immutable snapshot; others return
+        themselves, and callers must coordinate with writers.
+        """
+
+        return self
+
+    def prefetch(  # noqa: B027 - optional hook, deliberately a no-op by default
+        self,
+        source_id: str,
+        max_hops: int,
+        min_amount: float = 0.0,
+        channel: Optional[str] = None,
+    ) -> None:
+        """Hint that a traversal of up to ``max_hops`` from ``source_id`` is about to run.
+
+        Remote backends load the reachable region in one round trip. The default
+        is intentionally a no-op, so local backends need not override it.
+        """
+
+    def successors_with_edges(
+        self,
+        node_id: str,
+        min_amount: float = 0.0,
+        start: int = 0,
+        channel: Optional[str] = None,
+    ) -> Iterator[Tuple[str, Mapping[str, Any]]]:
+        """Yield ``(target, edge)`` for out-edges whose ``amount`` is at least ``min_amount``.
+
+        With ``channel`` only edges whose ``channel`` attribute equals it qualify.
+        ``start`` skips that many qualifying edges, so a caller can resume an
+        earlier iteration over the same epoch.
+        """
+
+        def qualifying() -> Iterator[Tuple[str, Mapping[str, Any]]]:
+            for target in self.successors(node_id):
+                edge = self.edge_view(node_id, target)
+                if edge.get("amount", 0) < min_amount:
+                    continue
+                if channel is None or edge.get("channel") == channel:
+                    yield target, edge
+
+        return islice(qualifying(), start, None)
+
+    def nodes_by_attribute(self, name: str, value: Any) -> List[str]:
+        """IDs of nodes whose attribute ``name`` equals ``value``.
+
+        The default scans every node; backends with a secondary index on ``name``
+        answer from it.
+        """
+
+        nodes = self.to_networkx().nodes(data=True)
+        return [node_id for node_id, attrs in nodes if attrs.get(name) == value]
+
     @abstractmethod
     def has_node(self, node_id: str) -> bool:
         raise NotImplementedError
@@ -44,24 +143,133 @@ class GraphBackend(ABC):
         raise NotImplementedError
 
 
+def amount_partitions(
+    edges: Iterable[Tuple[str, Mapping[str, Any]]],
+) -> Dict[Optional[str], AmountIndex]:
+    """Amount order of ``(target, edge)`` out-edges: all under ``None``, then one per ``channel``."""
+
+    partitions: Dict[Optional[str], AmountIndex] = {None: ([], [])}
+    for target, edge in sorted(edges, key=lambda item: item[1].get("amount", 0)):
+        amount = edge.get("amount", 0)
+        for key in _partition_keys(edge.get("channel")):
+            amounts, targets = partitions.setdefault(key, ([], []))
+            amounts.append(amount)
+            targets.append(target)
+    return partitions
+
+
+def _partition_keys(channel: Any) -> Tuple[Optional[str], ...]:
+    return (None, channel) if isinstance(channel, str) else (None,)
+
+
 class InMemoryGraphBackend(GraphBackend):
-    """NetworkX-backed in-memory implementation."""
+    """NetworkX-backed in-memory implementation.
+
+    Out-edges are indexed per node by ``amount``, overall and partitioned by
+    ``channel``, so ``successors_with_edges`` bisects straight to the edges meeting
+    ``min_amount`` on the requested channel. A node's index is built on first use
+    and then kept sorted as edges are added through ``add_edge``. Node attributes
+    named in ``indexed_attributes`` are indexed by value as nodes are added.
+    """
 
-    def __init__(self):
+    def __init__(self, indexed_attributes: Iterable[str] = ("type",)):
         self.graph = nx.DiGraph()
+        self._epoch = 0
+        # node -> channel (None for all edges) -> amount order
+        self._amount_index: Dict[str, Dict[Optional[str], AmountIndex]] = {}
+        # attribute -> value -> node IDs, a dict used as an insertion-ordered set
+        self._node_index: Dict[str, Dict[Any, Dict[str, None]]] = {
+            name: {} for name in indexed_attributes
+        }
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
 
     def add_node(self, node_id: str, **attrs: Any) -> None:
+        current = self.graph.nodes[node_id] if node_id in self.graph else {}
+        for name, index in self._node_index.items():
+            if name not in attrs:
+                continue
+            if name in current:
+                self._unindex_node(index, current[name], node_id)
+            index.setdefault(attrs[name], {})[node_id] = None
         self.graph.add_node(node_id, **attrs)
+        self._epoch += 1
 
     def add_edge(self, source_id: str, target_id: str, **attrs: Any) -> None:
+        self._epoch += 1
+        partitions = self._amount_index.get(source_id)
+        previous = self.graph.adj[source_id].get(target_id) if source_id in self.graph else None
+        old_key = (
+            (previous.get("amount", 0), previous.get("channel")) if previous is not None else None
+        )
         self.graph.add_edge(source_id, target_id, **attrs)
 
+        if partitions is None:
+            return
+        edge = self.graph[source_id][target_id]
+        key = (edge.get("amount", 0), edge.get("channel"))
+        if old_key is not None:
+            if old_key == key:
+                return
+            self._unindex(partitions, target_id, *old_key)
+        for partition in _partition_keys(key[1]):
+            amounts, targets = partitions.setdefault(partition, ([], []))
+            position = bisect_right(amounts, key[0])
+            amounts.insert(position, key[0])
+            targets.insert(position, target_id)
+
+    def add_edges_bulk(self, edges: Iterable[EdgeRecord]) -> int:
+        batch = edges if isinstance(edges, list) else list(edges)
+        self.graph.add_edges_from(batch)
+        # Dropped indexes are rebuilt with one sort on the next query.
+        for source_id, _, _ in batch:
+            self._amount_index.pop(source_id, None)
+        self._epoch += 1
+        return len(batch)
+
     def successors(self, node_id: str) -> List[str]:
         return list(self.graph.successors(node_id))
 
+    def predecessors(self, node_id: str) -> List[str]:
+        return list(self.graph.predecessors(node_id))
+
     def get_edge(self, source_id: str, target_id: str) -> Dict[str, Any]:
         return dict(self.graph[source_id][target_id])
 
+    def edge_view(self, source_id: str, target_id: str) -> Mapping[str, Any]:
+        return MappingProxyType(self.graph[source_id][target_id])
+
+    def successors_with_edges(
+        self,
+        node_id: str,
+        min_amount: float = 0.0,
+        start: int = 0,
+        channel: Optional[str] = None,
+    ) -> Iterator[Tuple[str, Mapping[str, Any]]]:
+        """Qualifying out-edges, largest amount first, as zero-copy edge views.
+
+        ``start`` is an offset into the sorted index, so resuming costs no rescan;
+        with ``channel`` only that channel's partition is read.
+        """
+
+        partition = self._amount_order(node_id).get(channel)
+        if partition is None:
+            return
+        amounts, targets = partition
+        adjacency = self.graph.adj[node_id]
+        first = len(targets) - 1 - start
+        for position in range(first, bisect_left(amounts, min_amount) - 1, -1):
+            target = targets[position]
+            yield target, MappingProxyType(adjacency[target])
+
+    def nodes_by_attribute(self, name: str, value: Any) -> List[str]:
+        index = self._node_index.get(name)
+        if index is None:
+            return super().nodes_by_attribute(name, value)
+        return list(index.get(value, ()))
+
     def has_node(self, node_id: str) -> bool:
         return node_id in self.graph
 
@@ -77,43 +285,35 @@ class InMemoryGraphBackend(GraphBackend):
     def to_networkx(self) -> nx.DiGraph:
         return self.graph
 
+    def _amount_order(self, node_id: str) -> Dict[Optional[str], AmountIndex]:
+        adjacency = self.graph.adj[node_id]
+        partitions = self._amount_index.get(node_id)
+        # Edges added straight to ``self.graph`` bypass add_edge; rebuild when counts drift.
+        if partitions is None or len(partitions[None][1]) != len(adjacency):
+            partitions = self._amount_index[node_id] = amount_partitions(adjacency.items())
+        return partitions
+
+    @staticmethod
+    def _unindex(
+        partitions: Dict[Optional[str], AmountIndex], target_id: str, amount: float, channel: Any
+    ) -> None:
+        for partition in _partition_keys(channel):
+            amounts, targets = partitions[partition]
+            lowest, highest = bisect_left(amounts, amount), bisect_right(amounts, amount)
+            position = targets.index(target_id, lowest, highest)
+            del amounts[position]
+            del targets[position]
+            if partition is not None and not targets:
+                del partitions[partition]
+
+    @staticmethod
+    def _unindex_node(index: Dict[Any, Dict[str, None]], value: Any, node_id: str) -> None:
+        nodes = index.get(value)
+        if nodes is not None:
+            nodes.pop(node_id, None)
+            if not nodes:
+                del index[value]
+
 
 class MockGraphBackend(InMemoryGraphBackend):
     """Mock backend for tests; currently aliases in-memory behavior."""
-
-
-class Neo4jGraphBackend(GraphBackend):
-    """Placeholder for Neo4j implementation.
-
-    This class defines the contract for production graph DB integration.
-    """
-
-    def __init__(self, uri: Optional[str] = None):
-        self.uri = uri
-
-    def _not_implemented(self) -> None:
-        raise NotImplementedError("Neo4j backend integration is planned for production deployments")
-
-    def add_node(self, node_id: str, **attrs: Any) -> None:
-        self._not_implemented()
-
-    def add_edge(self, source_id: str, target_id: str, **attrs: Any) -> None:
-        self._not_implemented()
-
-    def successors(self, node_id: str) -> List[str]:
-        self._not_implemented()
-
-    def get_edge(self, source_id: str, target_id: str) -> Dict[str, Any]:
-        self._not_implemented()
-
-    def has_node(self, node_id: str) -> bool:
-        self._not_implemented()
-
-    def size(self) -> Dict[str, int]:
-        self._not_implemented()
-
-    def neighbors_with_edges(self, node_id: str) -> Dict[str, Any]:
-        self._not_implemented()
-
-    def to_networkx(self) -> nx.DiGraph:
-        self._not_implemented()
@@ -0,0 +1,410 @@
+"""Versioned, memory-mapped binary graph snapshots.
+
+Layout (little-endian)::
+
+    preamble   8s magic | u32 format version | u32 header length
+    header     JSON: node/edge counts, channel table, section directory
+    sections   64-byte aligned arrays, offsets relative to the first section
+
+Sections hold the interned ID table (``id_offsets``/``id_bytes`` plus the
+``id_sorted`` lookup permutation), forward CSR (``out_offsets``/``out_targets``),
+reverse CSR (``in_offsets``/``in_sources``), the edge attribute columns in CSR
+order, a per-node amount-sorted edge order, an optional JSON blob for node
+attributes and optional non-column edge attributes (``extra_offsets`` into
+``extra_bytes``, one small JSON object per edge, decoded only when that edge is
+read). Readers map the file read-only, so every worker on a host shares the
+same page cache.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+from pathlib import Path
+from typing import (
+    IO,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NoReturn,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import networkx as nx
+import numpy as np
+
+from app.backends.compact import (
+    _CHANNEL,
+    _COLUMN_INDEX,
+    _COLUMNS,
+    _INT_SHIFT,
+    _ISO_TIMESTAMP,
+    _NUMERIC_COLUMNS,
+    _TIMESTAMP,
+    EDGE_COLUMNS,
+    CompactEdgeView,
+    CompactGraphBackend,
+    _format_utc_iso,
+)
+from app.backends.graph_backend import EdgeRecord, GraphBackend
+from app.backends.loader import LoadReport, load_jsonl
+
+MAGIC = b"BTGRAPH\x00"
+FORMAT_VERSION = 2
+_PREAMBLE = struct.Struct("<8sII")
+_ALIGN = 64
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def write_graph_snapshot(backend: CompactGraphBackend, path: Union[str, Path]) -> Dict[str, int]:
+    """Write ``backend`` to ``path`` atomically; returns node, edge and byte counts."""
+
+    nodes, edges = len(backend._ids), len(backend._target)
+    sources = np.frombuffer(backend._source, dtype=np.int32).astype(np.int64)
+    targets = np.frombuffer(backend._target, dtype=np.int32).astype(np.int64)
+
+    # Edge ids follow insertion order, so a stable sort keeps per-node edge order.
+    order = np.argsort(sources, kind="stable")
+    csr_position = np.empty(edges, dtype=np.int64)
+    csr_position[order] = np.arange(edges, dtype=np.int64)
+    reverse = np.argsort(targets, kind="stable")
+
+    flags = np.frombuffer(backend._flags, dtype=np.uint16)[order]
+    amounts = np.frombuffer(backend._numbers[0], dtype=np.float64)[order]
+    amount_keys = np.where(flags & 1, amounts, 0.0)
+    csr_sources = sources[order]
+    amount_order = np.lexsort((amount_keys, csr_sources))
+
+    encoded_ids = [node_id.encode("utf-8") for node_id in backend._ids]
+    id_offsets = np.zeros(nodes + 1, dtype=np.int64)
+    np.cumsum([len(raw) for raw in encoded_ids], out=id_offsets[1:])
+    id_sorted = sorted(range(nodes), key=encoded_ids.__getitem__)
+
+    sections: Dict[str, np.ndarray] = {
+        "id_offsets": id_offsets,
+        "id_bytes": np.frombuffer(b"".join(encoded_ids), dtype=np.uint8),
+        "id_sorted": np.asarray(id_sorted, dtype="<i4"),
+        "out_offsets": _offsets(csr_sources, nodes),
+        "out_targets": targets[order].astype("<i4"),
+        "in_offsets": _offsets(targets[reverse], nodes),
+        "in_sources": sources[reverse].astype("<i4"),
+        "amount_order": amount_order.astype("<i4"),
+        "amount_keys": amount_keys[amount_order].astype("<f8"),
+        "channel": np.frombuffer(backend._channel, dtype=np.uint16)[order].astype("<u2"),
+        "flags": flags.astype("<u2"),
+    }
+    for name, column in zip(_NUMERIC_COLUMNS, backend._numbers):
+        sections[name] = np.frombuffer(column, dtype=np.float64)[order].astype("<f8")
+    if backend._node_attrs:
+        sections["node_attrs"] = _json_section(
+            {str(node): attrs for node, attrs in backend._node_attrs.items()}
+        )
+    extras = {int(csr_position[edge]): attrs for edge, attrs in backend._extras()}
+    if extras:
+        sections["extra_offsets"], sections["extra_bytes"] = _extra_sections(extras, edges)
+
+    directory: Dict[str, List[Any]] = {}
+    offset = 0
+    for name, array in sections.items():
+        directory[name] = [array.dtype.str, offset, int(array.shape[0])]
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps(
+        {"nodes": nodes, "edges": edges, "channels": backend._channels, "sections": directory},
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+    path = Path(path)
+    staging = path.with_name(path.name + ".tmp")
+    data_start = _aligned(_PREAMBLE.size + len(header))
+    with open(staging, "wb") as handle:
+        handle.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        handle.write(header)
+        for name, array in sections.items():
+            handle.seek(data_start + directory[name][1])
+            handle.write(array.tobytes())
+        handle.truncate(data_start + offset)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(staging, path)
+    return {"nodes": nodes, "edges": edges, "bytes": data_start + offset}
+
+
+def build_graph_snapshot(
+    source: Union[str, Path, IO[str]],
+    path: Union[str, Path],
+    batch_size: int = 50_000,
+    fields: Optional[Sequence[str]] = EDGE_COLUMNS,
+) -> Tuple[LoadReport, Dict[str, int]]:
+    """Load a JSONL transaction file into a compact graph and snapshot it to ``path``.
+
+    ``fields`` selects the edge attributes kept, as for :func:`load_jsonl`.
+    """
+
+    backend = CompactGraphBackend()
+    report = load_jsonl(backend, source, batch_size=batch_size, fields=fields)
+    return report, write_graph_snapshot(backend, path)
+
+
+def _offsets(sorted_owners: np.ndarray, nodes: int) -> np.ndarray:
+    offsets = np.zeros(nodes + 1, dtype="<i8")
+    np.cumsum(np.bincount(sorted_owners, minlength=nodes), out=offsets[1:])
+    return offsets
+
+
+def _json_section(payload: Dict[str, Any]) -> np.ndarray:
+    return np.frombuffer(json.dumps(payload, default=str).encode("utf-8"), dtype=np.uint8)
+
+
+def _extra_sections(extras: Dict[int, Dict[str, Any]], edges: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-edge JSON objects for ``extras`` (by CSR position) and their byte offsets."""
+
+    encoded = [
+        json.dumps(extras[edge], default=str).encode("utf-8") if edge in extras else b""
+        for edge in range(edges)
+    ]
+    offsets = np.zeros(edges + 1, dtype="<i8")
+    np.cumsum([len(raw) for raw in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+class MmapGraphBackend(GraphBackend):
+    """Read-only backend served straight from a memory-mapped graph snapshot.
+
+    Opening a snapshot maps the file and wraps each section in a NumPy view; no
+    per-node or per-edge Python objects are created up front, so startup cost
+    does not grow with the graph. Node IDs are resolved by binary search over the
+    sorted ID table. Writes raise ``NotImplementedError``: rebuild the snapshot
+    (or load it into a mutable backend) to change the graph.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with open(self.path, "rb") as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, header_length = _PREAMBLE.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a BridgeTrace graph snapshot")
+        if version != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported graph snapshot version {version} (expected {FORMAT_VERSION})"
+            )
+        header = json.loads(self._mmap[_PREAMBLE.size : _PREAMBLE.size + header_length])
+        data_start = _aligned(_PREAMBLE.size + header_length)
+
+        self._nodes = header["nodes"]
+        self._edges = header["edges"]
+        self._channels: List[str] = header["channels"]
+        # Code 0 marks an edge without a stored channel.
+        self._channel_codes = {name: code for code, name in enumerate(self._channels) if code}
+        self._sections = {
+            name: np.frombuffer(self._mmap, dtype=dtype, count=count, offset=data_start + offset)
+            for name, (dtype, offset, count) in header["sections"].items()
+        }
+        self._id_base = data_start + header["sections"]["id_bytes"][1]
+        extra_bytes = header["sections"].get("extra_bytes")
+        self._extra_base = None if extra_bytes is None else data_start + extra_bytes[1]
+        self._numbers = tuple(self._sections[name] for name in _NUMERIC_COLUMNS)
+        self._blobs: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def format_version(self) -> int:
+        return FORMAT_VERSION
+
+    def add_node(self, node_id: str, **attrs: Any) -> None:
+        self._read_only()
+
+    def add_edge(self, source_id: str, target_id: str, **attrs: Any) -> None:
+        self._read_only()
+
+    def add_edges_bulk(self, edges: Iterable[EdgeRecord]) -> int:
+        self._read_only()
+
+    def successors(self, node_id: str) -> List[str]:
+        start, end = self._out_range(self._node(node_id))
+        return [self._id(int(target)) for target in self._sections["out_targets"][start:end]]
+
+    def predecessors(self, node_id: str) -> List[str]:
+        node = self._node(node_id)
+        offsets = self._sections["in_offsets"]
+        sources = self._sections["in_sources"][int(offsets[node]) : int(offsets[node + 1])]
+        return [self._id(int(source)) for source in sources]
+
+    def get_edge(self, source_id: str, target_id: str) -> Dict[str, Any]:
+        return dict(self.edge_view(source_id, target_id))
+
+    def edge_view(self, source_id: str, target_id: str) -> Mapping[str, Any]:
+        start, end = self._out_range(self._node(source_id))
+        matches = np.flatnonzero(self._sections["out_targets"][start:end] == self._node(target_id))
+        if matches.size == 0:
+            raise KeyError((source_id, target_id))
+        return CompactEdgeView(self, start + int(matches[0]))
+
+    def successors_with_edges(
+        self,
+        node_id: str,
+        min_amount: float = 0.0,
+        start: int = 0,
+        channel: Optional[str] = None,
+    ) -> Iterator[Tuple[str, Mapping[str, Any]]]:
+        """Qualifying out-edges, largest amount first, from the precomputed amount order.
+
+        ``channel`` is applied to the channel column in one vectorised pass.
+        """
+
+        first, end = self._out_range(self._node(node_id))
+        lowest = first + int(np.searchsorted(self._sections["amount_keys"][first:end], min_amount))
+        order, targets = self._sections["amount_order"], self._sections["out_targets"]
+        if channel is None:
+            edges = order[lowest : end - start][::-1]
+        else:
+            candidates = order[lowest:end]
+            code = self._channel_codes.get(channel, -1)
+            edges = candidates[self._sections["channel"][candidates] == code][::-1][start:]
+        for edge in edges.tolist():
+            yield self._id(int(targets[edge])), CompactEdgeView(self, edge)
+
+    def nodes_by_attribute(self, name: str, value: Any) -> List[str]:
+        node_attrs = self._blob("node_attrs")
+        return [
+            self._id(int(node)) for node, attrs in node_attrs.items() if attrs.get(name) == value
+        ]
+
+    def has_node(self, node_id: str) -> bool:
+        return self._lookup(node_id) is not None
+
+    def size(self) -> Dict[str, int]:
+        return {"nodes": self._nodes, "edges": self._edges}
+
+    def neighbors_with_edges(self, node_id: str) -> Dict[str, Any]:
+        start, end = self._out_range(self._node(node_id))
+        targets = self._sections["out_targets"]
+        outgoing = [
+            {"target": self._id(int(targets[edge])), "edge": dict(CompactEdgeView(self, edge))}
+            for edge in range(start, end)
+        ]
+        return {"entity": node_id, "outgoing": outgoing}
+
+    def to_networkx(self) -> nx.DiGraph:
+        graph = nx.DiGraph()
+        node_attrs = self._blob("node_attrs")
+        for node in range(self._nodes):
+            graph.add_node(self._id(node), **node_attrs.get(str(node), {}))
+        targets, offsets = self._sections["out_targets"], self._sections["out_offsets"]
+        for node in range(self._nodes):
+            source_id = self._id(node)
+            for edge in range(int(offsets[node]), int(offsets[node + 1])):
+                graph.add_edge(
+                    source_id, self._id(int(targets[edge])), **dict(CompactEdgeView(self, edge))
+                )
+        return graph
+
+    def load_compact(self) -> CompactGraphBackend:
+        """Copy the snapshot into a mutable :class:`CompactGraphBackend`."""
+
+        backend = CompactGraphBackend()
+        node_attrs = self._blob("node_attrs")
+        for node in range(self._nodes):
+            backend.add_node(self._id(node), **node_attrs.get(str(node), {}))
+        targets, offsets = self._sections["out_targets"], self._sections["out_offsets"]
+        backend.add_edges_bulk(
+            (self._id(node), self._id(int(targets[edge])), CompactEdgeView(self, edge))
+            for node in range(self._nodes)
+            for edge in range(int(offsets[node]), int(offsets[node + 1]))
+        )
+        return backend
+
+    def close(self) -> None:
+        self._sections.clear()
+        self._numbers = ()
+        self._mmap.close()
+
+    def _read_only(self) -> NoReturn:
+        raise NotImplementedError(
+            "Graph snapshots are read-only; rebuild the snapshot to change them"
+        )
+
+    def _id(self, node: int) -> str:
+        offsets = self._sections["id_offsets"]
+        start = self._id_base + int(offsets[node])
+        return self._mmap[start : self._id_base + int(offsets[node + 1])].decode("utf-8")
+
+    def _lookup(self, node_id: str) -> Optional[int]:
+        wanted = node_id.encode("utf-8")
+        order, offsets = self._sections["id_sorted"], self._sections["id_offsets"]
+        low, high = 0, self._nodes
+        while low < high:
+            middle = (low + high) // 2
+            node = int(order[middle])
+            current = self._mmap[
+                self._id_base + int(offsets[node]) : self._id_base + int(offsets[node + 1])
+            ]
+            if current < wanted:
+                low = middle + 1
+            elif current > wanted:
+                high = middle
+            else:
+                return node
+        return None
+
+    def _node(self, node_id: str) -> int:
+        node = self._lookup(node_id)
+        if node is None:
+            raise KeyError(node_id)
+        return node
+
+    def _out_range(self, node: int) -> Tuple[int, int]:
+        offsets = self._sections["out_offsets"]
+        return int(offsets[node]), int(offsets[node + 1])
+
+    def _blob(self, name: str) -> Dict[str, Any]:
+        if name not in self._blobs:
+            section = self._sections.get(name)
+            self._blobs[name] = json.loads(section.tobytes()) if section is not None else {}
+        return self._blobs[name]
+
+    def _edge_value(self, edge: int, name: str) -> Any:
+        col = _COLUMN_INDEX.get(name)
+        if col is not None:
+            flags = int(self._sections["flags"][edge])
+            if flags & (1 << col):
+                if col == _CHANNEL:
+                    return self._channels[int(self._sections["channel"][edge])]
+                value = float(self._numbers[col][edge])
+                if flags & (1 << (_INT_SHIFT + col)):
+                    return int(value)
+                if col == _TIMESTAMP and flags & _ISO_TIMESTAMP:
+                    return _format_utc_iso(value)
+                return value
+        extra = self._edge_extra(edge)
+        if name in extra:
+            return extra[name]
+        raise KeyError(name)
+
+    def _edge_keys(self, edge: int) -> List[str]:
+        flags = int(self._sections["flags"][edge])
+        keys = [name for col, name in enumerate(_COLUMNS) if flags & (1 << col)]
+        keys.extend(self._edge_extra(edge))
+        return keys
+
+    def _edge_extra(self, edge: int) -> Dict[str, Any]:
+        """Non-column attributes of ``edge``, decoded from its own slice of ``extra_bytes``."""
+
+        if self._extra_base is None:
+            return {}
+        offsets = self._sections["extra_offsets"]
+        start, end = int(offsets[edge]), int(offsets[edge + 1])
+        if start == end:
+            return {}
+        return json.loads(self._mmap[self._extra_base + start : self._extra_base + end])
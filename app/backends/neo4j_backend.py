@@ -0,0 +1,245 @@
+"""Neo4j graph backend with batched writes and cached adjacency."""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Mapping
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import networkx as nx
+
+from app.backends.adjacency_cache import AdjacencyCache, CachedAdjacency
+from app.backends.graph_backend import EdgeRecord, GraphBackend
+
+try:
+    from neo4j import GraphDatabase
+except ImportError:  # pragma: no cover - exercised only without the optional extra
+    GraphDatabase = None
+
+_READ, _WRITE = "r", "w"
+
+# Each query starts with a "// name" line so logs and test doubles can tell them apart.
+# MERGE on Entity.id needs this index to be a lookup instead of a label scan.
+_ENTITY_ID_CONSTRAINT = """// entity_id_constraint
+CREATE CONSTRAINT entity_id IF NOT EXISTS FOR (n:Entity) REQUIRE n.id IS UNIQUE"""
+
+_MERGE_NODE = """// merge_node
+MERGE (n:Entity {id: $id}) SET n += $attrs"""
+
+_MERGE_EDGES = """// merge_edges
+UNWIND $rows AS row
+MERGE (a:Entity {id: row.source})
+MERGE (b:Entity {id: row.target})
+MERGE (a)-[r:TRANSFER]->(b)
+SET r += row.attrs"""
+
+_ADJACENCY = """// adjacency
+UNWIND $ids AS node_id
+MATCH (n:Entity {id: node_id})
+OPTIONAL MATCH (n)-[r:TRANSFER]->(m:Entity)
+RETURN n.id AS node, collect(CASE WHEN m IS NULL THEN NULL ELSE [m.id, properties(r)] END) AS edges"""
+
+_NODES_BY_ATTRIBUTE = """// nodes_by_attribute
+MATCH (n:Entity) WHERE n[$name] = $value
+RETURN n.id AS node"""
+
+_PREDECESSORS = """// predecessors
+MATCH (a:Entity)-[:TRANSFER]->(b:Entity {id: $id})
+RETURN a.id AS node"""
+
+_SIZE = """// size
+CALL { MATCH (n:Entity) RETURN count(n) AS nodes }
+CALL { MATCH (:Entity)-[r:TRANSFER]->(:Entity) RETURN count(r) AS edges }
+RETURN nodes, edges"""
+
+_NODES = """// nodes
+MATCH (n:Entity) RETURN n.id AS node, properties(n) AS attrs"""
+
+_EDGES = """// edges
+MATCH (a:Entity)-[r:TRANSFER]->(b:Entity)
+RETURN a.id AS source, b.id AS target, properties(r) AS attrs"""
+
+
+class Neo4jGraphBackend(GraphBackend):
+    """Graph backend stored in Neo4j as ``(:Entity {id})-[:TRANSFER]->(:Entity)``.
+
+    All queries go through ``driver.execute_query``, which borrows a session from
+    the driver's connection pool. Bulk edges are written ``batch_size`` rows per
+    ``UNWIND`` statement. Out-adjacency is cached read-through in an LRU of
+    ``cache_size`` nodes for ``cache_ttl`` seconds and invalidated by this
+    instance's own writes; :meth:`prefetch` loads every node a trace can reach one
+    hop level per query, so the walk itself runs from the cache. The uniqueness
+    constraint on ``Entity.id`` that backs every ``MERGE`` is created on start.
+
+    ``epoch`` counts writes made through this instance only. Neo4j does not
+    record relationship insertion order, so per-node edge order is storage order.
+    """
+
+    def __init__(
+        self,
+        uri: Optional[str] = None,
+        auth: Optional[Tuple[str, str]] = None,
+        database: Optional[str] = None,
+        driver: Any = None,
+        max_pool_size: int = 50,
+        batch_size: int = 5_000,
+        cache_size: int = 50_000,
+        cache_ttl: float = 5.0,
+    ):
+        if driver is None:
+            if GraphDatabase is None:
+                raise ImportError(
+                    "Neo4jGraphBackend requires the 'neo4j' package (pip install neo4j)"
+                )
+            driver = GraphDatabase.driver(uri, auth=auth, max_connection_pool_size=max_pool_size)
+        self.uri = uri
+        self.driver = driver
+        self.database = database
+        self.batch_size = batch_size
+
+        self._epoch = 0
+        self._cache = AdjacencyCache(cache_size, ttl=cache_ttl)
+        self._local = threading.local()
+        self._run(_ENTITY_ID_CONSTRAINT, _WRITE)
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+
+    @property
+    def round_trips(self) -> int:
+        return getattr(self._local, "round_trips", 0)
+
+    def add_node(self, node_id: str, **attrs: Any) -> None:
+        self._run(_MERGE_NODE, _WRITE, id=node_id, attrs=attrs)
+        self._epoch += 1
+
+    def add_edge(self, source_id: str, target_id: str, **attrs: Any) -> None:
+        self.add_edges_bulk([(source_id, target_id, attrs)])
+
+    def add_edges_bulk(self, edges: Iterable[EdgeRecord]) -> int:
+        count = 0
+        rows: Iterator[Dict[str, Any]] = (
+            {"source": s, "target": t, "attrs": dict(attrs)} for s, t, attrs in edges
+        )
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            self._run(_MERGE_EDGES, _WRITE, rows=batch)
+            self._cache.invalidate(row["source"] for row in batch)
+            count += len(batch)
+        self._epoch += 1
+        return count
+
+    def successors(self, node_id: str) -> List[str]:
+        return list(self._adjacency(node_id).edges)
+
+    def predecessors(self, node_id: str) -> List[str]:
+        self._adjacency(node_id)
+        return [record["node"] for record in self._run(_PREDECESSORS, _READ, id=node_id)]
+
+    def get_edge(self, source_id: str, target_id: str) -> Dict[str, Any]:
+        return dict(self.edge_view(source_id, target_id))
+
+    def edge_view(self, source_id: str, target_id: str) -> Mapping[str, Any]:
+        return self._adjacency(source_id).edges[target_id]
+
+    def successors_with_edges(
+        self,
+        node_id: str,
+        min_amount: float = 0.0,
+        start: int = 0,
+        channel: Optional[str] = None,
+    ) -> Iterator[Tuple[str, Mapping[str, Any]]]:
+        """Qualifying out-edges, largest amount first, from the cached adjacency."""
+
+        return self._adjacency(node_id).successors_with_edges(min_amount, start, channel)
+
+    def nodes_by_attribute(self, name: str, value: Any) -> List[str]:
+        records = self._run(_NODES_BY_ATTRIBUTE, _READ, name=name, value=value)
+        return [record["node"] for record in records]
+
+    def prefetch(
+        self,
+        source_id: str,
+        max_hops: int,
+        min_amount: float = 0.0,
+        channel: Optional[str] = None,
+    ) -> None:
+        """Load the out-edges of every node a trace can reach, one hop level per query.
+
+        Each level fetches only the distinct nodes first reached at that level
+        that are not already cached, so a hub costs one row per neighbour instead
+        of one per path through it. Nodes up to ``max_hops - 1`` away are the ones
+        whose out-edges a trace reads.
+        """
+
+        frontier, seen = [source_id], {source_id}
+        for _ in range(max(int(max_hops), 1)):
+            level = {node_id: self._cache.get(node_id) for node_id in frontier}
+            missing = [node_id for node_id, cached in level.items() if cached is None]
+            if missing:
+                level.update(self._store(self._run(_ADJACENCY, _READ, ids=missing)))
+            frontier = []
+            for adjacency in level.values():
+                if adjacency is None:
+                    continue
+                for target, _edge in adjacency.successors_with_edges(min_amount, 0, channel):
+                    if target not in seen:
+                        seen.add(target)
+                        frontier.append(target)
+            if not frontier:
+                break
+
+    def has_node(self, node_id: str) -> bool:
+        try:
+            self._adjacency(node_id)
+        except KeyError:
+            return False
+        return True
+
+    def size(self) -> Dict[str, int]:
+        record = self._run(_SIZE, _READ)[0]
+        return {"nodes": record["nodes"], "edges": record["edges"]}
+
+    def neighbors_with_edges(self, node_id: str) -> Dict[str, Any]:
+        outgoing = [
+            {"target": target, "edge": dict(edge)}
+            for target, edge in self._adjacency(node_id).edges.items()
+        ]
+        return {"entity": node_id, "outgoing": outgoing}
+
+    def to_networkx(self) -> nx.DiGraph:
+        graph = nx.DiGraph()
+        for record in self._run(_NODES, _READ):
+            attrs = {key: value for key, value in record["attrs"].items() if key != "id"}
+            graph.add_node(record["node"], **attrs)
+        graph.add_edges_from(
+            (record["source"], record["target"], record["attrs"])
+            for record in self._run(_EDGES, _READ)
+        )
+        return graph
+
+    def close(self) -> None:
+        self.driver.close()
+
+    def _run(self, query: str, routing: str, **parameters: Any) -> List[Any]:
+        self._local.round_trips = self.round_trips + 1
+        records, _, _ = self.driver.execute_query(
+            query, parameters, routing_=routing, database_=self.database
+        )
+        return records
+
+    def _adjacency(self, node_id: str) -> CachedAdjacency:
+        cached = self._cache.get(node_id)
+        if cached is not None:
+            return cached
+        loaded = self._store(self._run(_ADJACENCY, _READ, ids=[node_id]))
+        if node_id not in loaded:
+            raise KeyError(node_id)
+        return loaded[node_id]
+
+    def _store(self, records: List[Any]) -> Dict[str, CachedAdjacency]:
+        return self._cache.store((record["node"], record["edges"]) for record in records)
@@ -0,0 +1,532 @@
+"""Hash-partitioned graph backend spread over local worker processes."""
+
+from __future__ import annotations
+
+import itertools
+import multiprocessing
+import threading
+import zlib
+from collections.abc import Mapping
+from contextlib import ExitStack
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import networkx as nx
+
+from app.backends.adjacency_cache import AdjacencyCache, CachedAdjacency
+from app.backends.graph_backend import EdgeRecord, GraphBackend
+from app.metrics import record_shard_messages
+
+# (target, signal, dominant source, traversal rank); the rank orders ties like the CSR engine.
+_Candidate = Tuple[str, float, str, Tuple[int, ...]]
+
+
+def shard_of(node_id: str, shards: int) -> int:
+    """Owning shard of ``node_id``; stable across processes, unlike ``hash``."""
+
+    return zlib.crc32(node_id.encode("utf-8")) % shards
+
+
+class _Propagation:
+    """Per-query propagation state for the nodes one shard owns."""
+
+    def __init__(self, decay: float, min_signal: float, default_transfer: float):
+        self.decay = decay
+        self.min_signal = min_signal
+        self.default_transfer = default_transfer
+        self.stored: Dict[str, float] = {}
+        self.values: Dict[str, float] = {}
+        self.sources: Dict[str, str] = {}
+        self.propagated: set = set()
+
+
+class _ShardStore:
+    """Nodes owned by one shard: attributes, out-edges and in-neighbour IDs.
+
+    An edge lives with its source; its target's shard records the source as a
+    predecessor. Runs inside the shard process and is driven by :func:`_serve`.
+    """
+
+    def __init__(self, shard: int, shards: int):
+        self.shard = shard
+        self.shards = shards
+        self.attrs: Dict[str, Dict[str, Any]] = {}
+        self.succ: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.pred: Dict[str, Dict[str, None]] = {}
+        self.edges = 0
+        self._runs: Dict[int, _Propagation] = {}
+
+    def write(
+        self,
+        nodes: List[Tuple[str, Dict[str, Any]]],
+        edges: List[EdgeRecord],
+        preds: List[Tuple[str, str]],
+    ) -> None:
+        for node_id, attrs in nodes:
+            self._own(node_id).update(attrs)
+        for source_id, target_id, edge_attrs in edges:
+            self._own(source_id)
+            edge = self.succ[source_id].get(target_id)
+            if edge is None:
+                self.succ[source_id][target_id] = dict(edge_attrs)
+                self.edges += 1
+            else:
+                edge.update(edge_attrs)
+        for target_id, source_id in preds:
+            self._own(target_id)
+            self.pred[target_id][source_id] = None
+
+    def adjacency(self, node_ids: List[str]) -> List[Tuple[str, List[Tuple[str, Dict[str, Any]]]]]:
+        succ = self.succ
+        return [(node_id, list(succ[node_id].items())) for node_id in node_ids if node_id in succ]
+
+    def predecessors(self, node_id: str) -> List[str]:
+        return list(self.pred[node_id])
+
+    def has_node(self, node_id: str) -> bool:
+        return node_id in self.attrs
+
+    def size(self) -> Tuple[int, int]:
+        return len(self.attrs), self.edges
+
+    def nodes_by_attribute(self, name: str, value: Any) -> List[str]:
+        return [node_id for node_id, attrs in self.attrs.items() if attrs.get(name) == value]
+
+    def dump(self) -> Tuple[List[Tuple[str, Dict[str, Any]]], List[EdgeRecord]]:
+        edges: List[EdgeRecord] = [
+            (source_id, target_id, attrs)
+            for source_id, out in self.succ.items()
+            for target_id, attrs in out.items()
+        ]
+        return list(self.attrs.items()), edges
+
+    def seed(
+        self,
+        run: int,
+        seeds: List[Tuple[Tuple[int, ...], str, float]],
+        expand: bool,
+        decay: float,
+        min_signal: float,
+        default_transfer: float,
+    ) -> Dict[int, List[_Candidate]]:
+        """Start propagation run ``run`` from the owned ``seeds``; returns hop-1 candidates."""
+
+        state = self._runs[run] = _Propagation(decay, min_signal, default_transfer)
+        frontier = []
+        for rank, node_id, score in seeds:
+            if node_id in self.attrs:
+                state.values[node_id] = state.stored[node_id] = max(0.0, score)
+                state.sources[node_id] = node_id
+                frontier.append((rank, node_id, float(score), node_id))
+        return self._expand(state, frontier) if expand else {}
+
+    def relax(
+        self, run: int, candidates: List[_Candidate], expand: bool
+    ) -> Dict[int, List[_Candidate]]:
+        """Apply one hop of candidates to owned targets and expand the nodes that improved.
+
+        Each target keeps its strongest candidate, the earliest-ranked on ties, and
+        advances only if that beats its stored (rounded) score, as the CSR engine does.
+        """
+
+        state = self._runs[run]
+        best: Dict[str, Tuple[float, str, Tuple[int, ...]]] = {}
+        for target_id, value, source_id, rank in candidates:
+            current = best.get(target_id)
+            if current is None or value > current[0] or (value == current[0] and rank < current[2]):
+                best[target_id] = (value, source_id, rank)
+
+        frontier = []
+        for target_id, (value, source_id, rank) in best.items():
+            if value > state.stored.get(target_id, 0.0):
+                state.stored[target_id] = round(value, 4)
+                state.values[target_id] = value
+                state.sources[target_id] = source_id
+                state.propagated.add(target_id)
+                frontier.append((rank, target_id, value, source_id))
+        frontier.sort()
+        return self._expand(state, frontier) if expand else {}
+
+    def collect(self, run: int) -> Tuple[List[str], List[Tuple[str, float, str]]]:
+        """Finish run ``run``: every owned node ID plus ``(node, score, source)`` for reached ones."""
+
+        state = self._runs.pop(run, None)
+        if state is None:
+            return list(self.attrs), []
+        reached = [
+            (
+                node_id,
+                round(value, 4) if node_id in state.propagated else value,
+                state.sources[node_id],
+            )
+            for node_id, value in state.values.items()
+        ]
+        return list(self.attrs), reached
+
+    def _expand(
+        self,
+        state: _Propagation,
+        frontier: List[Tuple[Tuple[int, ...], str, float, str]],
+    ) -> Dict[int, List[_Candidate]]:
+        outbox: Dict[int, List[_Candidate]] = {}
+        for rank, node_id, risk, source_id in frontier:
+            for position, (target_id, edge) in enumerate(self.succ[node_id].items()):
+                value = (
+                    risk * float(edge.get("risk_transfer", state.default_transfer)) * state.decay
+                )
+                if value >= state.min_signal:
+                    owner = shard_of(target_id, self.shards)
+                    candidate = (target_id, value, source_id, rank + (position,))
+                    outbox.setdefault(owner, []).append(candidate)
+        return outbox
+
+    def _own(self, node_id: str) -> Dict[str, Any]:
+        attrs = self.attrs.get(node_id)
+        if attrs is None:
+            attrs = self.attrs[node_id] = {}
+            self.succ[node_id] = {}
+            self.pred[node_id] = {}
+        return attrs
+
+
+def _serve(conn: Any, shard: int, shards: int) -> None:
+    """Shard process main loop: answer ``(command, args)`` requests until ``close``."""
+
+    store = _ShardStore(shard, shards)
+    while True:
+        try:
+            command, args = conn.recv()
+        except EOFError:
+            break
+        if command == "close":
+            conn.send((True, None))
+            break
+        try:
+            reply = (True, getattr(store, command)(*args))
+        except Exception as exc:  # returned to the coordinator and re-raised there
+            reply = (False, exc)
+        conn.send(reply)
+    conn.close()
+
+
+class ShardedGraphBackend(GraphBackend):
+    """Graph backend hash-partitioned across ``shards`` local worker processes.
+
+    Node ``n`` is owned by shard ``crc32(n) % shards``, which stores its
+    attributes, its out-edges and the IDs of its in-neighbours; writes are routed
+    to the owners over pipes. Queries run level-synchronously: each hop is one
+    scatter-gather exchange in which every shard holding part of the frontier
+    receives one batch and the coordinator routes what comes back to the next
+    hop's owners. :meth:`prefetch` loads a trace's reachable adjacency that way
+    into a coordinator-side cache, and :meth:`propagate` runs risk propagation
+    inside the shards.
+
+    Each query's frontier volume (``messages``) and the part of it that crossed
+    shards (``cross_shard_messages``) are kept in :attr:`last_query` for the
+    calling thread and exported as the ``graph_shard_messages`` histogram.
+    """
+
+    def __init__(self, shards: int = 4, start_method: str = "spawn", cache_size: int = 50_000):
+        if shards < 1:
+            raise ValueError("ShardedGraphBackend needs at least one shard")
+        self.shards = shards
+        # Typed Any: the stubs declare Process on each concrete context, not on BaseContext.
+        context: Any = multiprocessing.get_context(start_method)
+        self._pipes = []
+        self._processes = []
+        for shard in range(shards):
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=_serve, args=(child, shard, shards), name=f"graph-shard-{shard}", daemon=True
+            )
+            process.start()
+            child.close()
+            self._pipes.append(parent)
+            self._processes.append(process)
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._write_lock = threading.Lock()
+        self._cache = AdjacencyCache(cache_size)
+        self._runs = itertools.count()
+        self._epoch = 0
+        self._local = threading.local()
+        self._closed = False
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+
+    @property
+    def round_trips(self) -> int:
+        return getattr(self._local, "round_trips", 0)
+
+    @property
+    def last_query(self) -> Dict[str, int]:
+        """``levels``, ``messages`` and ``cross_shard_messages`` of this thread's last query."""
+
+        return dict(getattr(self._local, "last_query", {}))
+
+    def shard_of(self, node_id: str) -> int:
+        return shard_of(node_id, self.shards)
+
+    def add_node(self, node_id: str, **attrs: Any) -> None:
+        with self._write_lock:
+            self._exchange({self.shard_of(node_id): ("write", ([(node_id, attrs)], [], []))})
+            self._epoch += 1
+
+    def add_edge(self, source_id: str, target_id: str, **attrs: Any) -> None:
+        self.add_edges_bulk([(source_id, target_id, attrs)])
+
+    def add_edges_bulk(self, edges: Iterable[EdgeRecord]) -> int:
+        """Send each record to its source's shard and its reverse link to the target's shard."""
+
+        out: Dict[int, List[EdgeRecord]] = {}
+        preds: Dict[int, List[Tuple[str, str]]] = {}
+        for source_id, target_id, attrs in edges:
+            out.setdefault(self.shard_of(source_id), []).append((source_id, target_id, dict(attrs)))
+            preds.setdefault(self.shard_of(target_id), []).append((target_id, source_id))
+        requests: Dict[int, Tuple[str, Tuple[Any, ...]]] = {
+            shard: ("write", ([], out.get(shard, []), preds.get(shard, [])))
+            for shard in out.keys() | preds.keys()
+        }
+        with self._write_lock:
+            self._exchange(requests)
+            # Bump before invalidating so a concurrent read that fetched the old
+            # adjacency notices the write and drops what it cached.
+            self._epoch += 1
+            self._cache.invalidate(source_id for batch in out.values() for source_id, _, _ in batch)
+        return sum(len(batch) for batch in out.values())
+
+    def successors(self, node_id: str) -> List[str]:
+        return list(self._adjacency(node_id).edges)
+
+    def predecessors(self, node_id: str) -> List[str]:
+        return self._call(node_id, "predecessors", node_id)
+
+    def get_edge(self, source_id: str, target_id: str) -> Dict[str, Any]:
+        return dict(self.edge_view(source_id, target_id))
+
+    def edge_view(self, source_id: str, target_id: str) -> Mapping[str, Any]:
+        return self._adjacency(source_id).edges[target_id]
+
+    def successors_with_edges(
+        self,
+        node_id: str,
+        min_amount: float = 0.0,
+        start: int = 0,
+        channel: Optional[str] = None,
+    ) -> Iterator[Tuple[str, Mapping[str, Any]]]:
+        return self._adjacency(node_id).successors_with_edges(min_amount, start, channel)
+
+    def nodes_by_attribute(self, name: str, value: Any) -> List[str]:
+        replies = self._exchange(self._broadcast("nodes_by_attribute", name, value))
+        return [node_id for shard in sorted(replies) for node_id in replies[shard]]
+
+    def prefetch(
+        self,
+        source_id: str,
+        max_hops: int,
+        min_amount: float = 0.0,
+        channel: Optional[str] = None,
+    ) -> None:
+        """Load the adjacency of every node a trace can read, one exchange per hop.
+
+        Nodes up to ``max_hops - 1`` qualifying edges away are fetched from their
+        owners level by level; nodes already cached are expanded without a fetch.
+        """
+
+        stats = {"levels": 0, "messages": 0, "cross_shard_messages": 0}
+        frontier, seen = [source_id], {source_id}
+        for level in range(max(int(max_hops), 1)):
+            adjacency = self._load(frontier)
+            stats["levels"] += 1
+            if level == max_hops - 1:
+                break
+            frontier = []
+            for node_id, cached in adjacency.items():
+                owner = self.shard_of(node_id)
+                for target_id, _ in cached.successors_with_edges(min_amount, channel=channel):
+                    if target_id not in seen:
+                        seen.add(target_id)
+                        frontier.append(target_id)
+                        stats["messages"] += 1
+                        stats["cross_shard_messages"] += self.shard_of(target_id) != owner
+            if not frontier:
+                break
+        self._report("prefetch", stats)
+
+    def propagate(
+        self,
+        seed_scores: Dict[str, float],
+        max_hops: int = 4,
+        decay: float = 0.7,
+        min_signal: float = 0.01,
+        default_transfer: float = 0.8,
+    ) -> Tuple[Dict[str, float], Dict[str, str], Dict[str, int]]:
+        """Hop-synchronous max-product risk propagation run inside the shards.
+
+        Returns ``(scores, dominant_source, stats)`` with the semantics of the CSR
+        engine. Each hop is one exchange: shards relax the candidates sent to the
+        nodes they own, expand the nodes that improved and hand back the next
+        hop's candidates grouped by owning shard.
+        """
+
+        run = next(self._runs)
+        seeds: Dict[int, List[Tuple[Tuple[int, ...], str, float]]] = {
+            shard: [] for shard in range(self.shards)
+        }
+        for position, (node_id, score) in enumerate(seed_scores.items()):
+            seeds[self.shard_of(node_id)].append(((position,), node_id, score))
+
+        stats = {"levels": 0, "messages": 0, "cross_shard_messages": 0}
+        try:
+            replies = self._exchange(
+                {
+                    shard: ("seed", (run, batch, max_hops > 0, decay, min_signal, default_transfer))
+                    for shard, batch in seeds.items()
+                }
+            )
+            for hop in range(1, max_hops + 1):
+                inbox: Dict[int, List[_Candidate]] = {}
+                for sender, outbox in replies.items():
+                    for shard, candidates in outbox.items():
+                        inbox.setdefault(shard, []).extend(candidates)
+                        stats["messages"] += len(candidates)
+                        stats["cross_shard_messages"] += len(candidates) if shard != sender else 0
+                if not inbox:
+                    break
+                replies = self._exchange(
+                    {
+                        shard: ("relax", (run, candidates, hop < max_hops))
+                        for shard, candidates in inbox.items()
+                    }
+                )
+                stats["levels"] += 1
+        finally:
+            collected = self._exchange(self._broadcast("collect", run))
+
+        scores: Dict[str, float] = {}
+        dominant_source: Dict[str, str] = {}
+        for shard in sorted(collected):
+            node_ids, reached = collected[shard]
+            scores.update(dict.fromkeys(node_ids, 0.0))
+            for node_id, score, source_id in reached:
+                scores[node_id] = score
+                dominant_source[node_id] = source_id
+        self._report("propagate", stats)
+        return scores, dominant_source, stats
+
+    def has_node(self, node_id: str) -> bool:
+        return self._call(node_id, "has_node", node_id)
+
+    def size(self) -> Dict[str, int]:
+        sizes = self._exchange(self._broadcast("size")).values()
+        return {
+            "nodes": sum(nodes for nodes, _ in sizes),
+            "edges": sum(edges for _, edges in sizes),
+        }
+
+    def shard_sizes(self) -> List[Dict[str, int]]:
+        """Per-shard node and edge counts, to check partition balance."""
+
+        sizes = self._exchange(self._broadcast("size"))
+        return [
+            {"nodes": sizes[shard][0], "edges": sizes[shard][1]} for shard in range(self.shards)
+        ]
+
+    def neighbors_with_edges(self, node_id: str) -> Dict[str, Any]:
+        outgoing = [
+            {"target": target_id, "edge": dict(edge)}
+            for target_id, edge in self._adjacency(node_id).edges.items()
+        ]
+        return {"entity": node_id, "outgoing": outgoing}
+
+    def to_networkx(self) -> nx.DiGraph:
+        dumps = self._exchange(self._broadcast("dump"))
+        graph = nx.DiGraph()
+        for shard in sorted(dumps):
+            graph.add_nodes_from(dumps[shard][0])
+        for shard in sorted(dumps):
+            graph.add_edges_from(dumps[shard][1])
+        return graph
+
+    def close(self) -> None:
+        """Stop the shard processes; the graph they held is discarded."""
+
+        if self._closed:
+            return
+        self._closed = True
+        for pipe, process in zip(self._pipes, self._processes):
+            try:
+                pipe.send(("close", ()))
+                pipe.recv()
+            except (EOFError, OSError):
+                pass
+            pipe.close()
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+
+    def _adjacency(self, node_id: str) -> CachedAdjacency:
+        cached = self._cache.get(node_id)
+        if cached is not None:
+            return cached
+        loaded = self._load([node_id])
+        if node_id not in loaded:
+            raise KeyError(node_id)
+        return loaded[node_id]
+
+    def _load(self, node_ids: List[str]) -> Dict[str, CachedAdjacency]:
+        """Adjacency of ``node_ids`` from the cache, fetching misses in one exchange."""
+
+        found: Dict[str, CachedAdjacency] = {}
+        missing: Dict[int, List[str]] = {}
+        for node_id in node_ids:
+            cached = self._cache.get(node_id)
+            if cached is not None:
+                found[node_id] = cached
+            else:
+                missing.setdefault(self.shard_of(node_id), []).append(node_id)
+        if not missing:
+            return found
+
+        epoch = self._epoch
+        replies = self._exchange(
+            {shard: ("adjacency", (batch,)) for shard, batch in missing.items()}
+        )
+        loaded = self._cache.store(pair for shard in sorted(replies) for pair in replies[shard])
+        if self._epoch != epoch:
+            self._cache.invalidate(loaded)
+        found.update(loaded)
+        return found
+
+    def _call(self, node_id: str, command: str, *args: Any) -> Any:
+        shard = self.shard_of(node_id)
+        return self._exchange({shard: (command, args)})[shard]
+
+    def _broadcast(self, command: str, *args: Any) -> Dict[int, Tuple[str, Tuple[Any, ...]]]:
+        return {shard: (command, args) for shard in range(self.shards)}
+
+    def _exchange(self, requests: Dict[int, Tuple[str, Tuple[Any, ...]]]) -> Dict[int, Any]:
+        """Send one request to each listed shard, then gather every reply.
+
+        Shard locks are taken in shard order, so concurrent exchanges over
+        overlapping shards cannot deadlock.
+        """
+
+        if self._closed:
+            raise RuntimeError("ShardedGraphBackend is closed")
+        shards = sorted(requests)
+        with ExitStack() as stack:
+            for shard in shards:
+                stack.enter_context(self._locks[shard])
+            for shard in shards:
+                self._pipes[shard].send(requests[shard])
+            replies = {shard: self._pipes[shard].recv() for shard in shards}
+        self._local.round_trips = self.round_trips + 1
+        for ok, value in replies.values():
+            if not ok:
+                raise value
+        return {shard: value for shard, (_, value) in replies.items()}
+
+    def _report(self, operation: str, stats: Dict[str, int]) -> None:
+        self._local.last_query = stats
+        record_shard_messages(operation, stats["messages"], stats["cross_shard_messages"])
@@ -0,0 +1,470 @@
+"""Multi-version graph backend with snapshot-isolated reads."""
+
+from __future__ import annotations
+
+import heapq
+import threading
+from bisect import bisect_left
+from collections.abc import ItemsView, Mapping
+from itertools import islice
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, List, NoReturn, Optional, Tuple
+
+import networkx as nx
+
+from app.backends.graph_backend import AmountIndex, EdgeRecord, GraphBackend, amount_partitions
+
+_ATTRS, _SUCC, _PRED = 1, 2, 4
+_ALL = _ATTRS | _SUCC | _PRED
+# A delta smaller than this is never folded into its base.
+_MIN_DELTA = 32
+
+
+class _Run:
+    """Edges of one adjacency base, shared by every version holding it."""
+
+    __slots__ = ("edges", "index")
+
+    def __init__(self, edges: Dict[str, Mapping[str, Any]]):
+        self.edges = edges
+        self.index: Optional[Dict[Optional[str], AmountIndex]] = None
+
+    def partitions(self) -> Dict[Optional[str], AmountIndex]:
+        if self.index is None:
+            self.index = amount_partitions(self.edges.items())
+        return self.index
+
+
+_EMPTY_RUN = _Run({})
+
+
+class _Adjacency(Mapping):
+    """Persistent ``neighbour -> edge`` map: a shared base run plus recent writes.
+
+    A version that touches a node copies only its ``delta`` of recent writes, and
+    folds the delta into a fresh base once it outgrows ``sqrt(len(base))``, so a
+    write copies O(sqrt(degree)) entries amortised. The base's amount index is
+    built once and shared; only the delta is sorted per version. Iteration
+    follows insertion order, as for a dict.
+    """
+
+    __slots__ = ("_base", "_delta", "_added", "_index")
+
+    def __init__(
+        self,
+        base: _Run = _EMPTY_RUN,
+        delta: Optional[Dict[str, Mapping[str, Any]]] = None,
+        added: int = 0,
+    ):
+        self._base = base
+        self._delta: Dict[str, Mapping[str, Any]] = {} if delta is None else delta
+        # Delta keys that are not in the base.
+        self._added = added
+        self._index: Optional[Dict[Optional[str], AmountIndex]] = None
+
+    def __getitem__(self, key: str) -> Mapping[str, Any]:
+        edge = self._delta.get(key)
+        return self._base.edges[key] if edge is None else edge
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._delta or key in self._base.edges
+
+    def __iter__(self) -> Iterator[str]:
+        if not self._delta:
+            return iter(self._base.edges)
+        return _chain_new(self._base.edges, self._delta)
+
+    def __len__(self) -> int:
+        return len(self._base.edges) + self._added
+
+    def items(self) -> ItemsView:
+        return self._base.edges.items() if not self._delta else ItemsView(self)
+
+    def ranked(
+        self, min_amount: float, start: int, channel: Optional[str]
+    ) -> Iterator[Tuple[str, Mapping[str, Any]]]:
+        """Edges on ``channel`` meeting ``min_amount``, largest amount first, from ``start``.
+
+        Among equal amounts the delta's edges come first, as the most recent writes.
+        """
+
+        base = self._base.partitions().get(channel)
+        if not self._delta:
+            if base is not None:
+                amounts, targets = base
+                lowest = bisect_left(amounts, min_amount)
+                for position in range(len(targets) - 1 - start, lowest - 1, -1):
+                    yield targets[position], self._base.edges[targets[position]]
+            return
+        if self._index is None:
+            self._index = amount_partitions(self._delta.items())
+        delta = self._delta
+        older = (item for item in _descending(base, min_amount) if item[1] not in delta)
+        newer = _descending(self._index.get(channel), min_amount)
+        merged = heapq.merge(newer, older, key=lambda item: -item[0])
+        for _, target in islice(merged, start, None):
+            yield target, self[target]
+
+    def touched(self) -> "_Adjacency":
+        """Private copy for a new version to write into."""
+
+        base, delta = self._base, self._delta
+        if len(delta) > _MIN_DELTA and len(delta) * len(delta) > len(base.edges):
+            return _Adjacency(_Run({**base.edges, **delta}))
+        return _Adjacency(base, dict(delta), self._added)
+
+    def put(self, key: str, edge: Mapping[str, Any]) -> None:
+        """Write ``edge``; only for a copy returned by :meth:`touched` and not yet published."""
+
+        if key not in self:
+            self._added += 1
+        self._delta[key] = edge
+        self._index = None
+
+
+def _chain_new(base: Mapping[str, Any], delta: Mapping[str, Any]) -> Iterator[str]:
+    yield from base
+    yield from (key for key in delta if key not in base)
+
+
+def _descending(partition: Optional[AmountIndex], min_amount: float) -> Iterator[Tuple[Any, str]]:
+    if partition is None:
+        return
+    amounts, targets = partition
+    for position in range(len(targets) - 1, bisect_left(amounts, min_amount) - 1, -1):
+        yield amounts[position], targets[position]
+
+
+class _Node:
+    """Attributes and adjacency of one node; never mutated once published."""
+
+    __slots__ = ("attrs", "succ", "pred")
+
+    def __init__(self, attrs: Dict[str, Any], succ: _Adjacency, pred: _Adjacency):
+        self.attrs = attrs
+        self.succ = succ
+        self.pred = pred
+
+
+class GraphVersion(GraphBackend):
+    """Immutable graph state at one epoch.
+
+    Node records live in hash buckets; a new version copies only the bucket
+    table, the buckets it touched and the recent-write deltas of the adjacency it
+    changed, and shares everything else with its predecessor. Besides the :class:`GraphBackend` read
+    methods it implements the networkx subset used by the analytics engines
+    (``nodes``, ``adj``, ``pred``, ``in``, ``graph[u][v]``, ``successors``,
+    ``predecessors``, ``has_edge``, ``get_edge_data`` and the size counters), so
+    propagation can run on a pinned version while writers publish new ones.
+    """
+
+    def __init__(self, epoch: int, buckets: Tuple[Dict[str, _Node], ...], nodes: int, edges: int):
+        self._epoch = epoch
+        self._buckets = buckets
+        self._mask = len(buckets) - 1
+        self._nodes = nodes
+        self._edges = edges
+        self._networkx: Optional[nx.DiGraph] = None
+
+    @classmethod
+    def empty(cls) -> "GraphVersion":
+        return cls(0, tuple({} for _ in range(16)), 0, 0)
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+
+    def pin(self) -> "GraphVersion":
+        return self
+
+    def add_node(self, node_id: str, **attrs: Any) -> None:
+        self._immutable()
+
+    def add_edge(self, source_id: str, target_id: str, **attrs: Any) -> None:
+        self._immutable()
+
+    def add_edges_bulk(self, edges: Iterable[EdgeRecord]) -> int:
+        self._immutable()
+
+    def successors(self, node_id: str) -> List[str]:
+        return list(self._require(node_id).succ)
+
+    def predecessors(self, node_id: str) -> List[str]:
+        return list(self._require(node_id).pred)
+
+    def get_edge(self, source_id: str, target_id: str) -> Dict[str, Any]:
+        return dict(self._require(source_id).succ[target_id])
+
+    def edge_view(self, source_id: str, target_id: str) -> Mapping[str, Any]:
+        return self._require(source_id).succ[target_id]
+
+    def successors_with_edges(
+        self,
+        node_id: str,
+        min_amount: float = 0.0,
+        start: int = 0,
+        channel: Optional[str] = None,
+    ) -> Iterator[Tuple[str, Mapping[str, Any]]]:
+        """Qualifying out-edges, largest amount first, from this version only."""
+
+        yield from self._require(node_id).succ.ranked(min_amount, start, channel)
+
+    def nodes_by_attribute(self, name: str, value: Any) -> List[str]:
+        return [node_id for node_id, node in self._items() if node.attrs.get(name) == value]
+
+    def has_node(self, node_id: str) -> bool:
+        return self._get(node_id) is not None
+
+    def size(self) -> Dict[str, int]:
+        return {"nodes": self._nodes, "edges": self._edges}
+
+    def neighbors_with_edges(self, node_id: str) -> Dict[str, Any]:
+        outgoing = [
+            {"target": target, "edge": dict(edge)}
+            for target, edge in self._require(node_id).succ.items()
+        ]
+        return {"entity": node_id, "outgoing": outgoing}
+
+    def to_networkx(self) -> nx.DiGraph:
+        """Detached ``DiGraph`` copy of this version, built once."""
+
+        if self._networkx is None:
+            graph = nx.DiGraph()
+            graph.add_nodes_from((node_id, node.attrs) for node_id, node in self._items())
+            graph.add_edges_from(
+                (node_id, target, dict(edge))
+                for node_id, node in self._items()
+                for target, edge in node.succ.items()
+            )
+            self._networkx = graph
+        return self._networkx
+
+    # networkx-compatible read API
+
+    @property
+    def nodes(self) -> "_NodeView":
+        return _NodeView(self, "attrs")
+
+    @property
+    def adj(self) -> "_NodeView":
+        return _NodeView(self, "succ")
+
+    @property
+    def pred(self) -> "_NodeView":
+        return _NodeView(self, "pred")
+
+    def __contains__(self, node_id: Any) -> bool:
+        return self._get(node_id) is not None
+
+    def __getitem__(self, node_id: str) -> Mapping[str, Mapping[str, Any]]:
+        return MappingProxyType(self._require(node_id).succ)
+
+    def __iter__(self) -> Iterator[str]:
+        return (node_id for node_id, _ in self._items())
+
+    def __len__(self) -> int:
+        return self._nodes
+
+    def has_edge(self, source_id: str, target_id: str) -> bool:
+        node = self._get(source_id)
+        return node is not None and target_id in node.succ
+
+    def get_edge_data(self, source_id: str, target_id: str, default: Any = None) -> Any:
+        node = self._get(source_id)
+        if node is None or target_id not in node.succ:
+            return default
+        return node.succ[target_id]
+
+    def number_of_nodes(self) -> int:
+        return self._nodes
+
+    def number_of_edges(self) -> int:
+        return self._edges
+
+    def _get(self, node_id: str) -> Optional[_Node]:
+        return self._buckets[hash(node_id) & self._mask].get(node_id)
+
+    def _require(self, node_id: str) -> _Node:
+        node = self._get(node_id)
+        if node is None:
+            raise KeyError(node_id)
+        return node
+
+    def _items(self) -> Iterator[Tuple[str, _Node]]:
+        for bucket in self._buckets:
+            yield from bucket.items()
+
+    def _immutable(self) -> NoReturn:
+        raise NotImplementedError(
+            "Graph versions are immutable; write through VersionedGraphBackend"
+        )
+
+
+class _NodeView(Mapping):
+    """``graph.nodes`` / ``graph.adj`` / ``graph.pred`` equivalent for a version."""
+
+    __slots__ = ("_version", "_field")
+
+    def __init__(self, version: GraphVersion, field: str):
+        self._version = version
+        self._field = field
+
+    def __getitem__(self, node_id: str) -> Mapping[str, Any]:
+        return MappingProxyType(getattr(self._version._require(node_id), self._field))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._version)
+
+    def __len__(self) -> int:
+        return len(self._version)
+
+    def __contains__(self, node_id: object) -> bool:
+        return node_id in self._version
+
+
+class _VersionBuilder:
+    """Stages writes against a base version and publishes them as the next one."""
+
+    # Buckets are kept at roughly sqrt(nodes), so a single write copies
+    # O(sqrt(nodes)) references instead of the whole node table.
+    def __init__(self, base: GraphVersion):
+        self._base = base
+        self._buckets = list(base._buckets)
+        self._mask = base._mask
+        self._copied: set = set()
+        self._owned: Dict[str, int] = {}
+        self.nodes = base._nodes
+        self.edges = base._edges
+
+    def add_node(self, node_id: str, attrs: Mapping[str, Any]) -> None:
+        node = self._writable(node_id)
+        if not self._owned[node_id] & _ATTRS:
+            node.attrs = dict(node.attrs)
+            self._owned[node_id] |= _ATTRS
+        node.attrs.update(attrs)
+
+    def add_edge(self, source_id: str, target_id: str, attrs: Mapping[str, Any]) -> None:
+        self._writable(target_id)
+        succ = self._adjacency(source_id, _SUCC)
+        previous = succ.get(target_id)
+        edge = MappingProxyType({**previous, **attrs} if previous is not None else dict(attrs))
+        succ.put(target_id, edge)
+        self._adjacency(target_id, _PRED).put(source_id, edge)
+        if previous is None:
+            self.edges += 1
+
+    def commit(self) -> GraphVersion:
+        buckets = self._buckets
+        if self.nodes > len(buckets) * len(buckets):
+            size = len(buckets) * 4
+            buckets = [{} for _ in range(size)]
+            for bucket in self._buckets:
+                for node_id, node in bucket.items():
+                    buckets[hash(node_id) & (size - 1)][node_id] = node
+        return GraphVersion(self._base.epoch + 1, tuple(buckets), self.nodes, self.edges)
+
+    def _writable(self, node_id: str) -> _Node:
+        slot = hash(node_id) & self._mask
+        if slot not in self._copied:
+            self._buckets[slot] = dict(self._buckets[slot])
+            self._copied.add(slot)
+        bucket = self._buckets[slot]
+        node = bucket.get(node_id)
+        if node is None:
+            node = bucket[node_id] = _Node({}, _Adjacency(), _Adjacency())
+            self._owned[node_id] = _ALL
+            self.nodes += 1
+        elif node_id not in self._owned:
+            node = bucket[node_id] = _Node(node.attrs, node.succ, node.pred)
+            self._owned[node_id] = 0
+        return node
+
+    def _adjacency(self, node_id: str, bit: int) -> _Adjacency:
+        node = self._writable(node_id)
+        if not self._owned[node_id] & bit:
+            if bit == _SUCC:
+                node.succ = node.succ.touched()
+            else:
+                node.pred = node.pred.touched()
+            self._owned[node_id] |= bit
+        return node.succ if bit == _SUCC else node.pred
+
+
+class VersionedGraphBackend(GraphBackend):
+    """In-memory backend with multi-version concurrency control.
+
+    Each write (or ``add_edges_bulk`` batch) builds the next immutable
+    :class:`GraphVersion` and publishes it with one reference swap. Readers call
+    :meth:`pin` to hold a version for as long as they need it and never take a
+    lock; writers only serialise among themselves. Unchanged buckets and
+    adjacency bases are shared between versions rather than copied.
+    """
+
+    def __init__(self):
+        self._version = GraphVersion.empty()
+        self._write_lock = threading.Lock()
+
+    @property
+    def epoch(self) -> int:
+        return self._version.epoch
+
+    def pin(self) -> GraphVersion:
+        return self._version
+
+    def add_node(self, node_id: str, **attrs: Any) -> None:
+        with self._write_lock:
+            builder = _VersionBuilder(self._version)
+            builder.add_node(node_id, attrs)
+            self._version = builder.commit()
+
+    def add_edge(self, source_id: str, target_id: str, **attrs: Any) -> None:
+        with self._write_lock:
+            builder = _VersionBuilder(self._version)
+            builder.add_edge(source_id, target_id, attrs)
+            self._version = builder.commit()
+
+    def add_edges_bulk(self, edges: Iterable[EdgeRecord]) -> int:
+        count = 0
+        with self._write_lock:
+            builder = _VersionBuilder(self._version)
+            for source_id, target_id, attrs in edges:
+                builder.add_edge(source_id, target_id, attrs)
+                count += 1
+            self._version = builder.commit()
+        return count
+
+    def successors(self, node_id: str) -> List[str]:
+        return self._version.successors(node_id)
+
+    def predecessors(self, node_id: str) -> List[str]:
+        return self._version.predecessors(node_id)
+
+    def get_edge(self, source_id: str, target_id: str) -> Dict[str, Any]:
+        return self._version.get_edge(source_id, target_id)
+
+    def edge_view(self, source_id: str, target_id: str) -> Mapping[str, Any]:
+        return self._version.edge_view(source_id, target_id)
+
+    def successors_with_edges(
+        self,
+        node_id: str,
+        min_amount: float = 0.0,
+        start: int = 0,
+        channel: Optional[str] = None,
+    ) -> Iterator[Tuple[str, Mapping[str, Any]]]:
+        return self._version.successors_with_edges(node_id, min_amount, start, channel)
+
+    def nodes_by_attribute(self, name: str, value: Any) -> List[str]:
+        return self._version.nodes_by_attribute(name, value)
+
+    def has_node(self, node_id: str) -> bool:
+        return self._version.has_node(node_id)
+
+    def size(self) -> Dict[str, int]:
+        return self._version.size()
+
+    def neighbors_with_edges(self, node_id: str) -> Dict[str, Any]:
+        return self._version.neighbors_with_edges(node_id)
+
+    def to_networkx(self) -> nx.DiGraph:
+        return self._version.to_networkx()
@@ -0,0 +1,94 @@
+"""Bounded result cache keyed by graph epoch."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+from app.metrics import record_cache_eviction, record_cache_lookup, set_cache_entries
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class EpochCache(Generic[K, V]):
+    """Thread-safe LRU of at most ``max_size`` entries with a per-entry ``ttl`` in seconds.
+
+    Every entry is stamped with the graph epoch it was computed at. Writers call
+    :meth:`invalidate` with the epoch they produced and a predicate that matches
+    the keys they may have changed. A lookup at a newer epoch replays the writes
+    since the entry's stamp: if none of them matched the key, the entry is
+    carried forward to the new epoch, otherwise it is dropped. An epoch with no
+    recorded write, or one older than the last ``history`` writes, counts as
+    affecting every key.
+
+    Values are returned as stored, so callers must treat them as read-only.
+    """
+
+    def __init__(self, name: str, max_size: int, ttl: float, history: int = 1024):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.history = history
+        self._entries: OrderedDict[K, Tuple[int, float, V]] = OrderedDict()
+        self._writes: OrderedDict[int, Callable[[K], bool]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K, epoch: int) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.get(key)
+            reason = None
+            if entry is not None:
+                stamp, expires_at, value = entry
+                if time.monotonic() >= expires_at:
+                    reason = "ttl"
+                elif stamp < epoch and not self._unchanged(key, stamp, epoch):
+                    reason = "stale"
+                else:
+                    if stamp < epoch:
+                        self._entries[key] = (epoch, expires_at, value)
+                    self._entries.move_to_end(key)
+            if reason is not None:
+                del self._entries[key]
+                record_cache_eviction(self.name, reason, len(self._entries))
+            hit = entry is not None and reason is None
+        record_cache_lookup(self.name, hit)
+        return value if hit else None
+
+    def put(self, key: K, value: V, epoch: int) -> None:
+        with self._lock:
+            self._entries[key] = (epoch, time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                record_cache_eviction(self.name, "size", len(self._entries))
+            set_cache_entries(self.name, len(self._entries))
+
+    def invalidate(self, epoch: int, affected: Callable[[K], bool]) -> None:
+        """Record that the write producing ``epoch`` may have changed keys matching ``affected``."""
+
+        with self._lock:
+            self._writes[epoch] = affected
+            while len(self._writes) > self.history:
+                self._writes.popitem(last=False)
+
+    def changed(self, key: K, since: int, epoch: int) -> bool:
+        """True if a write after epoch ``since``, up to ``epoch``, may have changed ``key``."""
+
+        with self._lock:
+            return not self._unchanged(key, since, epoch)
+
+    def _unchanged(self, key: K, stamp: int, epoch: int) -> bool:
+        if epoch - stamp > self.history:
+            return False
+        writes: Dict[int, Callable[[K], bool]] = self._writes
+        for later in range(stamp + 1, epoch + 1):
+            affected = writes.get(later)
+            if affected is None or affected(key):
+                return False
+        return True
@@ -46,8 +46,39 @@ class Settings(BaseSettings):
     openai_api_key: Optional[str] = None
     llm_model: str = "gpt-4"
 
+    # Graph storage
+    graph_backend: str = "memory"
+    graph_snapshot_path: Optional[str] = None
+    graph_wal_dir: Optional[str] = None
+    graph_wal_fsync_ms: int = 50
+    graph_wal_snapshot_every: int = 100000
+    graph_query_workers: int = 4
+    graph_shards: int = 4
+    neo4j_uri: Optional[str] = None
+    neo4j_user: str = "neo4j"
+    neo4j_password: Optional[str] = None
+    neo4j_database: Optional[str] = None
+    neo4j_pool_size: int = 50
+
     # Tracing
     max_trace_hops: int = 10
+    trace_max_paths: int = 1000
+    trace_max_states: int = 100000
+
+    # Ingestion
+    ingest_queue_size: int = 10000
+    ingest_batch_size: int = 1000
+    ingest_flush_ms: int = 50
+    ingest_put_timeout_ms: int = 1000
+    ingest_max_line_bytes: int = 1048576
+
+    # Risk engine
+    risk_propagation_mode: str = "reference"
+    simulation_workers: int = 4
+    risk_cache_size: int = 10000
+    risk_cache_ttl_seconds: float = 300.0
+    risk_shared_graph: Optional[str] = None
+    risk_propagation_processes: int = 0
 
     @property
     def is_production(self) -> bool:
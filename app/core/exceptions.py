@@ -31,6 +31,14 @@ class GraphTraversalError(BridgeTraceException):
     """Raised when graph traversal cannot be completed safely."""
 
 
+class IngestBackpressureError(BridgeTraceException):
+    """Raised when the ingest queue stays full for longer than callers may wait."""
+
+
+class PayloadTooLargeError(BridgeTraceException):
+    """Raised when part of a request body exceeds its size limit."""
+
+
 def exception_to_http(exc: BridgeTraceException) -> HTTPException:
     """Map domain exceptions to HTTP-friendly errors."""
 
@@ -39,6 +47,8 @@ def exception_to_http(exc: BridgeTraceException) -> HTTPException:
         NotFoundError: status.HTTP_404_NOT_FOUND,
         AuthenticationError: status.HTTP_401_UNAUTHORIZED,
         GraphTraversalError: status.HTTP_422_UNPROCESSABLE_ENTITY,
+        IngestBackpressureError: status.HTTP_429_TOO_MANY_REQUESTS,
+        PayloadTooLargeError: status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
     }
     code = status_map.get(type(exc), status.HTTP_500_INTERNAL_SERVER_ERROR)
     return HTTPException(
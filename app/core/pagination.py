@@ -0,0 +1,76 @@
+"""Opaque pagination cursors.
+
+Tokens are HMAC-SHA256 signed with the application secret, so the resume
+state they carry was issued by this service. They record the graph epoch they
+were issued at but do not expire with it: the graph grows with every ingest
+batch, so callers check the resume state against the current graph instead and
+raise ``StaleCursor`` only when the part of the graph a cursor points into
+has changed.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+from typing import Any, Dict
+
+from app.core.config import settings
+from app.core.exceptions import ValidationError
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode((text + "=" * (-len(text) % 4)).encode("ascii"))
+
+
+def _signature(body: str) -> bytes:
+    return hmac.new(
+        settings.secret_key.encode("utf-8"), body.encode("ascii"), hashlib.sha256
+    ).digest()
+
+
+def encode_cursor(kind: str, epoch: int, query: Dict[str, Any], state: Dict[str, Any]) -> str:
+    """Pack resume ``state`` for a ``kind`` of listing into a signed, URL-safe token."""
+
+    payload = {"k": kind, "e": epoch, "q": query, "s": state}
+    body = _b64encode(json.dumps(payload, separators=(",", ":"), sort_keys=True).encode("utf-8"))
+    return f"{body}.{_b64encode(_signature(body))}"
+
+
+def decode_cursor(token: str, kind: str, query: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the resume state in ``token``.
+
+    Raises :class:`ValidationError` when the token is malformed or unsigned, or
+    was issued for another listing or query.
+    """
+
+    try:
+        body, signature = token.split(".")
+        if not hmac.compare_digest(_b64decode(signature), _signature(body)):
+            raise ValueError("bad cursor signature")
+        payload = json.loads(_b64decode(body))
+        cursor_kind, cursor_query, state = payload["k"], payload["q"], payload["s"]
+        if not isinstance(state, dict):
+            raise TypeError("cursor state must be an object")
+    except (binascii.Error, ValueError, KeyError, TypeError, UnicodeError) as exc:
+        raise ValidationError("Invalid pagination cursor", code="InvalidCursor") from exc
+
+    if cursor_kind != kind or cursor_query != query:
+        raise ValidationError("Pagination cursor does not match this query", code="InvalidCursor")
+    return state
+
+
+def stale_cursor(reason: str) -> ValidationError:
+    """Error for a cursor whose resume position moved because the graph changed under it."""
+
+    return ValidationError(
+        "Graph changed where the cursor resumes; restart pagination",
+        code="StaleCursor",
+        details={"reason": reason},
+    )
@@ -12,9 +12,16 @@ from fastapi.responses import JSONResponse
 from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from starlette.responses import FileResponse, Response
 
-from app.api.routes import ai, demo, health, playground, professional, risk, trace
+from app.api.dependencies import close_graph_backend, close_ingest_service, close_risk_service
+from app.api.routes import ai, demo, health, ingest, playground, professional, risk, trace
 from app.core.config import settings
-from app.core.enterprise import AuditEntry, TenantContext, audit_logger, business_metrics, tenant_quota_manager
+from app.core.enterprise import (
+    AuditEntry,
+    TenantContext,
+    audit_logger,
+    business_metrics,
+    tenant_quota_manager,
+)
 from app.core.exceptions import BridgeTraceException, exception_to_http
 from app.core.logging import get_logger, setup_logging
 from app.core.security import authenticate_request
@@ -52,7 +59,9 @@ async def request_id_and_rate_limit(request: Request, call_next):
     request_id = request.headers.get("X-Request-ID", str(uuid.uuid4()))
     client_ip = request.client.host if request.client else "unknown"
     tenant_id = request.headers.get("X-Tenant-ID", "public")
-    tenant = TenantContext(tenant_id=tenant_id, quota_per_minute=settings.default_tenant_quota_per_minute)
+    tenant = TenantContext(
+        tenant_id=tenant_id, quota_per_minute=settings.default_tenant_quota_per_minute
+    )
 
     now = time.time()
     queue = _request_counters[client_ip]
@@ -135,6 +144,7 @@ async def request_id_and_rate_limit(request: Request, call_next):
 app.include_router(health.router, prefix=settings.api_prefix)
 app.include_router(trace.router, prefix=settings.api_prefix)
 app.include_router(risk.router, prefix=settings.api_prefix)
+app.include_router(ingest.router, prefix=settings.api_prefix)
 app.include_router(ai.router, prefix=settings.api_prefix)
 app.include_router(professional.router, prefix=settings.api_prefix)
 app.include_router(demo.router, prefix=settings.api_prefix)
@@ -146,7 +156,8 @@ app.include_router(playground.router, prefix=settings.api_prefix)
 async def bridgetrace_exception_handler(request, exc: BridgeTraceException):
     logger.error("application_error", error=exc.message, code=exc.code)
     http_exc = exception_to_http(exc)
-    return JSONResponse(status_code=http_exc.status_code, content=http_exc.detail)
+    headers = {"Retry-After": "1"} if http_exc.status_code == 429 else None
+    return JSONResponse(status_code=http_exc.status_code, content=http_exc.detail, headers=headers)
 
 
 # Metrics endpoint
@@ -200,6 +211,9 @@ async def startup_event():
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
+    await close_ingest_service()
+    close_graph_backend()
+    close_risk_service()
     logger.info("application_shutdown")
 
 
@@ -1,7 +1,21 @@
 """Observability metrics modules."""
 
-from app.metrics.graph_stats import update_graph_size
+from app.metrics.cache_stats import record_cache_eviction, record_cache_lookup, set_cache_entries
+from app.metrics.graph_stats import record_shard_messages, update_graph_size
+from app.metrics.ingest_stats import record_ingest_batch, record_ingest_rows, set_ingest_queue_depth
 from app.metrics.latency import track_latency
-from app.metrics.tracing_stats import record_trace_result
+from app.metrics.tracing_stats import record_round_trips, record_trace_result
 
-__all__ = ["track_latency", "update_graph_size", "record_trace_result"]
+__all__ = [
+    "track_latency",
+    "update_graph_size",
+    "record_trace_result",
+    "record_round_trips",
+    "record_shard_messages",
+    "record_ingest_rows",
+    "record_ingest_batch",
+    "set_ingest_queue_depth",
+    "record_cache_lookup",
+    "record_cache_eviction",
+    "set_cache_entries",
+]
@@ -0,0 +1,30 @@
+"""Result cache metrics."""
+
+from __future__ import annotations
+
+from prometheus_client import Counter, Gauge
+
+RESULT_CACHE_REQUESTS_TOTAL = Counter(
+    "result_cache_requests_total",
+    "Result cache lookups by outcome",
+    ["cache", "result"],
+)
+RESULT_CACHE_EVICTIONS_TOTAL = Counter(
+    "result_cache_evictions_total",
+    "Result cache entries dropped, by reason (size, ttl, stale)",
+    ["cache", "reason"],
+)
+RESULT_CACHE_ENTRIES = Gauge("result_cache_entries", "Entries held by a result cache", ["cache"])
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    RESULT_CACHE_REQUESTS_TOTAL.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def record_cache_eviction(cache: str, reason: str, entries: int) -> None:
+    RESULT_CACHE_EVICTIONS_TOTAL.labels(cache=cache, reason=reason).inc()
+    RESULT_CACHE_ENTRIES.labels(cache=cache).set(entries)
+
+
+def set_cache_entries(cache: str, entries: int) -> None:
+    RESULT_CACHE_ENTRIES.labels(cache=cache).set(entries)
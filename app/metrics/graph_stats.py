@@ -2,12 +2,23 @@
 
 from __future__ import annotations
 
-from prometheus_client import Gauge
+from prometheus_client import Gauge, Histogram
 
 GRAPH_NODES_TOTAL = Gauge("graph_nodes_total", "Current number of graph nodes")
 GRAPH_EDGES_TOTAL = Gauge("graph_edges_total", "Current number of graph edges")
+GRAPH_SHARD_MESSAGES = Histogram(
+    "graph_shard_messages",
+    "Frontier entries exchanged per sharded query, in total and across shards",
+    ["operation", "scope"],
+    buckets=(0, 10, 100, 1_000, 10_000, 100_000, 1_000_000),
+)
 
 
 def update_graph_size(nodes: int, edges: int) -> None:
     GRAPH_NODES_TOTAL.set(nodes)
     GRAPH_EDGES_TOTAL.set(edges)
+
+
+def record_shard_messages(operation: str, messages: int, cross_shard: int) -> None:
+    GRAPH_SHARD_MESSAGES.labels(operation=operation, scope="total").observe(messages)
+    GRAPH_SHARD_MESSAGES.labels(operation=operation, scope="cross_shard").observe(cross_shard)
@@ -0,0 +1,36 @@
+"""Streaming ingestion metrics."""
+
+from __future__ import annotations
+
+from prometheus_client import Counter, Gauge, Histogram
+
+INGEST_ROWS_TOTAL = Counter(
+    "ingest_rows_total",
+    "Ingested NDJSON rows by outcome",
+    ["outcome"],
+)
+INGEST_ROWS_PER_SECOND = Gauge(
+    "ingest_rows_per_second",
+    "Rows per second written by the most recent ingest batch",
+)
+INGEST_QUEUE_DEPTH = Gauge("ingest_queue_depth", "Rows waiting in the ingest queue")
+INGEST_BATCH_ROWS = Histogram(
+    "ingest_batch_rows",
+    "Rows per ingest micro-batch",
+    buckets=(1, 10, 100, 500, 1_000, 5_000, 10_000, 50_000),
+)
+
+
+def record_ingest_rows(outcome: str, count: int) -> None:
+    if count:
+        INGEST_ROWS_TOTAL.labels(outcome=outcome).inc(count)
+
+
+def record_ingest_batch(rows: int, seconds: float) -> None:
+    INGEST_BATCH_ROWS.observe(rows)
+    INGEST_ROWS_PER_SECOND.set(rows / seconds if seconds > 0 else 0.0)
+    INGEST_ROWS_TOTAL.labels(outcome="written").inc(rows)
+
+
+def set_ingest_queue_depth(depth: int) -> None:
+    INGEST_QUEUE_DEPTH.set(depth)
@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from prometheus_client import Counter, Gauge
+from prometheus_client import Counter, Gauge, Histogram
 
 TRACE_REQUESTS_TOTAL = Counter(
     "trace_requests_total",
@@ -12,6 +12,12 @@ TRACE_REQUESTS_TOTAL = Counter(
 
 TRACE_AVG_HOPS = Gauge("trace_avg_hops", "Average hops in trace responses")
 TRACE_ERROR_RATE = Gauge("trace_error_rate", "Trace error rate over process lifetime")
+TRACE_BACKEND_ROUND_TRIPS = Histogram(
+    "trace_backend_round_trips",
+    "Graph storage round trips per traversal",
+    ["operation"],
+    buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100, 250, 1000),
+)
 
 _total_requests = 0
 _total_errors = 0
@@ -31,3 +37,7 @@ def record_trace_result(hops: int, success: bool) -> None:
     _total_hops += float(hops)
     TRACE_AVG_HOPS.set(_total_hops / _total_requests)
     TRACE_ERROR_RATE.set(_total_errors / _total_requests)
+
+
+def record_round_trips(operation: str, count: int) -> None:
+    TRACE_BACKEND_ROUND_TRIPS.labels(operation=operation).observe(count)
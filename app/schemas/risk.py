@@ -1,11 +1,19 @@
 """Risk analysis schemas."""
+
 from typing import List
 from pydantic import BaseModel, Field
 
+
 class RiskAnalysisRequest(BaseModel):
     entity_id: str
     time_range_days: int = Field(default=30, ge=1, le=365)
 
+
+class RiskBatchRequest(BaseModel):
+    entity_ids: List[str] = Field(..., min_length=1, max_length=10000)
+    time_range_days: int = Field(default=30, ge=1, le=365)
+
+
 class RiskMetrics(BaseModel):
     transaction_count: int
     total_volume: float
@@ -13,6 +21,7 @@ class RiskMetrics(BaseModel):
     high_risk_count: int
     channels_used: List[str]
 
+
 class RiskAnalysisResponse(BaseModel):
     entity_id: str
     risk_level: str
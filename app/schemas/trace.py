@@ -1,11 +1,24 @@
 """Trace schemas."""
+
 from typing import Optional, List
 from pydantic import BaseModel, Field
 
+
 class TraceRequest(BaseModel):
     source_id: str = Field(..., description="Source node ID")
     max_hops: int = Field(default=5, ge=1, le=10)
     min_amount: float = Field(default=0.0, ge=0)
+    max_paths: Optional[int] = Field(default=None, ge=1, le=10000)
+    channel: Optional[str] = Field(default=None, description="Only follow edges on this channel")
+    limit: Optional[int] = Field(default=None, ge=1, le=1000)
+    cursor: Optional[str] = Field(default=None, description="Opaque cursor from a previous page")
+
+
+class PathBetweenRequest(BaseModel):
+    source_id: str = Field(..., description="Source node ID")
+    target_id: str = Field(..., description="Target node ID")
+    max_hops: int = Field(default=6, ge=1, le=10)
+
 
 class NodeInfo(BaseModel):
     id: str
@@ -13,6 +26,7 @@ class NodeInfo(BaseModel):
     name: str
     metadata: dict
 
+
 class TransactionHop(BaseModel):
     transaction_id: str
     from_node: str
@@ -23,6 +37,7 @@ class TransactionHop(BaseModel):
     channel: str
     risk_score: float
 
+
 class TraceResponse(BaseModel):
     source: NodeInfo
     hops: List[TransactionHop]
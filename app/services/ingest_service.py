@@ -0,0 +1,225 @@
+"""Streaming transaction ingestion service."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, AsyncIterable, Dict, List, Optional, Tuple, Union
+
+from app.backends import AsyncGraphBackend
+from app.backends.graph_backend import EdgeRecord
+from app.backends.loader import parse_edge
+from app.core.exceptions import IngestBackpressureError, PayloadTooLargeError
+from app.core.logging import get_logger
+from app.metrics import (
+    record_ingest_batch,
+    record_ingest_rows,
+    set_ingest_queue_depth,
+    update_graph_size,
+)
+
+if TYPE_CHECKING:
+    from app.services.risk_service import RiskService
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class _Ticket:
+    """Line numbers of one ingest call's rows that the graph refused."""
+
+    failed: List[int] = field(default_factory=list)
+
+
+# A queued row: the parsed record, the ticket of its ingest call and its line number.
+_Entry = Tuple[EdgeRecord, _Ticket, int]
+
+
+class IngestService:
+    """Feed NDJSON transactions into the graph through a bounded queue.
+
+    Handlers parse rows onto an ``asyncio.Queue`` of ``queue_size`` rows. A
+    background task drains it in micro-batches of up to ``batch_size`` rows,
+    waiting ``flush_interval`` seconds for a partial batch to fill. Each batch is
+    one ``add_edges_bulk`` call, so the graph epoch advances once per batch. If
+    the backend refuses a batch, its rows are retried one at a time and the rows
+    that still fail are reported to the call that sent them. With a
+    ``risk_service`` every written batch is also recorded in its reference
+    graph, so risk scores follow the ingested transfers.
+
+    While the queue is full a handler stops reading its request body. If no
+    slot frees up within ``put_timeout`` seconds it raises
+    :class:`IngestBackpressureError` (HTTP 429).
+    """
+
+    def __init__(
+        self,
+        graph: AsyncGraphBackend,
+        queue_size: int = 10_000,
+        batch_size: int = 1_000,
+        flush_interval: float = 0.05,
+        put_timeout: float = 1.0,
+        risk_service: Optional[RiskService] = None,
+    ):
+        if queue_size < 1 or batch_size < 1:
+            raise ValueError("queue_size and batch_size must be >= 1")
+        self.graph = graph
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.risk_service = risk_service
+        self._queue: Optional[asyncio.Queue[_Entry]] = None
+        self._worker: Optional[asyncio.Task[None]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def ingest(
+        self,
+        lines: AsyncIterable[Union[str, bytes]],
+        wait: bool = False,
+    ) -> Dict[str, Any]:
+        """Queue every valid transaction in ``lines``.
+
+        With ``wait`` the call returns only after the queue has been written to
+        the graph, so the caller can read its own writes and ``failed`` counts
+        every accepted row the graph refused.
+        """
+
+        queue = self._ensure_worker()
+        if queue.full():
+            record_ingest_rows("throttled", 1)
+            raise IngestBackpressureError(
+                "Ingest queue is full", details={"accepted": 0, "queue_depth": queue.qsize()}
+            )
+
+        ticket = _Ticket()
+        accepted = line_no = 0
+        rejected: List[int] = []
+        try:
+            async for line in lines:
+                line_no += 1
+                if not line.strip():
+                    continue
+                record = parse_edge(line)
+                if record is None:
+                    rejected.append(line_no)
+                    continue
+                entry = (record, ticket, line_no)
+                try:
+                    queue.put_nowait(entry)
+                except asyncio.QueueFull:
+                    try:
+                        await asyncio.wait_for(queue.put(entry), self.put_timeout)
+                    except asyncio.TimeoutError:
+                        self._record(queue, accepted, rejected, throttled=1)
+                        raise IngestBackpressureError(
+                            "Ingest queue stayed full; resume after the accepted lines",
+                            details={
+                                "accepted": accepted,
+                                "lines_read": line_no - 1,
+                                "queue_depth": queue.qsize(),
+                            },
+                        ) from None
+                accepted += 1
+        except PayloadTooLargeError as exc:
+            self._record(queue, accepted, rejected)
+            exc.details.update(accepted=accepted, lines_read=line_no)
+            raise
+
+        self._record(queue, accepted, rejected)
+        if wait:
+            await queue.join()
+        return {
+            "accepted": accepted,
+            "rejected": len(rejected),
+            "rejected_lines": rejected[:10],
+            "failed": len(ticket.failed),
+            "failed_lines": ticket.failed[:10],
+            "queue_depth": queue.qsize(),
+            "graph_epoch": self.graph.epoch,
+        }
+
+    async def close(self) -> None:
+        """Write out queued rows and stop the drain task."""
+
+        queue, worker = self._queue, self._worker
+        if queue is None or worker is None or self._loop is not asyncio.get_running_loop():
+            return
+        await queue.join()
+        worker.cancel()
+        self._worker = self._queue = self._loop = None
+
+    def _ensure_worker(self) -> asyncio.Queue[_Entry]:
+        # Queues bind to the loop that first uses them; start one drain task per loop.
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        if queue is None or self._loop is not loop:
+            self._loop = loop
+            queue = self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._worker = loop.create_task(self._drain(queue))
+        return queue
+
+    async def _drain(self, queue: asyncio.Queue[_Entry]) -> None:
+        while True:
+            batch = [await queue.get()]
+            if queue.qsize() < self.batch_size - 1:
+                await asyncio.sleep(self.flush_interval)
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+                set_ingest_queue_depth(queue.qsize())
+
+    async def _write(self, batch: List[_Entry]) -> None:
+        started = time.perf_counter()
+        records = [record for record, _, _ in batch]
+        try:
+            written = await self.graph.add_edges_bulk(records)
+        except Exception as exc:
+            logger.warning("ingest_batch_retried_per_row", rows=len(batch), error=str(exc))
+            written, records = await self._write_rows(batch)
+        record_ingest_batch(written, time.perf_counter() - started)
+        size = await self.graph.size()
+        update_graph_size(size["nodes"], size["edges"])
+        if self.risk_service is not None:
+            try:
+                await self.risk_service.ingest_transfers(records)
+            except Exception as exc:
+                # The rows are in the graph already; a risk refresh failure is not theirs.
+                logger.error("ingest_risk_update_failed", rows=len(records), error=str(exc))
+
+    async def _write_rows(self, batch: List[_Entry]) -> Tuple[int, List[EdgeRecord]]:
+        """Write a refused batch row by row so one bad row cannot drop the others.
+
+        Returns the number of edges written and the records that were.
+        """
+
+        written, records = 0, []
+        for record, ticket, line_no in batch:
+            try:
+                written += await self.graph.add_edges_bulk([record])
+            except Exception as exc:
+                ticket.failed.append(line_no)
+                record_ingest_rows("failed", 1)
+                logger.error("ingest_row_failed", line=line_no, error=str(exc))
+            else:
+                records.append(record)
+        return written, records
+
+    def _record(
+        self,
+        queue: asyncio.Queue[_Entry],
+        accepted: int,
+        rejected: List[int],
+        throttled: int = 0,
+    ) -> None:
+        record_ingest_rows("accepted", accepted)
+        record_ingest_rows("rejected", len(rejected))
+        record_ingest_rows("throttled", throttled)
+        set_ingest_queue_depth(queue.qsize())
+        if rejected:
+            logger.warning("ingest_rows_rejected", count=len(rejected), first_lines=rejected[:10])
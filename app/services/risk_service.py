@@ -2,26 +2,103 @@
 
 from __future__ import annotations
 
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Dict
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Set,
+    Tuple,
+    TypeVar,
+)
 
-import networkx as nx
-
-from app.analytics import RiskPropagationEngine
+from app.analytics import (
+    CSRGraph,
+    IncrementalRiskPropagator,
+    OverlayGraph,
+    PointPropagationResult,
+    PropagationResult,
+    PropagationSnapshot,
+    PropagationSnapshotStore,
+    RiskPropagationEngine,
+)
+from app.analytics.shared_csr import SharedCSRGraph, attach_shared_graph, propagate_in_processes
+from app.analytics.snapshot import seed_key
+from app.backends import GraphVersion, VersionedGraphBackend
+from app.backends.graph_backend import EdgeRecord
+from app.core.cache import EpochCache
+from app.core.config import settings
 from app.core.logging import get_logger
 from app.metrics import track_latency
 
 logger = get_logger(__name__)
 
+T = TypeVar("T")
+
 
 class RiskService:
     """Service responsible for entity risk analysis and explainability."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        propagation_mode: str | None = None,
+        shared_graph: str | None = None,
+        propagation_processes: int | None = None,
+    ):
         self.risk_thresholds = {"high": 0.7, "medium": 0.4}
-        self.graph = self._build_reference_graph()
-        self.propagation = RiskPropagationEngine(decay=0.75, min_signal=0.02)
-        self._cache: Dict[str, Dict[str, Any]] = {}
+        self.store = self._build_reference_graph()
+        self.propagation = RiskPropagationEngine(
+            decay=0.75,
+            min_signal=0.02,
+            mode=propagation_mode or settings.risk_propagation_mode,
+        )
+        self._compiled_graph: Tuple[int, CSRGraph] | None = None
+        # Keyed on the reference graph's epoch, which every ingested batch advances.
+        self._snapshots = PropagationSnapshotStore(
+            self._build_snapshots, epoch=lambda: self.graph_epoch
+        )
+        self._simulation_pool = ThreadPoolExecutor(
+            max_workers=settings.simulation_workers, thread_name_prefix="risk-simulation"
+        )
+        self._query_pool = ThreadPoolExecutor(
+            max_workers=settings.graph_query_workers, thread_name_prefix="risk-query"
+        )
+        self._cache: EpochCache[Tuple[str, int], Dict[str, Any]] = EpochCache(
+            "risk_analysis",
+            max_size=settings.risk_cache_size,
+            ttl=settings.risk_cache_ttl_seconds,
+        )
+
+        shared_graph = shared_graph or settings.risk_shared_graph
+        self._shared_graph = self._share_reference_graph(shared_graph) if shared_graph else None
+        if propagation_processes is None:
+            propagation_processes = settings.risk_propagation_processes
+        self._propagation_processes = propagation_processes
+        self._propagation_pool: ProcessPoolExecutor | None = None
+        if self._shared_graph is not None and propagation_processes > 0:
+            self._propagation_pool = ProcessPoolExecutor(
+                max_workers=propagation_processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=attach_shared_graph,
+                initargs=(self._shared_graph.name,),
+            )
+
+    @property
+    def graph(self) -> GraphVersion:
+        """The current reference graph version; readers keep it for their whole query."""
+
+        return self.store.pin()
+
+    @property
+    def graph_epoch(self) -> int:
+        return self.store.epoch
 
     async def analyze_entity_risk(
         self,
@@ -31,69 +108,121 @@ class RiskService:
         """Analyze risk for an entity."""
 
         logger.info("risk_analysis_started", entity_id=entity_id, days=time_range_days)
-        cache_key = f"{entity_id}:{time_range_days}"
-        if cache_key in self._cache:
-            cached = dict(self._cache[cache_key])
-            cached["cache_hit"] = True
+        cache_key = (entity_id, time_range_days)
+        cached = self._cache.get(cache_key, self.graph_epoch)
+        if cached is not None:
             return cached
 
         with track_latency("risk_analysis"):
             seeds = self._seed_scores_for_entity(entity_id)
-            propagation = self.propagation.run(self.graph, seed_scores=seeds, max_hops=4)
-            propagated_score = propagation.scores.get(entity_id, 0.2)
-            temporal_decay = self._temporal_decay_factor(time_range_days)
-            behavioral_component = 0.15
-            risk_score = min(round((propagated_score * temporal_decay * 0.7) + behavioral_component, 4), 0.99)
-            risk_level = self._calculate_risk_level(risk_score)
-
-            dominant_source = propagation.dominant_source.get(entity_id, "unknown")
-            reasons = [
-                f"propagated_risk_from={dominant_source}",
-                f"time_window_days={time_range_days}",
-                f"temporal_decay={temporal_decay}",
-            ]
+            snapshot = self._snapshots.peek(seeds, max_hops=4)
+            if snapshot is not None and self._cache.changed(
+                cache_key, snapshot.epoch, self.graph_epoch
+            ):
+                # A transfer since the snapshot reached this entity; don't serve its old score.
+                snapshot = None
+            if snapshot is not None:
+                epoch = snapshot.epoch
+                propagated_score = snapshot.score(entity_id, default=0.2)
+                dominant_source = snapshot.dominant_source(entity_id)
+            else:
+                # No current snapshot: score only the entity's reverse cone while one is built.
+                epoch = self.graph_epoch
+                point, known = await self._offload(self._point_score, seeds, entity_id)
+                propagated_score = point.score if known else 0.2
+                dominant_source = point.dominant_source or "unknown"
 
-            result = {
-                "entity_id": entity_id,
-                "risk_level": risk_level,
-                "risk_score": risk_score,
-                "metrics": {
-                    "transaction_count": 15,
-                    "total_volume": 75000.0,
-                    "average_risk_score": round((risk_score + propagated_score) / 2, 4),
-                    "high_risk_count": 2,
-                    "channels_used": ["PIX", "CRYPTO_BRIDGE"],
-                },
-                "recommendations": [
-                    "Monitor large transactions",
-                    "Verify beneficiary identity",
-                    "Enable enhanced due diligence",
-                ],
-                "explanations": reasons,
-                "cache_hit": False,
-            }
-
-        self._cache[cache_key] = dict(result)
+            result = self._build_risk_result(
+                entity_id,
+                time_range_days,
+                propagated_score=propagated_score,
+                dominant_source=dominant_source,
+            )
+
+        # Stored once with the hit flag set, so hits return it without copying.
+        self._cache.put(cache_key, {**result, "cache_hit": True}, epoch)
         return result
 
+    async def analyze_batch(
+        self,
+        entity_ids: List[str],
+        time_range_days: int = 30,
+    ) -> Dict[str, Any]:
+        """Score many entities with one propagation pass per distinct seed set."""
+
+        logger.info("risk_batch_started", entities=len(entity_ids), days=time_range_days)
+        with track_latency("risk_batch"):
+            seed_sets = [self._seed_scores_for_entity(entity_id) for entity_id in entity_ids]
+            snapshots = await self._offload(self._snapshots.get_many, seed_sets, 4)
+
+            results = []
+            for entity_id, snapshot in zip(entity_ids, snapshots):
+                results.append(
+                    self._build_risk_result(
+                        entity_id,
+                        time_range_days,
+                        propagated_score=snapshot.score(entity_id, default=0.2),
+                        dominant_source=snapshot.dominant_source(entity_id),
+                    )
+                )
+
+        distinct = len({id(snapshot) for snapshot in snapshots})
+        return {"results": results, "total": len(results), "seed_sets": distinct}
+
     async def propagation_map(self, entity_id: str) -> Dict[str, Any]:
         """Return risk influence map for explainability."""
 
-        seeds = self._seed_scores_for_entity(entity_id)
-        propagation = self.propagation.run(self.graph, seed_scores=seeds, max_hops=5)
+        snapshot = await self._offload(
+            self._snapshots.get, self._seed_scores_for_entity(entity_id), 5
+        )
+        threshold = self._adaptive_threshold()
 
-        influence = {
-            node: score
-            for node, score in propagation.scores.items()
-            if score >= self._adaptive_threshold()
+        return {
+            "entity_id": entity_id,
+            "generated_at": datetime.utcnow().isoformat() + "Z",
+            "adaptive_threshold": threshold,
+            "influence": snapshot.influence(threshold),
+            "dominant_source": snapshot.result.dominant_source,
+            "graph_epoch": snapshot.epoch,
         }
 
-        return {
+    async def stream_propagation_map(self, entity_id: str) -> Iterator[Dict[str, Any]]:
+        """Propagation map rows for NDJSON streaming.
+
+        Yields one ``node`` row per influenced node straight from the snapshot
+        scores, then a ``summary`` row with the threshold and graph epoch. The
+        snapshot is fetched on the query pool, since it may have to be built.
+        """
+
+        snapshot = await self._offload(
+            self._snapshots.get, self._seed_scores_for_entity(entity_id), 5
+        )
+        threshold = self._adaptive_threshold()
+        return self._propagation_rows(entity_id, snapshot, threshold)
+
+    @staticmethod
+    def _propagation_rows(
+        entity_id: str,
+        snapshot: PropagationSnapshot,
+        threshold: float,
+    ) -> Iterator[Dict[str, Any]]:
+        total = 0
+        for node, score in snapshot.result.scores.items():
+            if score >= threshold:
+                total += 1
+                yield {
+                    "type": "node",
+                    "node": node,
+                    "score": score,
+                    "dominant_source": snapshot.dominant_source(node),
+                }
+        yield {
+            "type": "summary",
             "entity_id": entity_id,
             "generated_at": datetime.utcnow().isoformat() + "Z",
-            "adaptive_threshold": self._adaptive_threshold(),
-            "influence": influence,
-            "dominant_source": propagation.dominant_source,
+            "adaptive_threshold": threshold,
+            "total_nodes": total,
+            "graph_epoch": snapshot.epoch,
         }
 
     async def simulate_transfer(
@@ -105,13 +234,14 @@ class RiskService:
     ) -> Dict[str, Any]:
         """Simulate a transfer and report projected risk for source and target."""
 
-        sandbox_graph = self.graph.copy()
-        sandbox_graph.add_node(source_id)
-        sandbox_graph.add_node(target_id)
+        sandbox_graph = OverlayGraph(self.graph)
         sandbox_graph.add_edge(source_id, target_id, amount=amount, risk_transfer=risk_transfer)
 
         seeds = self._seed_scores_for_entity(source_id)
-        projection = self.propagation.run(sandbox_graph, seed_scores=seeds, max_hops=5)
+        with track_latency("simulation"):
+            projection = await self._offload(
+                self._project, sandbox_graph, seeds, (source_id, target_id)
+            )
 
         return {
             "simulation": {
@@ -120,12 +250,290 @@ class RiskService:
                 "amount": amount,
                 "risk_transfer": risk_transfer,
             },
-            "projected_risk": {
-                source_id: projection.scores.get(source_id, 0.0),
-                target_id: projection.scores.get(target_id, 0.0),
+            "projected_risk": projection,
+        }
+
+    async def _offload(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run CPU-bound graph work on the query pool instead of the event loop."""
+
+        return await asyncio.get_running_loop().run_in_executor(self._query_pool, fn, *args)
+
+    def _point_score(
+        self, seeds: Dict[str, float], entity_id: str
+    ) -> Tuple[PointPropagationResult, bool]:
+        graph = self.graph
+        return self.propagation.score_node(graph, seeds, entity_id, max_hops=4), entity_id in graph
+
+    def _project(
+        self,
+        graph: OverlayGraph,
+        seeds: Dict[str, float],
+        nodes: Tuple[str, ...],
+    ) -> Dict[str, float]:
+        return {
+            node: self.propagation.score_node(graph, seeds, node, max_hops=5).score
+            for node in nodes
+        }
+
+    def _build_risk_result(
+        self,
+        entity_id: str,
+        time_range_days: int,
+        propagated_score: float,
+        dominant_source: str,
+    ) -> Dict[str, Any]:
+        temporal_decay = self._temporal_decay_factor(time_range_days)
+        behavioral_component = 0.15
+        risk_score = min(
+            round((propagated_score * temporal_decay * 0.7) + behavioral_component, 4), 0.99
+        )
+        risk_level = self._calculate_risk_level(risk_score)
+
+        reasons = [
+            f"propagated_risk_from={dominant_source}",
+            f"time_window_days={time_range_days}",
+            f"temporal_decay={temporal_decay}",
+        ]
+
+        return {
+            "entity_id": entity_id,
+            "risk_level": risk_level,
+            "risk_score": risk_score,
+            "metrics": {
+                "transaction_count": 15,
+                "total_volume": 75000.0,
+                "average_risk_score": round((risk_score + propagated_score) / 2, 4),
+                "high_risk_count": 2,
+                "channels_used": ["PIX", "CRYPTO_BRIDGE"],
             },
+            "recommendations": [
+                "Monitor large transactions",
+                "Verify beneficiary identity",
+                "Enable enhanced due diligence",
+            ],
+            "explanations": reasons,
+            "cache_hit": False,
         }
 
+    def _csr_graph(self, graph: GraphVersion) -> CSRGraph:
+        """Compile a reference graph version once for CSR snapshot propagation."""
+
+        shared = self._shared_graph
+        if shared is not None and shared.epoch == graph.epoch:
+            return shared
+        compiled = self._compiled_graph
+        if compiled is None or compiled[0] != graph.epoch:
+            compiled = self._compiled_graph = (graph.epoch, CSRGraph.from_networkx(graph))
+        return compiled[1]
+
+    async def simulate_batch(
+        self,
+        scenarios: List[Dict[str, Any]],
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Evaluate many hypothetical transfers against one shared baseline.
+
+        The baseline propagation state is built once per distinct seed set; each
+        scenario forks it copy-on-write and relaxes only the delta caused by its
+        edge. Scenarios run on the simulation pool and are yielded as they finish,
+        tagged with their request ``index``.
+        """
+
+        loop = asyncio.get_running_loop()
+        # The pinned version stays unchanged while ingestion publishes new ones.
+        graph = self.graph
+
+        seed_sets = [self._seed_scores_for_entity(scenario["source_id"]) for scenario in scenarios]
+        baselines: Dict[tuple, IncrementalRiskPropagator] = {}
+        for seeds in seed_sets:
+            if seed_key(seeds) not in baselines:
+                baselines[seed_key(seeds)] = await loop.run_in_executor(
+                    self._simulation_pool, self._simulation_baseline, graph, seeds
+                )
+
+        pending = [
+            loop.run_in_executor(
+                self._simulation_pool,
+                self._evaluate_scenario,
+                baselines[seed_key(seeds)],
+                index,
+                scenario,
+            )
+            for index, (scenario, seeds) in enumerate(zip(scenarios, seed_sets))
+        ]
+        for finished in asyncio.as_completed(pending):
+            yield await finished
+
+    def record_transfer(
+        self,
+        source_id: str,
+        target_id: str,
+        amount: float,
+        risk_transfer: float = 0.7,
+    ) -> int:
+        """Add a transfer to the reference graph and advance the graph epoch.
+
+        Propagation snapshots for the previous epoch keep serving reads until their
+        background rebuild completes.
+        """
+
+        attrs = {"amount": amount, "risk_transfer": risk_transfer}
+        return self.record_transfers([(source_id, target_id, attrs)])
+
+    def record_transfers(self, records: Iterable[EdgeRecord]) -> int:
+        """Add many transfers to the reference graph with one epoch bump.
+
+        Only ``amount`` and ``risk_transfer`` (default 0.7) are kept from each
+        record's attributes. Returns the new graph epoch.
+        """
+
+        edges = [
+            (
+                source_id,
+                target_id,
+                {
+                    "amount": attrs.get("amount", 0),
+                    "risk_transfer": attrs.get("risk_transfer", 0.7),
+                },
+            )
+            for source_id, target_id, attrs in records
+        ]
+        if not edges:
+            return self.graph_epoch
+        before = self.graph
+        sources = {source_id for source_id, _, _ in edges}
+        targets = {target_id for _, target_id, _ in edges}
+        created = {node for node in sources | targets if node not in before}
+        self.store.add_edges_bulk(edges)
+        graph = self.graph
+        # The sources' own results change too, e.g. when they first appear in the graph.
+        affected = self._downstream(graph, targets, hops=3) | created | sources
+        self._cache.invalidate(graph.epoch, lambda key: key[0] in affected)
+        self._snapshots.invalidate()
+        return graph.epoch
+
+    async def ingest_transfers(self, records: List[EdgeRecord]) -> int:
+        """:meth:`record_transfers` on the query pool, for the ingest pipeline."""
+
+        return await self._offload(self.record_transfers, records)
+
+    @staticmethod
+    def _downstream(graph: GraphVersion, node_ids: Set[str], hops: int) -> Set[str]:
+        """``node_ids`` and every node within ``hops`` hops after them.
+
+        New edges into ``node_ids`` can only change the 4-hop risk scores of these nodes.
+        """
+
+        frontier = set(node_ids)
+        reached = set(frontier)
+        for _ in range(hops):
+            frontier = {nxt for node in frontier for nxt in graph.successors(node)} - reached
+            reached |= frontier
+        return reached
+
+    def _simulation_baseline(
+        self,
+        graph: GraphVersion,
+        seeds: Dict[str, float],
+    ) -> IncrementalRiskPropagator:
+        return IncrementalRiskPropagator(
+            graph,
+            seeds,
+            max_hops=5,
+            decay=self.propagation.decay,
+            min_signal=self.propagation.min_signal,
+        )
+
+    def _evaluate_scenario(
+        self,
+        baseline: IncrementalRiskPropagator,
+        index: int,
+        scenario: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        source_id, target_id = scenario["source_id"], scenario["target_id"]
+        amount = scenario["amount"]
+        risk_transfer = scenario.get("risk_transfer", 0.7)
+
+        what_if = baseline.fork()
+        update = what_if.add_edge(source_id, target_id, amount=amount, risk_transfer=risk_transfer)
+        return {
+            "index": index,
+            "simulation": {
+                "source_id": source_id,
+                "target_id": target_id,
+                "amount": amount,
+                "risk_transfer": risk_transfer,
+            },
+            "baseline_risk": {node: baseline.score(node) for node in (source_id, target_id)},
+            "projected_risk": {node: what_if.score(node) for node in (source_id, target_id)},
+            "touched_nodes": update.touched,
+        }
+
+    def _build_snapshots(
+        self,
+        seed_sets: List[Dict[str, float]],
+        max_hops: int,
+    ) -> Tuple[int, List[PropagationResult]]:
+        """Propagate seed sets against one pinned graph version."""
+
+        graph = self.graph
+        shared = self._shared_graph
+        if shared is not None and shared.epoch != graph.epoch:
+            shared = None
+        with track_latency("risk_snapshot_build"):
+            if shared is not None and self._propagation_pool is not None:
+                results = propagate_in_processes(
+                    self._propagation_pool,
+                    shared,
+                    self.propagation,
+                    seed_sets,
+                    max_hops,
+                    workers=self._propagation_processes,
+                )
+                return graph.epoch, results
+            if self.propagation.mode != "csr" and shared is None:
+                results = [self.propagation.run(graph, seeds, max_hops) for seeds in seed_sets]
+                return graph.epoch, results
+
+            batch = self.propagation.run_batch(self._csr_graph(graph), seed_sets, max_hops=max_hops)
+        return graph.epoch, [batch.result(column) for column in range(len(batch))]
+
+    def _share_reference_graph(self, name: str) -> SharedCSRGraph | None:
+        """Attach the reference graph another worker published, or publish it first.
+
+        Returns ``None`` when the segment holds a different graph, in which case
+        this worker compiles its own copy.
+        """
+
+        graph = self.graph
+        try:
+            shared = SharedCSRGraph.attach(name)
+        except FileNotFoundError:
+            try:
+                return SharedCSRGraph.publish(
+                    CSRGraph.from_networkx(graph), name, epoch=graph.epoch
+                )
+            except FileExistsError:
+                shared = SharedCSRGraph.attach(name)
+
+        size = self.store.size()
+        if (shared.epoch, shared.number_of_nodes(), shared.number_of_edges()) != (
+            graph.epoch,
+            size["nodes"],
+            size["edges"],
+        ):
+            logger.warning("shared_risk_graph_mismatch", segment=name, epoch=shared.epoch)
+            shared.close()
+            return None
+        return shared
+
+    def close(self) -> None:
+        """Stop the propagation processes and release the shared graph."""
+
+        if self._propagation_pool is not None:
+            self._propagation_pool.shutdown(wait=True)
+        if self._shared_graph is not None:
+            self._shared_graph.close()
+
     def _seed_scores_for_entity(self, entity_id: str) -> Dict[str, float]:
         """Multi-source seeds to represent sanctions + behavior based alerts."""
 
@@ -142,8 +550,8 @@ class RiskService:
     def _adaptive_threshold(self) -> float:
         """Adjust influence threshold by graph density."""
 
-        nodes = max(self.graph.number_of_nodes(), 1)
-        density = self.graph.number_of_edges() / nodes
+        size = self.store.size()
+        density = size["edges"] / max(size["nodes"], 1)
         return 0.05 if density > 1 else 0.02
 
     def _calculate_risk_level(self, score: float) -> str:
@@ -153,10 +561,14 @@ class RiskService:
             return "MEDIUM"
         return "LOW"
 
-    def _build_reference_graph(self) -> nx.DiGraph:
-        graph = nx.DiGraph()
-        graph.add_edge("wallet_sanctioned_01", "mixer_01", risk_transfer=0.9)
-        graph.add_edge("mixer_01", "entity_001", risk_transfer=0.85)
-        graph.add_edge("entity_001", "merchant_991", risk_transfer=0.5)
-        graph.add_edge("wallet_watchlist_77", "entity_001", risk_transfer=0.45)
-        return graph
+    def _build_reference_graph(self) -> VersionedGraphBackend:
+        store = VersionedGraphBackend()
+        store.add_edges_bulk(
+            [
+                ("wallet_sanctioned_01", "mixer_01", {"risk_transfer": 0.9}),
+                ("mixer_01", "entity_001", {"risk_transfer": 0.85}),
+                ("entity_001", "merchant_991", {"risk_transfer": 0.5}),
+                ("wallet_watchlist_77", "entity_001", {"risk_transfer": 0.45}),
+            ]
+        )
+        return store
@@ -2,25 +2,44 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict
+from dataclasses import replace
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, List, Tuple
 
-from app.backends import GraphBackend, InMemoryGraphBackend
-from app.core.exceptions import GraphTraversalError, NotFoundError
+from app.analytics.path_between import find_paths_between
+from app.analytics.tracing import StaleCheckpoint, TraceStats, TraceWalk
+from app.backends import AsyncGraphBackend, GraphBackend, InMemoryGraphBackend, ThreadedGraphBackend
+from app.core.config import settings
+from app.core.exceptions import GraphTraversalError, NotFoundError, ValidationError
 from app.core.logging import get_logger
-from app.metrics import record_trace_result, track_latency, update_graph_size
+from app.core.pagination import decode_cursor, encode_cursor, stale_cursor
+from app.metrics import record_round_trips, record_trace_result, track_latency, update_graph_size
 
 logger = get_logger(__name__)
 
 
 class TraceService:
-    """Service that resolves financial traces and graph views."""
+    """Service that resolves financial traces and graph views.
 
-    def __init__(self, backend: GraphBackend | None = None):
+    Request handlers go through ``self.graph``, the awaitable view of the
+    backend, so traversals run on its executor instead of the event loop.
+    NDJSON streams read ``stream_page_size`` rows per executor call.
+    """
+
+    stream_page_size = 200
+
+    def __init__(self, backend: GraphBackend | None = None, graph: AsyncGraphBackend | None = None):
         self.backend = backend or InMemoryGraphBackend()
-        self._initialize_sample_graph()
+        self.graph = graph or ThreadedGraphBackend(
+            self.backend, max_workers=settings.graph_query_workers
+        )
+        if self.backend.size()["nodes"] == 0:
+            self._initialize_sample_graph()
+        size = self.backend.size()
+        update_graph_size(size["nodes"], size["edges"])
 
     def _initialize_sample_graph(self) -> None:
-        """Initialize with sample data."""
+        """Initialize an empty backend with sample data."""
 
         nodes = [
             ("bank_001", {"type": "bank_account", "name": "Banco X"}),
@@ -31,50 +50,369 @@ class TraceService:
             self.backend.add_node(node_id, **attrs)
 
         edges = [
-            ("bank_001", "pix_001", {"amount": 5000, "channel": "pix", "risk": 0.2, "risk_transfer": 0.9}),
-            ("pix_001", "crypto_001", {"amount": 4800, "channel": "bridge", "risk": 0.5, "risk_transfer": 0.8}),
+            (
+                "bank_001",
+                "pix_001",
+                {"amount": 5000, "channel": "pix", "risk": 0.2, "risk_transfer": 0.9},
+            ),
+            (
+                "pix_001",
+                "crypto_001",
+                {"amount": 4800, "channel": "bridge", "risk": 0.5, "risk_transfer": 0.8},
+            ),
         ]
         for src, dst, attrs in edges:
             self.backend.add_edge(src, dst, **attrs)
 
-        size = self.backend.size()
-        update_graph_size(size["nodes"], size["edges"])
-
     async def trace_flow(
         self,
         source_id: str,
         max_hops: int = 5,
         min_amount: float = 0.0,
+        max_paths: int | None = None,
+        limit: int | None = None,
+        cursor: str | None = None,
+        channel: str | None = None,
     ) -> Dict[str, Any]:
-        """Trace financial flow from source."""
+        """Trace financial flow from source up to ``max_hops`` hops.
 
-        logger.info("trace_flow_started", source_id=source_id, max_hops=max_hops)
+        With ``limit`` the response holds at most that many paths plus a
+        ``next_cursor`` that resumes the walk where this page stopped. Ingest
+        between pages keeps the cursor usable unless it reordered the out-edges
+        ahead of where the walk stopped (``StaleCursor``). With ``channel`` only
+        edges on that channel are followed.
+        """
 
-        if not self.backend.has_node(source_id):
-            record_trace_result(hops=0, success=False)
-            raise NotFoundError(f"Node {source_id} not found")
+        logger.info("trace_flow_started", source_id=source_id, max_hops=max_hops, channel=channel)
 
-        paths = []
+        query = self._trace_query(source_id, max_hops, min_amount, max_paths, channel)
+        stats = TraceStats()
         try:
+            checkpoint = decode_cursor(cursor, "trace", query) if cursor else None
+            if not await self.graph.has_node(source_id):
+                raise NotFoundError(f"Node {source_id} not found")
             with track_latency("trace"):
-                for target in self.backend.successors(source_id):
-                    edge_data = self.backend.get_edge(source_id, target)
-                    if edge_data.get("amount", 0) >= min_amount:
-                        paths.append({"from": source_id, "to": target, "data": edge_data})
+                paths, resume, epoch = await self.graph.run(
+                    self._trace_page,
+                    source_id,
+                    max_hops,
+                    min_amount,
+                    max_paths,
+                    stats,
+                    checkpoint,
+                    limit,
+                    channel,
+                )
+        except (NotFoundError, ValidationError):
+            record_trace_result(hops=0, success=False)
+            raise
         except Exception as exc:
             record_trace_result(hops=0, success=False)
             raise GraphTraversalError(f"Failed to traverse graph: {str(exc)}") from exc
 
-        record_trace_result(hops=len(paths), success=True)
+        record_trace_result(hops=stats.max_depth, success=True)
+
+        response = {
+            "source_id": source_id,
+            "paths": paths,
+            "total_paths": len(paths),
+            "max_hops": max_hops,
+            "truncated": stats.truncated,
+            "states_visited": stats.states,
+            "cycles_detected": stats.cycles,
+        }
+        if limit is not None or cursor is not None:
+            response["next_cursor"] = (
+                encode_cursor("trace", epoch, query, resume) if resume else None
+            )
+        return response
+
+    def _trace_page(
+        self,
+        backend: GraphBackend,
+        source_id: str,
+        max_hops: int,
+        min_amount: float,
+        max_paths: int | None,
+        stats: TraceStats,
+        checkpoint: Dict[str, Any] | None,
+        limit: int | None,
+        channel: str | None,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any] | None, int]:
+        """One page of paths, the resume checkpoint and the epoch the page was read at."""
+
+        round_trips = backend.round_trips
+        walk = self._walk(
+            backend, source_id, max_hops, min_amount, max_paths, stats, checkpoint, channel
+        )
+        paths = list(islice(walk, limit))
+        record_round_trips("trace", backend.round_trips - round_trips)
+        return paths, walk.checkpoint(), backend.epoch
 
-        return {"source_id": source_id, "paths": paths, "total_paths": len(paths), "max_hops": max_hops}
+    @staticmethod
+    def _walk(
+        backend: GraphBackend,
+        source_id: str,
+        max_hops: int,
+        min_amount: float,
+        max_paths: int | None,
+        stats: TraceStats | None,
+        checkpoint: Dict[str, Any] | None,
+        channel: str | None = None,
+    ) -> TraceWalk:
+        max_hops = min(max_hops, settings.max_trace_hops)
+        backend.prefetch(source_id, max_hops, min_amount, channel)
+        try:
+            return TraceWalk(
+                backend,
+                source_id,
+                max_hops=max_hops,
+                min_amount=min_amount,
+                max_paths=min(max_paths or settings.trace_max_paths, settings.trace_max_paths),
+                max_states=settings.trace_max_states,
+                stats=stats,
+                checkpoint=checkpoint,
+                channel=channel,
+            )
+        except StaleCheckpoint as exc:
+            raise stale_cursor(str(exc)) from exc
+        except ValueError as exc:
+            raise ValidationError(
+                "Invalid pagination cursor", code="InvalidCursor", details={"reason": str(exc)}
+            ) from exc
 
-    async def graph_snapshot(self, entity_id: str) -> Dict[str, Any]:
-        """Return graph neighborhood and graph size for an entity."""
+    @staticmethod
+    def _trace_query(
+        source_id: str,
+        max_hops: int,
+        min_amount: float,
+        max_paths: int | None,
+        channel: str | None,
+    ) -> Dict[str, Any]:
+        return {
+            "source_id": source_id,
+            "max_hops": max_hops,
+            "min_amount": min_amount,
+            "max_paths": max_paths,
+            "channel": channel,
+        }
 
-        if not self.backend.has_node(entity_id):
+    async def stream_trace(
+        self,
+        source_id: str,
+        max_hops: int = 5,
+        min_amount: float = 0.0,
+        max_paths: int | None = None,
+        channel: str | None = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Trace rows for NDJSON streaming: one ``path`` row each, then a ``summary`` row.
+
+        Each page of paths is read like a :meth:`trace_flow` page and the next
+        one resumes from its checkpoint. All pages read one pinned version when
+        the backend keeps versions. Otherwise ingest between pages is picked up
+        like it is for a cursor, and the stream ends with ``truncated`` set only if
+        the checkpoint went stale.
+        """
+
+        if not await self.graph.has_node(source_id):
+            raise NotFoundError(f"Node {source_id} not found")
+        return self._trace_rows(source_id, max_hops, min_amount, max_paths, channel)
+
+    async def _trace_rows(
+        self,
+        source_id: str,
+        max_hops: int,
+        min_amount: float,
+        max_paths: int | None,
+        channel: str | None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        graph = self.graph.pin()
+        stats = TraceStats()
+        checkpoint: Dict[str, Any] | None = None
+        epoch = graph.epoch
+        try:
+            while True:
+                before = replace(stats)
+                try:
+                    paths, checkpoint, epoch = await graph.run(
+                        self._trace_page,
+                        source_id,
+                        max_hops,
+                        min_amount,
+                        max_paths,
+                        stats,
+                        checkpoint,
+                        self.stream_page_size,
+                        channel,
+                    )
+                except ValidationError as exc:
+                    if exc.code != "StaleCursor":
+                        raise
+                    stats = replace(before, truncated=True)
+                    break
+                for path in paths:
+                    yield {"type": "path", **path}
+                if checkpoint is None:
+                    break
+        except Exception:
+            record_trace_result(hops=0, success=False)
+            raise
+        record_trace_result(hops=stats.max_depth, success=True)
+        yield {
+            "type": "summary",
+            "source_id": source_id,
+            "total_paths": stats.paths,
+            "max_hops": max_hops,
+            "truncated": stats.truncated,
+            "states_visited": stats.states,
+            "cycles_detected": stats.cycles,
+            "graph_epoch": epoch,
+        }
+
+    async def path_between(
+        self,
+        source_id: str,
+        target_id: str,
+        max_hops: int = 6,
+    ) -> Dict[str, Any]:
+        """Shortest and highest-risk paths from source to target within ``max_hops``."""
+
+        for node_id in (source_id, target_id):
+            if not await self.graph.has_node(node_id):
+                raise NotFoundError(f"Node {node_id} not found")
+
+        max_hops = min(max_hops, settings.max_trace_hops)
+        try:
+            with track_latency("path_between"):
+                return await self.graph.run(self._path_between, source_id, target_id, max_hops)
+        except Exception as exc:
+            raise GraphTraversalError(f"Failed to traverse graph: {str(exc)}") from exc
+
+    @classmethod
+    def _path_between(
+        cls,
+        backend: GraphBackend,
+        source_id: str,
+        target_id: str,
+        max_hops: int,
+    ) -> Dict[str, Any]:
+        result = find_paths_between(backend, source_id, target_id, max_hops)
+        return {
+            "source_id": source_id,
+            "target_id": target_id,
+            "max_hops": max_hops,
+            "connected": result.connected,
+            "shortest_path": cls._path_view(backend, result.shortest_path),
+            "highest_risk_path": cls._path_view(backend, result.highest_risk_path),
+            "highest_risk_product": result.highest_risk_product,
+            "states_explored": result.states_explored,
+        }
+
+    @staticmethod
+    def _path_view(backend: GraphBackend, nodes: List[str] | None) -> Dict[str, Any] | None:
+        if nodes is None:
+            return None
+        hops = [
+            {"from": source, "to": target, "data": backend.get_edge(source, target)}
+            for source, target in zip(nodes, nodes[1:])
+        ]
+        return {"nodes": nodes, "hops": hops, "length": len(hops)}
+
+    async def graph_snapshot(
+        self,
+        entity_id: str,
+        limit: int | None = None,
+        cursor: str | None = None,
+    ) -> Dict[str, Any]:
+        """Return graph neighborhood and graph size for an entity.
+
+        With ``limit`` or ``cursor`` the out-edges are paged largest amount first
+        and ``next_cursor`` continues from the backend's index position. The
+        cursor remembers the last target it returned and is ``StaleCursor`` only
+        if a new edge was ranked ahead of it.
+        """
+
+        if not await self.graph.has_node(entity_id):
             raise NotFoundError(f"Node {entity_id} not found")
 
-        neighborhood = self.backend.neighbors_with_edges(entity_id)
-        size = self.backend.size()
-        return {"graph": neighborhood, "graph_size": size}
+        size = await self.graph.size()
+        if limit is None and cursor is None:
+            neighborhood = await self.graph.neighbors_with_edges(entity_id)
+            return {"graph": neighborhood, "graph_size": size}
+
+        query = {"entity_id": entity_id}
+        state = decode_cursor(cursor, "graph", query) if cursor else {"offset": 0}
+        start, last = state.get("offset"), state.get("last")
+        if type(start) is not int or start < 0 or (start > 0) != isinstance(last, str):
+            raise ValidationError("Invalid pagination cursor", code="InvalidCursor")
+        stop = None if limit is None else limit + 1
+        outgoing, epoch = await self.graph.run(self._out_edges_page, entity_id, start, stop, last)
+        next_cursor = None
+        if limit is not None and len(outgoing) > limit:
+            outgoing.pop()
+            resume = {"offset": start + limit, "last": outgoing[-1]["target"]}
+            next_cursor = encode_cursor("graph", epoch, query, resume)
+        return {
+            "graph": {"entity": entity_id, "outgoing": outgoing},
+            "graph_size": size,
+            "next_cursor": next_cursor,
+        }
+
+    @staticmethod
+    def _out_edges_page(
+        backend: GraphBackend,
+        entity_id: str,
+        start: int,
+        stop: int | None,
+        last: str | None = None,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Out-edges ``start:start + stop``; ``last`` must be the target just before ``start``."""
+
+        edges = backend.successors_with_edges(entity_id, start=max(start - 1, 0))
+        if start:
+            previous = next(edges, None)
+            if previous is None:
+                raise ValidationError("Invalid pagination cursor", code="InvalidCursor")
+            if previous[0] != last:
+                raise stale_cursor(f"out-edges of {entity_id!r} changed ahead of the cursor")
+        outgoing = [{"target": target, "edge": dict(edge)} for target, edge in islice(edges, stop)]
+        return outgoing, backend.epoch
+
+    async def stream_graph(self, entity_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Graph view rows for NDJSON streaming: one ``edge`` row per out-edge, then ``summary``.
+
+        Out-edges are read largest amount first in :meth:`graph_snapshot` pages,
+        all from one pinned version when the backend keeps versions. Otherwise
+        the stream ends with ``truncated`` set only if a new edge was ranked
+        ahead of the page boundary.
+        """
+
+        if not await self.graph.has_node(entity_id):
+            raise NotFoundError(f"Node {entity_id} not found")
+        return self._graph_rows(entity_id)
+
+    async def _graph_rows(self, entity_id: str) -> AsyncIterator[Dict[str, Any]]:
+        graph = self.graph.pin()
+        start, last, epoch, truncated = 0, None, graph.epoch, False
+        while True:
+            try:
+                outgoing, epoch = await graph.run(
+                    self._out_edges_page, entity_id, start, self.stream_page_size, last
+                )
+            except ValidationError as exc:
+                if exc.code != "StaleCursor":
+                    raise
+                truncated = True
+                break
+            for row in outgoing:
+                yield {"type": "edge", **row}
+            if len(outgoing) < self.stream_page_size:
+                break
+            start, last = start + len(outgoing), outgoing[-1]["target"]
+        yield {
+            "type": "summary",
+            "entity": entity_id,
+            "graph_size": await graph.size(),
+            "truncated": truncated,
+            "graph_epoch": epoch,
+        }
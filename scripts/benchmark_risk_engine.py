@@ -32,10 +32,30 @@ def build_synthetic_graph(nodes: int = 300, edges: int = 1200, seed: int = 42) -
     return graph
 
 
-def propagation_scores(graph: nx.DiGraph, seeds: dict[str, float]) -> dict[str, float]:
-    engine = RiskPropagationEngine(decay=0.75, min_signal=0.01)
+def build_fan_in_graph(width: int = 8, layers: int = 3) -> tuple[nx.DiGraph, dict[str, float]]:
+    """Fully connected layers fed by seeds listed weakest first.
+
+    A FIFO walk raises every node of the next layer once per predecessor, in
+    ascending order, and re-expands it each time; best-first settles it once.
+    """
+
+    graph = nx.DiGraph()
+    for layer in range(layers):
+        for a in range(width):
+            for b in range(width):
+                graph.add_edge(f"L{layer}_{a}", f"L{layer + 1}_{b}", risk_transfer=0.9)
+    seeds = {f"L0_{idx}": round(0.5 + 0.05 * idx, 2) for idx in range(width)}
+    return graph, seeds
+
+
+def propagation_scores(
+    graph: nx.DiGraph,
+    seeds: dict[str, float],
+    mode: str = "reference",
+) -> tuple[dict[str, float], dict[str, int]]:
+    engine = RiskPropagationEngine(decay=0.75, min_signal=0.01, mode=mode)
     result = engine.run(graph, seeds, max_hops=4)
-    return result.scores
+    return result.scores, result.stats
 
 
 def bfs_baseline(graph: nx.DiGraph, seed: str, max_hops: int = 4) -> dict[str, float]:
@@ -83,9 +103,13 @@ def run_benchmark(seed: int = 42, runs_count: int = 10) -> dict:
     runs = []
     for _ in range(runs_count):
         t0 = time.perf_counter()
-        p_scores = propagation_scores(graph, seeds)
+        p_scores, p_stats = propagation_scores(graph, seeds)
         p_lat = time.perf_counter() - t0
 
+        t3 = time.perf_counter()
+        bf_scores, bf_stats = propagation_scores(graph, seeds, mode="best_first")
+        bf_lat = time.perf_counter() - t3
+
         t1 = time.perf_counter()
         b_scores = bfs_baseline(graph, "N0")
         b_lat = time.perf_counter() - t1
@@ -95,12 +119,14 @@ def run_benchmark(seed: int = 42, runs_count: int = 10) -> dict:
         l_lat = time.perf_counter() - t2
 
         p_pr, p_rc = pseudo_quality(p_scores)
+        bf_pr, bf_rc = pseudo_quality(bf_scores)
         b_pr, b_rc = pseudo_quality(b_scores)
         l_pr, l_rc = pseudo_quality(l_scores)
 
         runs.append(
             {
-                "propagation": (p_pr, p_rc, p_lat),
+                "propagation": (p_pr, p_rc, p_lat, p_stats),
+                "best_first": (bf_pr, bf_rc, bf_lat, bf_stats),
                 "bfs": (b_pr, b_rc, b_lat),
                 "local": (l_pr, l_rc, l_lat),
             }
@@ -109,13 +135,35 @@ def run_benchmark(seed: int = 42, runs_count: int = 10) -> dict:
     def avg(metric: str, idx: int) -> float:
         return mean(run[metric][idx] for run in runs)
 
+    def counters(metric: str) -> dict[str, int]:
+        # State counters are deterministic for a given graph and seed set.
+        stats = runs[0][metric][3]
+        return {
+            "states_expanded": stats["states_expanded"],
+            "states_pruned": stats["states_pruned"],
+        }
+
+    fan_in, fan_in_seeds = build_fan_in_graph()
+    fan_in_expanded = {
+        mode: propagation_scores(fan_in, fan_in_seeds, mode=mode)[1]["states_expanded"]
+        for mode in ("reference", "best_first")
+    }
+
     return {
         "seed": seed,
+        "fan_in_states_expanded": fan_in_expanded,
         "rows": {
             "propagation": {
                 "precision": round(avg("propagation", 0), 4),
                 "recall": round(avg("propagation", 1), 4),
                 "latency_ms": round(avg("propagation", 2) * 1000, 2),
+                **counters("propagation"),
+            },
+            "best_first": {
+                "precision": round(avg("best_first", 0), 4),
+                "recall": round(avg("best_first", 1), 4),
+                "latency_ms": round(avg("best_first", 2) * 1000, 2),
+                **counters("best_first"),
             },
             "bfs": {
                 "precision": round(avg("bfs", 0), 4),
@@ -142,11 +190,22 @@ def main() -> None:
     result = run_benchmark(seed=args.seed, runs_count=args.runs)
 
     print("=== Risk Engine Benchmark ===")
-    print("metric,precision,recall,latency_ms")
-    for name in ["propagation", "bfs", "local"]:
+    print("metric,precision,recall,latency_ms,states_expanded,states_pruned")
+    for name in ["propagation", "best_first", "bfs", "local"]:
         row = result["rows"][name]
-        print(f"{name},{row['precision']:.4f},{row['recall']:.4f},{row['latency_ms']:.2f}")
-    print(f"scalability,nodes={result['scalability']['nodes']},edges={result['scalability']['edges']}")
+        expanded = row.get("states_expanded", "-")
+        pruned = row.get("states_pruned", "-")
+        print(
+            f"{name},{row['precision']:.4f},{row['recall']:.4f},{row['latency_ms']:.2f},"
+            f"{expanded},{pruned}"
+        )
+    print(
+        f"scalability,nodes={result['scalability']['nodes']},edges={result['scalability']['edges']}"
+    )
+    fan_in = result["fan_in_states_expanded"]
+    print(
+        f"fan_in_states_expanded,reference={fan_in['reference']},best_first={fan_in['best_first']}"
+    )
 
     if args.json_output:
         args.json_output.parent.mkdir(parents=True, exist_ok=True)
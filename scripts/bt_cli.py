@@ -6,6 +6,7 @@ import argparse
 import json
 import sys
 from pathlib import Path
+from typing import List, Optional
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
@@ -14,7 +15,9 @@ if str(PROJECT_ROOT) not in sys.path:
 from bridge_trace_sdk import BridgeTraceSDK
 
 
-def main() -> None:
+def main(argv: Optional[List[str]] = None) -> None:
+    from app.backends import EDGE_COLUMNS
+
     parser = argparse.ArgumentParser(description="BridgeTrace CLI")
     parser.add_argument("--base-url", default="http://localhost:8000")
     parser.add_argument("--api-key", default=None)
@@ -31,7 +34,36 @@ def main() -> None:
     risk_cmd.add_argument("--entity", required=True)
     risk_cmd.add_argument("--days", type=int, default=30)
 
-    args = parser.parse_args()
+    snapshot_cmd = sub.add_parser(
+        "snapshot", help="Build a memory-mapped graph snapshot from JSONL"
+    )
+    snapshot_cmd.add_argument("--input", required=True, help="JSONL file with source/target rows")
+    snapshot_cmd.add_argument("--output", required=True)
+    snapshot_cmd.add_argument("--batch-size", type=int, default=50_000)
+    snapshot_cmd.add_argument(
+        "--fields",
+        nargs="*",
+        default=list(EDGE_COLUMNS),
+        help=f"Edge attributes to keep (default: {' '.join(EDGE_COLUMNS)})",
+    )
+    snapshot_cmd.add_argument(
+        "--all-fields",
+        dest="fields",
+        action="store_const",
+        const=None,
+        help="Keep every attribute of the input rows",
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "snapshot":
+        from app.backends import build_graph_snapshot
+
+        report, written = build_graph_snapshot(
+            args.input, args.output, args.batch_size, args.fields
+        )
+        print(json.dumps({"output": args.output, "rejected": report.rejected, **written}, indent=2))
+        return
+
     sdk = BridgeTraceSDK(args.base_url, api_key=args.api_key, tenant_id=args.tenant)
 
     if args.command == "trace":
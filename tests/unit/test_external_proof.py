@@ -11,3 +11,13 @@ def test_benchmark_is_deterministic_for_same_seed() -> None:
     assert a["rows"]["propagation"]["precision"] == b["rows"]["propagation"]["precision"]
     assert a["rows"]["bfs"]["recall"] == b["rows"]["bfs"]["recall"]
     assert a["scalability"] == b["scalability"]
+
+
+def test_benchmark_reports_state_counters() -> None:
+    result = run_benchmark(seed=42, runs_count=1)
+
+    for name in ("propagation", "best_first"):
+        assert result["rows"][name]["states_expanded"] > 0
+        assert "states_pruned" in result["rows"][name]
+    fan_in = result["fan_in_states_expanded"]
+    assert fan_in["best_first"] < fan_in["reference"]
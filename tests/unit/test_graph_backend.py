@@ -0,0 +1,542 @@
+"""Test graph backend implementations."""
+
+import asyncio
+import gc
+import io
+import json
+import threading
+import time
+from collections.abc import Mapping
+
+import networkx as nx
+import pytest
+
+from app.backends import (
+    CompactGraphBackend,
+    DurableGraphBackend,
+    InMemoryGraphBackend,
+    MmapGraphBackend,
+    ThreadedGraphBackend,
+    VersionedGraphBackend,
+    build_graph_snapshot,
+    load_jsonl,
+    write_graph_snapshot,
+)
+from app.metrics.graph_stats import GRAPH_EDGES_TOTAL
+from app.services.trace_service import TraceService
+
+BACKENDS = [InMemoryGraphBackend, CompactGraphBackend, VersionedGraphBackend]
+
+
+@pytest.fixture(params=BACKENDS, ids=lambda cls: cls.__name__)
+def backend(request):
+    return request.param()
+
+
+def test_backend_contract(backend) -> None:
+    backend.add_node("a", type="bank_account")
+    backend.add_edge("a", "b", amount=5000, channel="pix", risk=0.2, risk_transfer=0.9)
+    backend.add_edge("a", "c", amount=12.5, timestamp="2024-03-01T10:00:00Z", currency="BRL")
+    backend.add_edge("c", "b", amount=1)
+    backend.add_edge("a", "b", risk=0.4)
+
+    assert backend.has_node("c") and not backend.has_node("z")
+    assert backend.size() == {"nodes": 3, "edges": 3}
+    assert backend.successors("a") == ["b", "c"]
+    assert backend.predecessors("b") == ["a", "c"]
+    assert backend.get_edge("a", "b") == {
+        "amount": 5000,
+        "channel": "pix",
+        "risk": 0.4,
+        "risk_transfer": 0.9,
+    }
+    assert backend.get_edge("a", "c") == {
+        "amount": 12.5,
+        "timestamp": "2024-03-01T10:00:00Z",
+        "currency": "BRL",
+    }
+    assert backend.neighbors_with_edges("c") == {
+        "entity": "c",
+        "outgoing": [{"target": "b", "edge": {"amount": 1}}],
+    }
+
+    graph = backend.to_networkx()
+    assert graph.nodes["a"] == {"type": "bank_account"}
+    assert nx.utils.edges_equal(
+        graph.edges(data=True),
+        [
+            ("a", "b", backend.get_edge("a", "b")),
+            ("a", "c", backend.get_edge("a", "c")),
+            ("c", "b", {"amount": 1}),
+        ],
+    )
+
+
+def test_successors_with_edges_bisects_amount_index(backend) -> None:
+    for target, amount in [("a", 50), ("b", 500), ("c", 5), ("d", 500)]:
+        backend.add_edge("hub", target, amount=amount)
+
+    assert [target for target, _ in backend.successors_with_edges("hub", min_amount=50)] == [
+        "d",
+        "b",
+        "a",
+    ]
+
+    backend.add_edge("hub", "c", amount=1000)
+    backend.add_edge("hub", "b", amount=1)
+    backend.add_edge("hub", "e", amount=60)
+    qualifying = dict(backend.successors_with_edges("hub", min_amount=50))
+    assert list(qualifying) == ["c", "d", "e", "a"]
+    assert qualifying["c"]["amount"] == 1000
+    assert [
+        target for target, _ in backend.successors_with_edges("hub", min_amount=50, start=2)
+    ] == ["e", "a"]
+
+
+def test_channel_partitions_and_node_attribute_index(backend) -> None:
+    backend.add_node("w1", type="crypto_wallet")
+    backend.add_node("w2", type="crypto_wallet")
+    backend.add_node("acct", type="bank_account")
+    backend.add_node("w2", type="pix_key", name="PIX ***9")
+    for target, amount, channel in [
+        ("w1", 10, "bridge"),
+        ("w2", 300, "pix"),
+        ("x", 50, "bridge"),
+        ("y", 70, None),
+    ]:
+        attrs = {"amount": amount} if channel is None else {"amount": amount, "channel": channel}
+        backend.add_edge("acct", target, **attrs)
+
+    assert backend.nodes_by_attribute("type", "crypto_wallet") == ["w1"]
+    assert sorted(backend.nodes_by_attribute("type", "pix_key")) == ["w2"]
+    assert backend.nodes_by_attribute("type", "exchange") == []
+
+    def targets(**kwargs):
+        return [target for target, _ in backend.successors_with_edges("acct", **kwargs)]
+
+    assert targets(channel="bridge") == ["x", "w1"]
+    assert targets(channel="bridge", min_amount=20) == ["x"]
+    assert targets(channel="bridge", start=1) == ["w1"]
+    assert targets(channel="TED") == []
+    assert targets() == ["w2", "y", "x", "w1"]
+
+    backend.add_edge("acct", "w2", channel="bridge")
+    backend.add_edge("acct", "x", amount=5, channel="pix")
+    assert targets(channel="bridge") == ["w2", "w1"]
+    assert targets(channel="pix") == ["x"]
+    assert targets() == ["w2", "y", "w1", "x"]
+
+
+def test_edge_view_is_read_only(backend) -> None:
+    backend.add_edge("a", "b", amount=10)
+    epoch = backend.epoch
+    view = backend.edge_view("a", "b")
+
+    assert isinstance(view, Mapping)
+    with pytest.raises(TypeError):
+        view["amount"] = 0
+    backend.add_edge("a", "b", amount=20)
+    # Views are live, except on versioned backends where they belong to one version.
+    assert view["amount"] == (10 if backend.pin() is not backend else 20)
+    assert backend.epoch > epoch
+
+
+def test_trace_matches_across_backends() -> None:
+    results = []
+    for backend_cls in BACKENDS:
+        service = TraceService(backend=backend_cls())
+        for idx in range(4):
+            service.backend.add_edge(
+                "crypto_001", f"exit_{idx}", amount=100 * idx, channel="bridge"
+            )
+            service.backend.add_edge(f"exit_{idx}", "bank_001", amount=10)
+        results.append(asyncio.run(service.trace_flow("bank_001", max_hops=6, min_amount=50)))
+    assert results[0] == results[1] == results[2]
+
+
+def test_compact_backend_stays_under_100_bytes_per_edge() -> None:
+    backend = CompactGraphBackend()
+    for idx in range(20_000):
+        backend.add_edge(
+            f"acct_{idx % 2_000}",
+            f"acct_{(idx * 7 + 1) % 2_000}_{idx // 2_000}",
+            amount=idx,
+            channel="pix",
+            risk=0.1,
+            risk_transfer=0.8,
+            timestamp="2024-03-01T10:00:00Z",
+        )
+    assert backend.nbytes() / backend.size()["edges"] < 100
+
+
+def test_compact_backend_interns_extra_attributes_into_columns() -> None:
+    def records(extra):
+        for idx in range(20_000):
+            attrs = {"amount": idx, "channel": "pix"}
+            if extra:
+                attrs.update(memo=("refund", "fee", "salary")[idx % 3], flagged=idx % 2 == 0)
+            yield f"acct_{idx % 2_000}", f"acct_{idx}", attrs
+
+    plain, tagged = CompactGraphBackend(), CompactGraphBackend()
+    plain.add_edges_bulk(records(extra=False))
+    tagged.add_edges_bulk(records(extra=True))
+
+    assert tagged.nbytes() / tagged.size()["edges"] < 100
+    assert tagged.nbytes() - plain.nbytes() >= 20_000 * 2 * 4
+    assert tagged.get_edge("acct_5", "acct_5") == {
+        "amount": 5,
+        "channel": "pix",
+        "memo": "salary",
+        "flagged": False,
+    }
+    tagged.add_edge("acct_5", "acct_5", memo=7, amount="n/a")
+    assert tagged.get_edge("acct_5", "acct_5") == {
+        "channel": "pix",
+        "memo": 7,
+        "flagged": False,
+        "amount": "n/a",
+    }
+    tagged.add_edge("acct_5", "acct_5", amount=9)
+    assert tagged.get_edge("acct_5", "acct_5")["amount"] == 9
+    assert "amount" not in dict(tagged._extras())[5]
+
+
+def test_add_edges_bulk_matches_single_inserts(backend) -> None:
+    records = [
+        ("a", "b", {"amount": 10, "channel": "pix"}),
+        ("b", "c", {"amount": 20}),
+        ("a", "b", {"amount": 30}),
+    ]
+    backend.add_edge("a", "z", amount=15)
+    list(backend.successors_with_edges("a"))
+    epoch = backend.epoch
+
+    assert backend.add_edges_bulk(iter(records)) == 3
+    assert backend.epoch > epoch
+    assert backend.get_edge("a", "b") == {"amount": 30, "channel": "pix"}
+    assert [target for target, _ in backend.successors_with_edges("a", min_amount=12)] == ["b", "z"]
+
+
+def test_load_jsonl_streams_batches_and_updates_gauges(backend) -> None:
+    lines = [
+        json.dumps(
+            {"tx_id": f"BTX_{idx}", "source": f"w{idx % 3}", "target": f"e{idx}", "amount": idx}
+        )
+        for idx in range(7)
+    ]
+    lines.insert(3, "{not json")
+
+    report = load_jsonl(
+        backend, io.StringIO("\n".join(lines) + "\n"), batch_size=3, fields=["amount"]
+    )
+
+    assert (report.rows, report.rejected, report.batches) == (7, 1, 3)
+    assert backend.get_edge("w1", "e4") == {"amount": 4}
+    assert GRAPH_EDGES_TOTAL._value.get() == 7
+
+
+def test_load_jsonl_keeps_column_fields_and_restores_gc_thresholds(backend) -> None:
+    row = {"tx_id": "BTX_1", "source": "w", "target": "e", "amount": 5, "channel": "pix"}
+    thresholds = gc.get_threshold()
+
+    load_jsonl(backend, io.StringIO(json.dumps(row)))
+    assert backend.get_edge("w", "e") == {"amount": 5, "channel": "pix"}
+    load_jsonl(backend, io.StringIO(json.dumps(row)), fields=None)
+    assert backend.get_edge("w", "e")["tx_id"] == "BTX_1"
+    assert gc.isenabled() and gc.get_threshold() == thresholds
+
+
+def test_mmap_snapshot_round_trips_compact_graph(tmp_path) -> None:
+    compact = CompactGraphBackend()
+    compact.add_node("hub", type="exchange", tags=["vasp"])
+    for idx, amount in enumerate([50, 500, 5, 500, 7.5]):
+        channel = "pix" if idx % 2 else "bridge"
+        compact.add_edge(
+            "hub", f"n{idx}", amount=amount, channel=channel, timestamp="2024-03-01T10:00:00Z"
+        )
+    compact.add_edge("n1", "hub", amount=3, risk=0.7, memo="refund")
+    compact.add_edge("n4", "n1", timestamp=1709287200.5)
+
+    write_graph_snapshot(compact, tmp_path / "graph.btg")
+    snapshot = MmapGraphBackend(tmp_path / "graph.btg")
+
+    assert snapshot.size() == compact.size()
+    assert snapshot.has_node("n3") and not snapshot.has_node("missing")
+    for node in ["hub", "n1", "n4"]:
+        assert snapshot.successors(node) == compact.successors(node)
+        assert snapshot.predecessors(node) == compact.predecessors(node)
+        assert snapshot.neighbors_with_edges(node) == compact.neighbors_with_edges(node)
+        for args in [
+            (0.0, 0),
+            (50, 0),
+            (50, 1),
+            (0.0, 1, "bridge"),
+            (50, 0, "pix"),
+            (0.0, 0, "TED"),
+        ]:
+            assert [(t, dict(e)) for t, e in snapshot.successors_with_edges(node, *args)] == [
+                (t, dict(e)) for t, e in compact.successors_with_edges(node, *args)
+            ]
+    assert snapshot.nodes_by_attribute("type", "exchange") == ["hub"]
+    assert snapshot.get_edge("n1", "hub") == {"amount": 3, "risk": 0.7, "memo": "refund"}
+    # Extra attributes are indexed per edge; edges without any store zero bytes.
+    extra_offsets = snapshot._sections["extra_offsets"]
+    assert len(extra_offsets) == snapshot.size()["edges"] + 1
+    assert int((extra_offsets[1:] > extra_offsets[:-1]).sum()) == 1
+    with pytest.raises(KeyError):
+        snapshot.get_edge("n1", "n4")
+    with pytest.raises(NotImplementedError):
+        snapshot.add_edge("a", "b", amount=1)
+
+    graph = snapshot.to_networkx()
+    assert graph.nodes["hub"] == {"type": "exchange", "tags": ["vasp"]}
+    assert nx.utils.edges_equal(graph.edges(data=True), compact.to_networkx().edges(data=True))
+    assert snapshot.load_compact().get_edge("n4", "n1") == compact.get_edge("n4", "n1")
+
+
+def test_mmap_snapshot_serves_traces_and_checks_version(tmp_path) -> None:
+    source = tmp_path / "tx.jsonl"
+    source.write_text(
+        "\n".join(
+            json.dumps({"source": src, "target": dst, "amount": amount, "channel": "bridge"})
+            for src, dst, amount in [
+                ("bank_001", "pix_001", 5000),
+                ("pix_001", "crypto_001", 4800),
+                ("pix_001", "x", 1),
+            ]
+        )
+    )
+    report, written = build_graph_snapshot(source, tmp_path / "graph.btg")
+    assert (report.rows, written["edges"]) == (3, 3)
+
+    compact = CompactGraphBackend()
+    load_jsonl(compact, source)
+    expected = TraceService(backend=compact)
+    served = TraceService(backend=MmapGraphBackend(tmp_path / "graph.btg"))
+    assert asyncio.run(served.trace_flow("bank_001", min_amount=10)) == asyncio.run(
+        expected.trace_flow("bank_001", min_amount=10)
+    )
+
+    raw = bytearray((tmp_path / "graph.btg").read_bytes())
+    raw[8] = 99
+    (tmp_path / "future.btg").write_bytes(bytes(raw))
+    with pytest.raises(ValueError, match="version 99"):
+        MmapGraphBackend(tmp_path / "future.btg")
+
+
+@pytest.mark.parametrize("backend_cls", BACKENDS, ids=lambda cls: cls.__name__)
+def test_durable_backend_recovers_snapshot_and_wal_tail(tmp_path, backend_cls) -> None:
+    durable = DurableGraphBackend(backend_cls(), tmp_path, fsync_interval=60)
+    durable.add_node("a", type="bank_account")
+    durable.add_edge("a", "b", amount=10, channel="pix")
+    assert durable.snapshot() == 1
+    durable.add_edges_bulk([("b", "c", {"amount": 5}), ("a", "b", {"amount": 30})])
+    durable.add_node("lonely")
+    durable.close()
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "snapshot-00000001.log",
+        "wal-00000001.log",
+    ]
+
+    wal = tmp_path / "wal-00000001.log"
+    wal.write_bytes(wal.read_bytes() + b"\x20\x00\x00\x00torn")
+
+    recovered = DurableGraphBackend(backend_cls(), tmp_path, fsync_interval=60)
+    assert recovered.generation == 1
+    assert recovered.size() == {"nodes": 4, "edges": 2}
+    assert recovered.get_edge("a", "b") == {"amount": 30, "channel": "pix"}
+    assert recovered.to_networkx().nodes["a"] == {"type": "bank_account"}
+    assert [target for target, _ in recovered.successors_with_edges("b")] == ["c"]
+
+    recovered.add_edge("c", "d", amount=1)
+    recovered.sync()
+    recovered.close()
+    restarted = DurableGraphBackend(backend_cls(), tmp_path, fsync_interval=60)
+    assert restarted.has_node("d")
+    restarted.close()
+
+
+@pytest.mark.parametrize("backend_cls", [InMemoryGraphBackend, VersionedGraphBackend])
+def test_durable_snapshot_writes_outside_the_writer_lock(tmp_path, backend_cls) -> None:
+    durable = DurableGraphBackend(backend_cls(), tmp_path, fsync_interval=60, snapshot_every=5)
+    durable.add_edges_bulk([(f"n{idx}", f"n{idx + 1}", {"amount": idx}) for idx in range(10)])
+    # A bulk record counts its edges, so bulk ingest still reaches snapshot_every.
+    assert durable._since_snapshot == 10
+
+    serialising, release = threading.Event(), threading.Event()
+    records = DurableGraphBackend._snapshot_records
+
+    def slow_records(graph):
+        serialising.set()
+        release.wait(5)
+        yield from records(graph)
+
+    durable._snapshot_records = slow_records
+    snapshot = threading.Thread(target=durable.snapshot)
+    snapshot.start()
+    assert serialising.wait(5)
+    # Writers proceed while the snapshot is serialised; they land in the next WAL.
+    durable.add_edge("n0", "late", amount=1)
+    durable.sync()
+    release.set()
+    snapshot.join()
+    durable.close()
+
+    restarted = DurableGraphBackend(backend_cls(), tmp_path, fsync_interval=60)
+    assert restarted.generation == 1
+    assert restarted.size() == {"nodes": 12, "edges": 11}
+    assert restarted._since_snapshot == 1
+    restarted.close()
+
+
+def test_durable_recovery_replays_both_wals_of_an_interrupted_snapshot(tmp_path) -> None:
+    durable = DurableGraphBackend(InMemoryGraphBackend(), tmp_path, fsync_interval=60)
+    durable.add_edge("a", "b", amount=10)
+
+    def failing_records(graph):
+        raise OSError("disk full")
+        yield
+
+    durable._snapshot_records = failing_records
+    with pytest.raises(OSError):
+        durable.snapshot()
+    durable.add_edge("b", "c", amount=5)
+    durable.close()
+    assert sorted(path.name for path in tmp_path.iterdir() if path.suffix == ".log") == [
+        "wal-00000000.log",
+        "wal-00000001.log",
+    ]
+
+    restarted = DurableGraphBackend(InMemoryGraphBackend(), tmp_path, fsync_interval=60)
+    assert restarted.generation == 1
+    assert restarted.size() == {"nodes": 3, "edges": 2}
+    restarted.close()
+
+
+def test_durable_backend_keeps_records_when_fsync_fails(tmp_path, monkeypatch) -> None:
+    durable = DurableGraphBackend(InMemoryGraphBackend(), tmp_path, fsync_interval=60)
+    durable.add_edge("a", "b", amount=10)
+
+    def failing_fsync(descriptor):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as patch:
+        patch.setattr("app.backends.wal.os.fsync", failing_fsync)
+        with pytest.raises(OSError):
+            durable.sync()
+    assert (tmp_path / "wal-00000000.log").stat().st_size == 0
+
+    durable.add_edge("b", "c", amount=5)
+    durable.close()
+    restarted = DurableGraphBackend(InMemoryGraphBackend(), tmp_path, fsync_interval=60)
+    assert restarted.size() == {"nodes": 3, "edges": 2}
+    restarted.close()
+
+
+def test_threaded_backend_keeps_event_loop_free(backend) -> None:
+    graph = ThreadedGraphBackend(backend, max_workers=2)
+
+    def slow_walk(sync_backend, node_id):
+        time.sleep(0.2)
+        return sync_backend.successors(node_id)
+
+    async def scenario():
+        await graph.add_edge("a", "b", amount=10)
+        await graph.add_edges_bulk([("a", "c", {"amount": 50}), ("b", "c", {"amount": 1})])
+        walk = asyncio.ensure_future(graph.run(slow_walk, "a"))
+        ticks = 0
+        while not walk.done():
+            await asyncio.sleep(0.01)
+            ticks += 1
+        batch = await graph.successors_batch(["a", "b", "missing"], min_amount=5)
+        return await walk, ticks, batch
+
+    successors, ticks, batch = asyncio.run(scenario())
+    graph.shutdown()
+    assert successors == ["b", "c"]
+    assert ticks >= 5
+    assert batch == {"a": [("c", {"amount": 50}), ("b", {"amount": 10})], "b": []}
+
+
+@pytest.mark.parametrize("backend_cls", [InMemoryGraphBackend, VersionedGraphBackend])
+def test_threaded_backend_detects_versions_through_durable_wrapper(tmp_path, backend_cls) -> None:
+    durable = DurableGraphBackend(backend_cls(), tmp_path, fsync_interval=60)
+    graph = ThreadedGraphBackend(durable, max_workers=1)
+    try:
+        assert graph._versioned is (backend_cls is VersionedGraphBackend)
+        assert (durable.pin() is durable) is (backend_cls is InMemoryGraphBackend)
+    finally:
+        graph.shutdown()
+        durable.close()
+
+
+def test_pinned_version_is_isolated_from_later_writes() -> None:
+    backend = VersionedGraphBackend()
+    backend.add_edges_bulk([(f"n{idx}", f"n{idx + 1}", {"amount": idx}) for idx in range(100)])
+    pinned = backend.pin()
+    assert pinned.epoch == backend.epoch == 1
+
+    backend.add_edge("n0", "n1", amount=99)
+    backend.add_edge("n0", "fresh", amount=1)
+    current = backend.pin()
+
+    assert pinned.get_edge("n0", "n1") == {"amount": 0}
+    assert not pinned.has_node("fresh") and current.has_node("fresh")
+    assert pinned.size() == {"nodes": 101, "edges": 100}
+    assert current.size() == {"nodes": 102, "edges": 101}
+    # Nodes the writes did not touch are shared between versions, not copied.
+    assert current._get("n50") is pinned._get("n50")
+    assert current._get("n0") is not pinned._get("n0")
+    with pytest.raises(NotImplementedError):
+        pinned.add_edge("n0", "n1", amount=1)
+
+
+def test_versioned_writes_share_a_hub_adjacency_base() -> None:
+    expected, backend = InMemoryGraphBackend(), VersionedGraphBackend()
+    records = [("hub", f"n{idx}", {"amount": idx * 2, "channel": "pix"}) for idx in range(2_000)]
+    for graph in (expected, backend):
+        graph.add_edges_bulk(records)
+
+    versions = [backend.pin()]
+    for idx in range(120):
+        # Alternate new edges and updates that move an edge to another channel.
+        target, attrs = (
+            (f"late{idx}", {"amount": 2 * idx + 1}) if idx % 2 else (f"n{idx}", {"channel": "ted"})
+        )
+        for graph in (expected, backend):
+            graph.add_edge("hub", target, **attrs)
+        versions.append(backend.pin())
+        hub = versions[-1]._get("hub").succ
+        assert len(hub._delta) <= 45
+        for args in [(0.0, 0), (100, 3), (0.0, 5, "ted"), (50, 0, "pix")]:
+            assert [(t, dict(e)) for t, e in backend.successors_with_edges("hub", *args)] == [
+                (t, dict(e)) for t, e in expected.successors_with_edges("hub", *args)
+            ]
+
+    # The bulk batch is folded into one base on the next write; that base and its
+    # amount index are then shared until the delta outgrows sqrt(degree).
+    assert versions[2]._get("hub").succ._base is versions[1]._get("hub").succ._base
+    assert len({id(version._get("hub").succ._base) for version in versions}) <= 4
+    assert versions[0].successors("hub") == [f"n{idx}" for idx in range(2_000)]
+    assert len(versions[-1].successors("hub")) == 2_060
+
+
+def test_risk_engine_runs_on_pinned_version() -> None:
+    from app.analytics.risk_propagation import RiskPropagationEngine
+    from scripts.benchmark_risk_engine import build_synthetic_graph
+
+    graph = build_synthetic_graph(nodes=200, edges=900, seed=7)
+    backend = VersionedGraphBackend()
+    for node_id, attrs in graph.nodes(data=True):
+        backend.add_node(node_id, **attrs)
+    backend.add_edges_bulk(graph.edges(data=True))
+    version = backend.pin()
+    backend.add_edge("N0", "N1", risk_transfer=1.0)
+    seeds = {"N0": 0.95, "N3": 0.55}
+
+    for mode in ("reference", "best_first", "csr"):
+        engine = RiskPropagationEngine(decay=0.75, min_signal=0.01, mode=mode)
+        expected = engine.run(graph, seeds, max_hops=4)
+        result = engine.run(version, seeds, max_hops=4)
+        assert result.scores == expected.scores
+        assert result.dominant_source == expected.dominant_source
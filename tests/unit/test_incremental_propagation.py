@@ -0,0 +1,48 @@
+"""Unit tests for incremental risk propagation."""
+
+import networkx as nx
+
+from app.analytics import IncrementalRiskPropagator, RiskPropagationEngine
+
+
+def _chain_graph() -> nx.DiGraph:
+    graph = nx.DiGraph()
+    graph.add_edge("S", "A", risk_transfer=0.9)
+    graph.add_edge("A", "B", risk_transfer=0.8)
+    graph.add_edge("B", "C", risk_transfer=0.7)
+    graph.add_edge("X", "Y", risk_transfer=0.9)
+    return graph
+
+
+def test_edge_insertion_matches_full_recompute() -> None:
+    seeds = {"S": 0.9}
+    incremental = IncrementalRiskPropagator(
+        _chain_graph(), seeds, max_hops=4, decay=0.75, min_signal=0.01
+    )
+
+    update = incremental.add_edge("S", "C", risk_transfer=1.0, amount=1200)
+    engine = RiskPropagationEngine(decay=0.75, min_signal=0.01)
+    full = engine.run(incremental.graph, seeds, max_hops=4)
+
+    assert incremental.scores == full.scores
+    assert incremental.dominant_source == full.dominant_source
+    assert update.changed == frozenset({"C"})
+    assert update.touched < incremental.graph.number_of_nodes()
+
+
+def test_weakened_edge_recomputes_downstream_region() -> None:
+    seeds = {"S": 0.9, "X": 0.4}
+    incremental = IncrementalRiskPropagator(
+        _chain_graph(), seeds, max_hops=3, decay=0.75, min_signal=0.01
+    )
+    incremental.add_edge("Y", "B", risk_transfer=0.9)
+
+    update = incremental.add_edge("A", "B", risk_transfer=0.1)
+    engine = RiskPropagationEngine(decay=0.75, min_signal=0.01)
+    full = engine.run(incremental.graph, seeds, max_hops=3)
+
+    assert incremental.scores == full.scores
+    assert incremental.dominant_source == full.dominant_source
+    assert incremental.dominant_source["B"] == "X"
+    assert "B" in update.changed
+    assert "S" not in update.changed
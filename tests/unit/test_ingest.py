@@ -0,0 +1,211 @@
+"""Test streaming NDJSON ingestion."""
+
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.backends import InMemoryGraphBackend, ThreadedGraphBackend
+from app.backends.loader import parse_edge
+from app.core.exceptions import IngestBackpressureError
+from app.main import app
+from app.services.ingest_service import IngestService
+from app.services.risk_service import RiskService
+
+
+async def _lines(rows):
+    for row in rows:
+        yield row if isinstance(row, str) else json.dumps(row)
+
+
+def _rows(count, prefix="ing"):
+    return [
+        {
+            "source": f"{prefix}_{i}",
+            "target": f"{prefix}_{i + 1}",
+            "amount": 100 + i,
+            "channel": "pix",
+        }
+        for i in range(count)
+    ]
+
+
+def _sample(name, labels=None):
+    return REGISTRY.get_sample_value(name, labels or {}) or 0.0
+
+
+def test_rows_are_written_in_micro_batches_with_one_epoch_per_batch() -> None:
+    backend = InMemoryGraphBackend()
+    service = IngestService(ThreadedGraphBackend(backend), batch_size=10, flush_interval=0.01)
+    written_before = _sample("ingest_rows_total", {"outcome": "written"})
+    batches_before = _sample("ingest_batch_rows_count")
+
+    async def scenario():
+        lines = _rows(25) + ["", "not json", '{"source": "x"}']
+        report = await service.ingest(_lines(lines), wait=True)
+        await service.close()
+        return report
+
+    report = asyncio.run(scenario())
+
+    assert report["accepted"] == 25
+    assert report["rejected"] == 2
+    assert report["rejected_lines"] == [27, 28]
+    assert report["queue_depth"] == 0
+    assert backend.size() == {"nodes": 26, "edges": 25}
+    assert backend.get_edge("ing_3", "ing_4") == {"amount": 103, "channel": "pix"}
+
+    batches = _sample("ingest_batch_rows_count") - batches_before
+    assert _sample("ingest_rows_total", {"outcome": "written"}) - written_before == 25
+    assert 3 <= batches < 25
+    assert backend.epoch == report["graph_epoch"] == batches
+    assert _sample("ingest_queue_depth") == 0
+    assert _sample("ingest_rows_per_second") > 0
+
+
+class _BlockedGraph:
+    """Accepts bulk writes only once released, so the ingest queue fills up."""
+
+    epoch = 0
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.written = 0
+
+    async def add_edges_bulk(self, edges):
+        await self.release.wait()
+        self.written += len(edges)
+        return len(edges)
+
+    async def size(self):
+        return {"nodes": 0, "edges": self.written}
+
+
+def test_full_queue_slows_then_rejects_the_stream() -> None:
+    async def scenario():
+        graph = _BlockedGraph()
+        service = IngestService(
+            graph, queue_size=3, batch_size=1, flush_interval=0, put_timeout=0.05
+        )
+        with pytest.raises(IngestBackpressureError) as slowed:
+            await service.ingest(_lines(_rows(10)))
+        # The queue is still full, so a new stream is refused before reading its body.
+        with pytest.raises(IngestBackpressureError) as refused:
+            await service.ingest(_lines(_rows(2, prefix="late")))
+
+        graph.release.set()
+        await service.close()
+        return slowed.value, refused.value, graph.written
+
+    slowed, refused, written = asyncio.run(scenario())
+
+    # One row is held by the blocked writer and three fill the queue.
+    assert slowed.details == {"accepted": 4, "lines_read": 4, "queue_depth": 3}
+    assert refused.details == {"accepted": 0, "queue_depth": 3}
+    assert written == 4
+
+
+def test_parse_edge_rejects_ids_that_are_not_non_empty_strings() -> None:
+    assert parse_edge('{"source": ["a"], "target": "b"}') is None
+    assert parse_edge('{"source": "", "target": "b"}') is None
+    assert parse_edge('{"source": true, "target": "b"}') is None
+    assert parse_edge('{"source": 7, "target": "b", "amount": 1}') == ("7", "b", {"amount": 1})
+
+
+class _PickyGraph:
+    """Refuses any bulk write that contains an edge into ``poison``."""
+
+    epoch = 0
+
+    def __init__(self):
+        self.written = []
+
+    async def add_edges_bulk(self, edges):
+        if any(target == "poison" for _, target, _ in edges):
+            raise RuntimeError("constraint violated")
+        self.written.extend(edges)
+        return len(edges)
+
+    async def size(self):
+        return {"nodes": 0, "edges": len(self.written)}
+
+
+def test_a_refused_batch_is_retried_per_row_and_failures_are_reported() -> None:
+    graph = _PickyGraph()
+    service = IngestService(graph, batch_size=10, flush_interval=0.01)
+    failed_before = _sample("ingest_rows_total", {"outcome": "failed"})
+    rows = _rows(4)
+    rows.insert(2, {"source": "ing_x", "target": "poison"})
+
+    async def scenario():
+        report = await service.ingest(_lines(rows), wait=True)
+        await service.close()
+        return report
+
+    report = asyncio.run(scenario())
+
+    assert report["accepted"] == 5
+    assert report["failed"] == 1
+    assert report["failed_lines"] == [3]
+    assert len(graph.written) == 4
+    assert _sample("ingest_rows_total", {"outcome": "failed"}) - failed_before == 1
+
+
+def test_written_rows_reach_the_risk_reference_graph() -> None:
+    graph = _PickyGraph()
+    risk = RiskService()
+    service = IngestService(graph, batch_size=10, flush_interval=0.01, risk_service=risk)
+    epoch = risk.graph_epoch
+    rows = _rows(3, prefix="risk")
+    rows.append({"source": "risk_x", "target": "poison"})
+    rows.append({"source": "risk_y", "target": "entity_001", "risk_transfer": 0.3})
+
+    async def scenario():
+        await service.ingest(_lines(rows), wait=True)
+        await service.close()
+
+    asyncio.run(scenario())
+    risk.close()
+
+    # Only the rows the trace graph accepted, in one epoch for the retried batch.
+    assert risk.graph_epoch == epoch + 1
+    assert risk.store.get_edge("risk_1", "risk_2") == {"amount": 101, "risk_transfer": 0.7}
+    assert risk.store.get_edge("risk_y", "entity_001") == {"amount": 0, "risk_transfer": 0.3}
+    assert not risk.store.has_node("poison")
+
+
+def test_ingest_endpoint_streams_ndjson_into_the_trace_graph() -> None:
+    body = "\n".join(json.dumps(row) for row in _rows(3, prefix="api")) + "\n{broken\n"
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/v2/ingest/?wait=true",
+            content=body.encode("utf-8"),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        trace = client.post("/api/v2/trace/", json={"source_id": "api_0", "max_hops": 5})
+
+    assert response.status_code == 202
+    assert response.json()["accepted"] == 3
+    assert response.json()["rejected_lines"] == [4]
+    assert trace.status_code == 200
+    assert trace.json()["total_paths"] >= 1
+
+
+def test_ingest_endpoint_rejects_an_overlong_line(monkeypatch) -> None:
+    monkeypatch.setattr("app.api.routes.ingest.settings.ingest_max_line_bytes", 80)
+    body = (
+        json.dumps(_rows(1, prefix="cap")[0])
+        + "\n"
+        + json.dumps({"source": "a" * 100, "target": "b"})
+    )
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/v2/ingest/?wait=true",
+            content=body.encode("utf-8"),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+    assert response.status_code == 413
+    assert response.json()["details"] == {"max_line_bytes": 80, "accepted": 1, "lines_read": 1}
@@ -0,0 +1,155 @@
+"""Test the Neo4j backend against an in-process fake driver."""
+
+import asyncio
+
+import networkx as nx
+import pytest
+from prometheus_client import REGISTRY
+
+from app.backends import InMemoryGraphBackend, Neo4jGraphBackend, neo4j_backend
+from app.services.trace_service import TraceService
+
+
+class FakeDriver:
+    """Answers the backend's named Cypher statements from a networkx graph."""
+
+    def __init__(self):
+        self.graph = nx.DiGraph()
+        self.calls = []
+        self.ids = []
+        self.closed = False
+
+    def execute_query(self, query, parameters, routing_=None, database_=None):
+        name = query.splitlines()[0].removeprefix("// ")
+        self.calls.append(name)
+        records = getattr(self, f"_{name}")(query, **parameters)
+        return records, None, None
+
+    def close(self):
+        self.closed = True
+
+    def _entity_id_constraint(self, query):
+        return []
+
+    def _merge_node(self, query, id, attrs):
+        self.graph.add_node(id, id=id, **attrs)
+        return []
+
+    def _merge_edges(self, query, rows):
+        for row in rows:
+            for node_id in (row["source"], row["target"]):
+                if node_id not in self.graph:
+                    self.graph.add_node(node_id, id=node_id)
+            self.graph.add_edge(row["source"], row["target"], **row["attrs"])
+        return []
+
+    def _adjacency(self, query, ids):
+        self.ids.extend(ids)
+        return [self._out_edges(node_id) for node_id in ids if node_id in self.graph]
+
+    def _nodes_by_attribute(self, query, name, value):
+        nodes = self.graph.nodes(data=True)
+        return [{"node": node_id} for node_id, attrs in nodes if attrs.get(name) == value]
+
+    def _predecessors(self, query, id):
+        return [{"node": node_id} for node_id in self.graph.predecessors(id)]
+
+    def _size(self, query):
+        return [{"nodes": self.graph.number_of_nodes(), "edges": self.graph.number_of_edges()}]
+
+    def _nodes(self, query):
+        return [
+            {"node": node_id, "attrs": dict(attrs)}
+            for node_id, attrs in self.graph.nodes(data=True)
+        ]
+
+    def _edges(self, query):
+        return [
+            {"source": s, "target": t, "attrs": dict(attrs)}
+            for s, t, attrs in self.graph.edges(data=True)
+        ]
+
+    def _out_edges(self, node_id):
+        edges = [[target, dict(attrs)] for target, attrs in self.graph.adj[node_id].items()]
+        return {"node": node_id, "edges": edges}
+
+
+@pytest.fixture
+def driver():
+    return FakeDriver()
+
+
+def test_bulk_writes_are_batched_unwinds(driver) -> None:
+    backend = Neo4jGraphBackend(driver=driver, batch_size=2)
+    driver.calls.clear()
+    backend.add_node("a", type="bank_account")
+    records = [("a", f"n{idx}", {"amount": idx}) for idx in range(5)] + [
+        ("a", "n1", {"channel": "pix"})
+    ]
+
+    assert backend.add_edges_bulk(iter(records)) == 6
+    assert driver.calls == ["merge_node", "merge_edges", "merge_edges", "merge_edges"]
+    assert backend.get_edge("a", "n1") == {"amount": 1, "channel": "pix"}
+    assert backend.successors("a") == ["n0", "n1", "n2", "n3", "n4"]
+    assert backend.predecessors("n3") == ["a"]
+    assert backend.size() == {"nodes": 6, "edges": 5}
+    assert backend.to_networkx().nodes["a"] == {"type": "bank_account"}
+    assert not backend.has_node("zzz")
+
+    backend.add_edge("a", "n1", amount=99)
+    assert backend.get_edge("a", "n1")["amount"] == 99
+    backend.close()
+    assert driver.closed
+
+
+def test_entity_id_constraint_is_created_once_at_init(driver) -> None:
+    backend = Neo4jGraphBackend(driver=driver)
+    backend.add_edge("a", "b", amount=1)
+    backend.successors("a")
+
+    assert driver.calls.count("entity_id_constraint") == 1
+    assert driver.calls[0] == "entity_id_constraint"
+
+
+def test_trace_expands_one_query_per_hop_level(driver) -> None:
+    expected = TraceService(backend=InMemoryGraphBackend())
+    service = TraceService(backend=Neo4jGraphBackend(driver=driver))
+    for svc in (expected, service):
+        for idx in range(4):
+            svc.backend.add_edge("crypto_001", f"exit_{idx}", amount=100 * idx, channel="bridge")
+            svc.backend.add_edge(f"exit_{idx}", "bank_001", amount=10)
+
+    def observed():
+        labels = {"operation": "trace"}
+        return REGISTRY.get_sample_value("trace_backend_round_trips_sum", labels) or 0.0
+
+    before = observed()
+    driver.calls.clear()
+    driver.ids.clear()
+    result = asyncio.run(service.trace_flow("bank_001", max_hops=6, min_amount=50))
+
+    assert result == asyncio.run(expected.trace_flow("bank_001", max_hops=6, min_amount=50))
+    # bank_001 -> pix_001 -> crypto_001 -> exit_{1,2,3}: one query per level reached.
+    # The source itself is loaded by the existence check, before the walk is timed.
+    assert driver.calls == ["adjacency"] * 4
+    assert observed() - before == 3
+    assert len(driver.ids) == len(set(driver.ids)) == 6
+
+
+def test_prefetch_loads_each_hub_neighbour_once(driver) -> None:
+    backend = Neo4jGraphBackend(driver=driver)
+    hubs = [f"hub_{idx}" for idx in range(20)]
+    backend.add_edges_bulk((a, b, {"amount": 10}) for a in hubs for b in hubs if a != b)
+    driver.calls.clear()
+    driver.ids.clear()
+
+    backend.prefetch("hub_0", max_hops=6)
+
+    assert driver.calls == ["adjacency", "adjacency"]
+    assert sorted(driver.ids) == sorted(hubs)
+
+
+def test_driver_is_required_without_neo4j_package(monkeypatch) -> None:
+    monkeypatch.setattr(neo4j_backend, "GraphDatabase", None)
+    with pytest.raises(ImportError, match="neo4j"):
+        Neo4jGraphBackend("neo4j://localhost:7687")
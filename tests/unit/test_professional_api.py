@@ -1,5 +1,7 @@
 """Tests for professional API endpoints and middleware behavior."""
 
+import json
+
 
 def test_request_id_is_echoed(client, sample_trace_request):
     response = client.post(
@@ -49,3 +51,81 @@ def test_simulate_endpoint(client):
     payload = response.json()
     assert payload["simulation"]["target_id"] == "wallet_new"
     assert "projected_risk" in payload
+
+
+def test_risk_batch_endpoint(client):
+    response = client.post(
+        "/api/v2/risk/batch",
+        json={"entity_ids": ["entity_001", "merchant_991", "unknown_x"], "time_range_days": 30},
+    )
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["total"] == 3
+    entity_ids = [row["entity_id"] for row in payload["results"]]
+    assert entity_ids == ["entity_001", "merchant_991", "unknown_x"]
+
+    single = client.get("/api/v2/risk/entity_001").json()
+    assert payload["results"][0]["risk_score"] == single["risk_score"]
+
+
+def test_simulate_batch_streams_one_row_per_scenario(client):
+
+    scenarios = [
+        {"source_id": "entity_001", "target_id": "wallet_new", "amount": 25000},
+        {
+            "source_id": "mixer_01",
+            "target_id": "merchant_991",
+            "amount": 900,
+            "risk_transfer": 0.95,
+        },
+    ]
+    response = client.post("/api/v2/simulate/batch", json=scenarios)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    rows.sort(key=lambda row: row["index"])
+    assert [row["index"] for row in rows] == [0, 1]
+    for scenario, row in zip(scenarios, rows):
+        single = client.post("/api/v2/simulate", json=scenario).json()
+        assert row["projected_risk"] == single["projected_risk"]
+
+
+def test_ndjson_streaming_for_trace_graph_and_propagation_map(client, sample_trace_request):
+    headers = {"Accept": "application/x-ndjson"}
+
+    response = client.post("/api/v2/trace", json=sample_trace_request, headers=headers)
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["type"] for row in rows] == ["path", "summary"]
+    assert rows[-1]["total_paths"] == 1
+
+    rows = [
+        json.loads(line)
+        for line in client.get("/api/v2/graph/bank_001", headers=headers).text.splitlines()
+    ]
+    assert rows[0] == {
+        "type": "edge",
+        "target": "pix_001",
+        "edge": client.get("/api/v2/graph/bank_001").json()["graph"]["outgoing"][0]["edge"],
+    }
+    assert rows[-1]["type"] == "summary"
+
+    streamed = [
+        json.loads(line)
+        for line in client.get(
+            "/api/v2/risk/propagation-map/entity_001", headers=headers
+        ).text.splitlines()
+    ]
+    full = client.get("/api/v2/risk/propagation-map/entity_001").json()
+    assert {row["node"]: row["score"] for row in streamed[:-1]} == full["influence"]
+    assert streamed[-1]["total_nodes"] == len(full["influence"])
+
+
+def test_ndjson_trace_unknown_source_is_404(client):
+    response = client.post(
+        "/api/v2/trace",
+        json={"source_id": "missing", "max_hops": 3},
+        headers={"Accept": "application/x-ndjson"},
+    )
+    assert response.status_code == 404
@@ -0,0 +1,33 @@
+"""Unit tests for versioned propagation snapshots."""
+
+import threading
+
+from app.analytics import PropagationResult, PropagationSnapshotStore
+
+
+def test_stale_snapshot_served_until_background_rebuild_swaps_in() -> None:
+    state = {"epoch": 1, "builds": 0}
+    release = threading.Event()
+
+    def builder(seed_sets, max_hops):
+        state["builds"] += 1
+        if state["builds"] > 1:
+            release.wait(timeout=5)
+        epoch = state["epoch"]
+        result = PropagationResult(scores={"A": float(epoch)}, dominant_source={})
+        return epoch, [result for _ in seed_sets]
+
+    store = PropagationSnapshotStore(builder, epoch=lambda: state["epoch"])
+    first = store.get({"S": 0.9}, max_hops=4)
+    assert store.get({"S": 0.9}, max_hops=4) is first
+
+    state["epoch"] = 2
+    store.invalidate()
+    assert store.get({"S": 0.9}, max_hops=4).score("A") == 1.0
+
+    release.set()
+    store.wait(timeout=5)
+    refreshed = store.get({"S": 0.9}, max_hops=4)
+    assert refreshed.epoch == 2
+    assert refreshed.score("A") == 2.0
+    assert state["builds"] == 2
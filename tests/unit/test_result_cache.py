@@ -0,0 +1,77 @@
+"""Test the epoch-stamped result cache and its use by the risk service."""
+
+import asyncio
+
+from prometheus_client import REGISTRY
+
+from app.core.cache import EpochCache
+from app.services.risk_service import RiskService
+
+
+def _count(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_epoch_cache_bounds_expires_and_replays_writes(monkeypatch) -> None:
+    now = [100.0]
+    monkeypatch.setattr("app.core.cache.time.monotonic", lambda: now[0])
+    cache = EpochCache("test_epoch_cache", max_size=2, ttl=10)
+
+    cache.put("a", 1, epoch=1)
+    cache.put("b", 2, epoch=1)
+    assert cache.get("a", epoch=1) == 1
+    cache.put("c", 3, epoch=1)  # evicts "b", the least recently used
+    assert cache.get("b", epoch=1) is None
+    assert len(cache) == 2
+
+    cache.invalidate(2, lambda key: key == "c")
+    assert cache.get("a", epoch=2) == 1  # carried forward: write 2 did not touch "a"
+    assert cache.get("c", epoch=2) is None  # dropped: write 2 touched "c"
+    assert cache.get("a", epoch=3) is None  # no write recorded for epoch 3
+
+    cache.put("d", 4, epoch=3)
+    now[0] += 10
+    assert cache.get("d", epoch=3) is None
+
+    assert _count("result_cache_requests_total", cache="test_epoch_cache", result="hit") == 2
+    assert _count("result_cache_requests_total", cache="test_epoch_cache", result="miss") == 4
+    for reason in ("size", "stale", "ttl"):
+        assert _count("result_cache_evictions_total", cache="test_epoch_cache", reason=reason) >= 1
+    assert _count("result_cache_evictions_total", cache="test_epoch_cache", reason="stale") == 2
+
+
+def test_risk_cache_drops_only_entities_downstream_of_a_transfer() -> None:
+    service = RiskService()
+    service._snapshots.get(service._seed_scores_for_entity("merchant_991"), max_hops=4)
+    service._snapshots.get(service._seed_scores_for_entity("entity_001"), max_hops=4)
+
+    first = asyncio.run(service.analyze_entity_risk("merchant_991"))
+    hit = asyncio.run(service.analyze_entity_risk("merchant_991"))
+    assert first["cache_hit"] is False
+    assert hit["cache_hit"] is True
+    assert asyncio.run(service.analyze_entity_risk("merchant_991")) is hit
+    asyncio.run(service.analyze_entity_risk("entity_001"))
+
+    # merchant_new is downstream of the new edge; entity_001 and merchant_991 are not.
+    asyncio.run(service.analyze_entity_risk("merchant_new"))
+    service.record_transfer("mixer_01", "merchant_new", amount=9000.0, risk_transfer=0.9)
+
+    assert asyncio.run(service.analyze_entity_risk("merchant_991")) is hit
+    assert asyncio.run(service.analyze_entity_risk("entity_001"))["cache_hit"] is True
+    assert asyncio.run(service.analyze_entity_risk("merchant_new"))["cache_hit"] is False
+
+
+def test_risk_cache_drops_a_new_source_after_its_first_transfer() -> None:
+    service = RiskService()
+    service._snapshots.get(service._seed_scores_for_entity("wallet_fresh"), max_hops=4)
+
+    unknown = asyncio.run(service.analyze_entity_risk("wallet_fresh"))
+    assert asyncio.run(service.analyze_entity_risk("wallet_fresh"))["cache_hit"] is True
+
+    service.record_transfer("wallet_fresh", "merchant_991", amount=500.0)
+    service._snapshots.wait()
+    known = asyncio.run(service.analyze_entity_risk("wallet_fresh"))
+
+    assert known["cache_hit"] is False
+    assert known["risk_score"] == 0.15
+    assert known["risk_score"] < unknown["risk_score"]
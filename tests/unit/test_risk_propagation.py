@@ -2,6 +2,7 @@
 
 import networkx as nx
 
+from app.analytics.csr import CSRGraph
 from app.analytics.risk_propagation import RiskPropagationEngine
 
 
@@ -17,3 +18,137 @@ def test_risk_propagation_spreads_risk_to_downstream_nodes() -> None:
     assert result.scores["B"] == 1.0
     assert result.scores["C"] == 0.5
     assert result.dominant_source["C"] == "A"
+
+
+def test_csr_mode_matches_reference_engine() -> None:
+    from scripts.benchmark_risk_engine import build_synthetic_graph
+
+    graph = build_synthetic_graph(nodes=200, edges=900, seed=7)
+    seeds = {"N0": 0.95, "N3": 0.55}
+
+    reference = RiskPropagationEngine(decay=0.75, min_signal=0.01).run(graph, seeds, max_hops=4)
+    csr = RiskPropagationEngine(decay=0.75, min_signal=0.01, mode="csr").run(
+        graph, seeds, max_hops=4
+    )
+
+    assert csr.scores == reference.scores
+    assert csr.dominant_source == reference.dominant_source
+
+
+def test_csr_mode_accepts_precompiled_graph() -> None:
+    graph = nx.DiGraph()
+    graph.add_edge("A", "B", risk_transfer=1.0)
+    graph.add_edge("B", "C", risk_transfer=0.5)
+
+    engine = RiskPropagationEngine(decay=1.0, min_signal=0.0, mode="csr")
+    compiled = CSRGraph.from_networkx(graph)
+    result = engine.run(compiled, seed_scores={"A": 1.0, "missing": 0.9}, max_hops=3)
+
+    assert result.scores == {"A": 1.0, "B": 1.0, "C": 0.5}
+    assert result.dominant_source == {"A": "A", "B": "A", "C": "A"}
+
+
+def test_best_first_mode_matches_reference_and_reports_counters() -> None:
+    graph = nx.DiGraph()
+    graph.add_edge("A", "B", risk_transfer=0.9)
+    graph.add_edge("B", "C", risk_transfer=0.9)
+    graph.add_edge("C", "A", risk_transfer=0.9)
+    graph.add_edge("A", "C", risk_transfer=0.5)
+    seeds = {"A": 0.9, "C": 0.3}
+
+    reference = RiskPropagationEngine(decay=0.8, min_signal=0.01).run(graph, seeds, max_hops=6)
+    best_first = RiskPropagationEngine(decay=0.8, min_signal=0.01, mode="best_first").run(
+        graph, seeds, max_hops=6
+    )
+
+    assert best_first.scores == reference.scores
+    assert best_first.dominant_source == reference.dominant_source
+    assert best_first.stats["states_expanded"] > 0
+    assert best_first.stats["states_pruned"] > 0
+
+
+def test_best_first_expands_fewer_states_on_fan_in_layers() -> None:
+    from scripts.benchmark_risk_engine import build_fan_in_graph
+
+    graph, seeds = build_fan_in_graph(width=8, layers=3)
+    reference, best_first = (
+        RiskPropagationEngine(decay=0.75, min_signal=0.01, mode=mode).run(graph, seeds, max_hops=4)
+        for mode in ("reference", "best_first")
+    )
+
+    assert best_first.scores == reference.scores
+    assert best_first.stats["states_expanded"] < reference.stats["states_expanded"] // 4
+
+
+def test_modes_agree_on_scores_when_seeds_tie() -> None:
+    graph = nx.DiGraph()
+    graph.add_edge("A", "C", risk_transfer=0.5)
+    graph.add_edge("B", "C", risk_transfer=0.5)
+    seeds = {"A": 0.8, "B": 0.8}
+
+    results = [
+        RiskPropagationEngine(decay=1.0, min_signal=0.0, mode=mode).run(graph, seeds, max_hops=2)
+        for mode in RiskPropagationEngine.MODES
+    ]
+
+    assert all(result.scores == {"A": 0.8, "B": 0.8, "C": 0.4} for result in results)
+    assert all(result.dominant_source["C"] in seeds for result in results)
+
+
+def test_run_batch_columns_match_individual_runs() -> None:
+    graph = nx.DiGraph()
+    graph.add_edge("A", "B", risk_transfer=0.9)
+    graph.add_edge("B", "C", risk_transfer=0.6)
+    graph.add_edge("D", "C", risk_transfer=0.8)
+    seed_sets = [{"A": 0.9}, {"A": 0.5, "D": 0.7}, {}]
+
+    engine = RiskPropagationEngine(decay=0.75, min_signal=0.01)
+    batch = engine.run_batch(graph, seed_sets, max_hops=3)
+
+    assert batch.values.shape == (4, 3)
+    for column, seeds in enumerate(seed_sets):
+        single = engine.run(graph, seeds, max_hops=3)
+        assert batch.result(column).scores == single.scores
+        assert batch.result(column).dominant_source == single.dominant_source
+    assert batch.source("C", 1) == "D"
+    assert batch.score("unknown", 0, default=0.2) == 0.2
+
+
+def test_score_node_matches_full_run_from_reverse_cone() -> None:
+    from scripts.benchmark_risk_engine import build_synthetic_graph
+
+    graph = build_synthetic_graph(nodes=300, edges=900, seed=11)
+    graph.add_node("isolated")
+    seeds = {"N0": 0.95, "N3": 0.55}
+    engine = RiskPropagationEngine(decay=0.75, min_signal=0.01)
+    full = engine.run(graph, seeds, max_hops=3)
+
+    for node in ["N0", "N3", "N17", "N120", "isolated"]:
+        point = engine.score_node(graph, seeds, node, max_hops=3)
+        assert point.score == full.scores[node]
+        assert point.dominant_source == full.dominant_source.get(node)
+
+    assert engine.score_node(graph, seeds, "N120", max_hops=3).cone_size < graph.number_of_nodes()
+    assert engine.score_node(graph, seeds, "missing", max_hops=3).cone_size == 0
+
+
+def test_overlay_graph_matches_copied_graph() -> None:
+    from app.analytics import OverlayGraph
+
+    base = nx.DiGraph()
+    base.add_edge("A", "B", risk_transfer=0.9)
+    base.add_edge("B", "C", risk_transfer=0.6)
+    overlay = OverlayGraph(base)
+    overlay.add_edge("C", "D", risk_transfer=0.8)
+    overlay.add_edge("A", "C", risk_transfer=0.95)
+
+    copied = base.copy()
+    copied.add_edge("C", "D", risk_transfer=0.8)
+    copied.add_edge("A", "C", risk_transfer=0.95)
+
+    engine = RiskPropagationEngine(decay=0.75, min_signal=0.01)
+    expected = engine.run(copied, {"A": 0.9}, max_hops=3)
+    assert engine.run(overlay, {"A": 0.9}, max_hops=3).scores == expected.scores
+    assert engine.score_node(overlay, {"A": 0.9}, "D", max_hops=3).score == expected.scores["D"]
+    assert "D" not in base and base.number_of_edges() == 2
+    assert overlay.overlay_size() == {"nodes": 1, "edges": 2}
@@ -1,7 +1,12 @@
 """Test service layer."""
 
 import asyncio
+import json
 
+from fastapi.testclient import TestClient
+
+from app.api.dependencies import get_risk_service
+from app.main import app
 from app.services.risk_service import RiskService
 from app.services.trace_service import TraceService
 
@@ -20,3 +25,102 @@ def test_risk_service() -> None:
 
     assert "risk_level" in result
     assert result["risk_level"] in ["LOW", "MEDIUM", "HIGH"]
+
+
+def test_risk_service_csr_mode_matches_reference() -> None:
+    maps = []
+    for mode in ("reference", "csr"):
+        service = RiskService(propagation_mode=mode)
+        asyncio.run(service.propagation_map("entity_001"))
+        service._snapshots.wait()
+        maps.append(asyncio.run(service.propagation_map("entity_001")))
+
+    assert maps[0]["influence"] == maps[1]["influence"]
+    assert maps[0]["dominant_source"] == maps[1]["dominant_source"]
+
+
+def test_simulation_leaves_reference_graph_untouched() -> None:
+    service = RiskService()
+    edges_before = service.graph.number_of_edges()
+    result = asyncio.run(service.simulate_transfer("mixer_01", "wallet_new", 25000.0, 0.9))
+
+    assert service.graph.number_of_edges() == edges_before
+    assert "wallet_new" not in service.graph
+    assert result["projected_risk"]["wallet_new"] == round(0.92 * 0.9 * 0.75 * 0.9 * 0.75, 4)
+
+
+def test_risk_snapshot_is_rebuilt_after_graph_epoch_changes() -> None:
+    service = RiskService()
+    before = asyncio.run(service.analyze_entity_risk("merchant_new", time_range_days=7))
+
+    epoch = service.record_transfer("mixer_01", "merchant_new", amount=9000.0, risk_transfer=0.9)
+    service._snapshots.wait()
+    after = asyncio.run(service.propagation_map("merchant_new"))
+
+    assert before["explanations"][0] == "propagated_risk_from=unknown"
+    assert after["graph_epoch"] == epoch
+    assert after["dominant_source"]["merchant_new"] == "wallet_sanctioned_01"
+
+
+def test_cold_risk_query_matches_snapshot_result() -> None:
+    service = RiskService()
+    cold = asyncio.run(service.analyze_entity_risk("merchant_991"))
+    service._snapshots.wait()
+    warm = asyncio.run(service.analyze_entity_risk("merchant_991", time_range_days=31))
+
+    assert cold["explanations"][0] == warm["explanations"][0]
+    assert cold["metrics"]["average_risk_score"] > 0
+
+
+def test_ingested_transfer_changes_the_analyzed_risk() -> None:
+    entity = "merchant_ingested_01"
+    row = {"source": "mixer_01", "target": entity, "amount": 9000, "risk_transfer": 0.9}
+    with TestClient(app) as client:
+        before = client.post("/api/v2/risk/analyze", json={"entity_id": entity}).json()
+        get_risk_service()._snapshots.wait()
+        ingest = client.post(
+            "/api/v2/ingest/?wait=true",
+            content=json.dumps(row).encode("utf-8"),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        after = client.post("/api/v2/risk/analyze", json={"entity_id": entity}).json()
+
+    assert ingest.status_code == 202
+    assert before["explanations"][0] == "propagated_risk_from=unknown"
+    assert after["explanations"][0] == "propagated_risk_from=wallet_sanctioned_01"
+    assert after["risk_score"] > before["risk_score"]
+    assert after["cache_hit"] is False
+
+
+def test_stale_snapshot_is_not_served_for_an_entity_a_transfer_reached() -> None:
+    service = RiskService()
+    asyncio.run(service.analyze_entity_risk("merchant_991"))
+    service._snapshots.wait()
+    # Keep the previous snapshot in place, as while a rebuild is still running.
+    service._snapshots.invalidate = lambda: None
+
+    service.record_transfer("mixer_01", "merchant_new", amount=9000.0, risk_transfer=0.9)
+    reached = asyncio.run(service.analyze_entity_risk("merchant_new"))
+    untouched = asyncio.run(service.analyze_entity_risk("wallet_watchlist_77"))
+
+    assert reached["explanations"][0] == "propagated_risk_from=wallet_sanctioned_01"
+    assert untouched["explanations"][0] == "propagated_risk_from=unknown"
+
+
+def test_propagation_snapshot_follows_the_epoch_of_ingested_batches() -> None:
+    service = get_risk_service()
+    entity = "entity_ingested_02"
+    row = {"source": "entity_001", "target": entity, "amount": 500, "risk_transfer": 0.8}
+    with TestClient(app) as client:
+        before = client.get(f"/api/v2/risk/propagation-map/{entity}").json()
+        client.post(
+            "/api/v2/ingest/?wait=true",
+            content=json.dumps(row).encode("utf-8"),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        service._snapshots.wait()
+        after = client.get(f"/api/v2/risk/propagation-map/{entity}").json()
+
+    assert after["graph_epoch"] == service.graph_epoch > before["graph_epoch"]
+    assert entity not in before["influence"]
+    assert entity in after["influence"]
@@ -0,0 +1,122 @@
+"""Test CSR graphs shared between processes through shared memory."""
+
+import asyncio
+import multiprocessing
+import subprocess
+import sys
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from app.analytics import CSRGraph, RiskPropagationEngine, SharedCSRGraph
+from app.analytics.shared_csr import attach_shared_graph, propagate_in_processes
+from app.services.risk_service import RiskService
+
+
+@pytest.fixture
+def segment_name():
+    return f"bt-test-{uuid.uuid4().hex[:12]}"
+
+
+@pytest.fixture(scope="module")
+def csr():
+    from scripts.benchmark_risk_engine import build_synthetic_graph
+
+    return CSRGraph.from_networkx(build_synthetic_graph(nodes=300, edges=1500, seed=11))
+
+
+def test_attached_graph_views_published_arrays(csr, segment_name) -> None:
+    published = SharedCSRGraph.publish(csr, segment_name, epoch=7)
+    try:
+        attached = SharedCSRGraph.attach(segment_name)
+
+        assert (attached.epoch, attached.owner, published.owner) == (7, False, True)
+        assert attached.node_ids == csr.node_ids
+        assert attached.index == csr.index
+        for name in ("offsets", "targets", "weights"):
+            np.testing.assert_array_equal(getattr(attached, name), getattr(csr, name))
+            assert not getattr(attached, name).flags.owndata
+            assert not getattr(attached, name).flags.writeable
+
+        engine = RiskPropagationEngine(decay=0.75, min_signal=0.01, mode="csr")
+        seeds = {"N0": 0.95, "N5": 0.6}
+        assert engine.run(attached, seeds, max_hops=4) == engine.run(csr, seeds, max_hops=4)
+        with pytest.raises(FileExistsError):
+            SharedCSRGraph.publish(csr, segment_name)
+
+        attached.close()
+        attached.close()
+        assert attached.segment is None
+        assert attached.number_of_nodes() == attached.number_of_edges() == 0
+    finally:
+        published.close()
+        published.close()
+    with pytest.raises(FileNotFoundError):
+        SharedCSRGraph.attach(segment_name)
+
+
+def test_segment_outlives_a_process_that_attached_and_exited(csr, segment_name) -> None:
+    published = SharedCSRGraph.publish(csr, segment_name)
+    try:
+        # A separate interpreter has its own resource tracker, like another server worker.
+        script = (
+            "import sys; from app.analytics import SharedCSRGraph; "
+            "graph = SharedCSRGraph.attach(sys.argv[1]); print(graph.number_of_nodes())"
+        )
+        worker = subprocess.run(
+            [sys.executable, "-c", script, segment_name], capture_output=True, text=True
+        )
+        assert worker.returncode == 0, worker.stderr
+        assert int(worker.stdout) == csr.number_of_nodes()
+        assert "leaked shared_memory" not in worker.stderr
+
+        attached = SharedCSRGraph.attach(segment_name, timeout=0.1)
+        assert attached.number_of_nodes() == csr.number_of_nodes()
+        attached.close()
+    finally:
+        published.close()
+
+
+def test_process_pool_propagates_over_attached_graph(csr, segment_name) -> None:
+    published = SharedCSRGraph.publish(csr, segment_name)
+    engine = RiskPropagationEngine(decay=0.75, min_signal=0.01, mode="csr")
+    seed_sets = [{"N0": 0.95}, {"N3": 0.8, "N9": 0.5}, {"missing": 0.9}, {"N1": 0.7, "N0": 0.7}]
+    pool = ProcessPoolExecutor(
+        max_workers=2,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=attach_shared_graph,
+        initargs=(segment_name,),
+    )
+    try:
+        results = propagate_in_processes(pool, published, engine, seed_sets, max_hops=4, workers=2)
+    finally:
+        pool.shutdown(wait=True)
+        published.close()
+
+    expected = engine.run_batch(csr, seed_sets, max_hops=4)
+    assert results == [expected.result(column) for column in range(len(seed_sets))]
+
+
+def test_risk_services_share_one_reference_graph(segment_name) -> None:
+    owner = RiskService(propagation_mode="csr", shared_graph=segment_name)
+    worker = RiskService(shared_graph=segment_name, propagation_processes=1)
+    try:
+        assert owner._shared_graph.owner and not worker._shared_graph.owner
+        assert worker._csr_graph(worker.graph) is worker._shared_graph
+
+        maps = []
+        for service in (RiskService(propagation_mode="csr"), owner, worker):
+            asyncio.run(service.propagation_map("entity_001"))
+            service._snapshots.wait()
+            maps.append(asyncio.run(service.propagation_map("entity_001")))
+        assert maps[0]["influence"] == maps[1]["influence"] == maps[2]["influence"]
+        assert maps[0]["dominant_source"] == maps[2]["dominant_source"]
+
+        # A local write moves this worker past the shared epoch; it compiles its own copy.
+        worker.record_transfer("mixer_01", "merchant_new", amount=9000.0, risk_transfer=0.9)
+        assert worker._csr_graph(worker.graph) is not worker._shared_graph
+    finally:
+        worker.close()
+        owner.close()
@@ -0,0 +1,284 @@
+"""Test multi-hop trace path enumeration."""
+
+import asyncio
+
+import pytest
+
+from app.analytics.path_between import find_paths_between
+from app.analytics.tracing import TraceStats, iter_trace_paths
+from app.api.dependencies import get_trace_service
+from app.backends import InMemoryGraphBackend, VersionedGraphBackend
+from app.core.exceptions import ValidationError
+from app.core.pagination import encode_cursor
+from app.services.trace_service import TraceService
+
+
+def _backend() -> InMemoryGraphBackend:
+    backend = InMemoryGraphBackend()
+    for src, dst, amount in [
+        ("a", "b", 100),
+        ("b", "c", 90),
+        ("c", "a", 80),
+        ("b", "d", 5),
+        ("c", "e", 70),
+    ]:
+        backend.add_edge(src, dst, amount=amount)
+    return backend
+
+
+def test_trace_paths_walk_multiple_hops_and_detect_cycles() -> None:
+    stats = TraceStats()
+    paths = list(iter_trace_paths(_backend(), "a", max_hops=5, min_amount=10, stats=stats))
+
+    assert sorted(path["nodes"] for path in paths) == [["a", "b", "c", "a"], ["a", "b", "c", "e"]]
+    cycle = next(path for path in paths if path["cycle"])
+    assert cycle["amounts"] == [100, 90, 80]
+    assert stats.cycles == 1
+    assert not stats.truncated
+
+
+def test_trace_paths_honor_max_hops_and_caps() -> None:
+    paths = list(iter_trace_paths(_backend(), "a", max_hops=2))
+    assert sorted(path["nodes"] for path in paths) == [["a", "b", "c"], ["a", "b", "d"]]
+    assert all(path["end"] in {"max_hops", "sink"} for path in paths)
+
+    stats = TraceStats()
+    capped = list(iter_trace_paths(_backend(), "a", max_hops=5, max_paths=1, stats=stats))
+    assert len(capped) == 1
+    assert stats.truncated
+
+
+def test_trace_service_returns_multi_hop_paths() -> None:
+    result = asyncio.run(TraceService().trace_flow("bank_001", max_hops=5))
+
+    assert result["total_paths"] == 1
+    assert result["paths"][0]["nodes"] == ["bank_001", "pix_001", "crypto_001"]
+    assert result["paths"][0]["amounts"] == [5000, 4800]
+    assert result["truncated"] is False
+
+
+def test_path_between_returns_shortest_and_highest_risk_paths() -> None:
+    backend = InMemoryGraphBackend()
+    for src, dst, transfer in [
+        ("a", "b", 0.3),
+        ("b", "z", 0.3),
+        ("a", "c", 0.9),
+        ("c", "d", 0.9),
+        ("d", "z", 0.9),
+    ]:
+        backend.add_edge(src, dst, risk_transfer=transfer)
+
+    result = find_paths_between(backend, "a", "z", max_hops=4)
+    assert result.shortest_path == ["a", "b", "z"]
+    assert result.highest_risk_path == ["a", "c", "d", "z"]
+    assert result.highest_risk_product == round(0.9**3, 6)
+
+    assert not find_paths_between(backend, "a", "z", max_hops=1).connected
+
+
+def test_path_between_endpoint(client):
+    response = client.post(
+        "/api/v2/trace/path-between",
+        json={"source_id": "bank_001", "target_id": "crypto_001", "max_hops": 3},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["connected"] is True
+    assert data["shortest_path"]["nodes"] == ["bank_001", "pix_001", "crypto_001"]
+
+
+def test_trace_pages_resume_to_the_full_result() -> None:
+    service = TraceService()
+    for idx in range(6):
+        service.backend.add_edge("crypto_001", f"exit_{idx}", amount=100 * idx)
+        service.backend.add_edge(f"exit_{idx}", "bank_001", amount=10)
+
+    full = asyncio.run(service.trace_flow("bank_001", max_hops=6))["paths"]
+    pages, cursor = [], None
+    while True:
+        page = asyncio.run(service.trace_flow("bank_001", max_hops=6, limit=4, cursor=cursor))
+        pages.extend(page["paths"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == full
+
+
+def test_trace_stream_reads_pages_through_the_graph_view() -> None:
+    service = TraceService()
+    service.stream_page_size = 2
+    for idx in range(5):
+        service.backend.add_edge("crypto_001", f"exit_{idx}", amount=100 * idx)
+
+    async def collect(write_after=None, amount=1):
+        rows = []
+        async for row in await service.stream_trace("bank_001", max_hops=6):
+            rows.append(row)
+            if len(rows) == write_after:
+                service.backend.add_edge("crypto_001", f"late_{amount}", amount=amount)
+        return rows
+
+    full = asyncio.run(service.trace_flow("bank_001", max_hops=6))
+    rows = asyncio.run(collect())
+    assert [row["nodes"] for row in rows[:-1]] == [path["nodes"] for path in full["paths"]]
+    assert rows[-1]["total_paths"] == 5
+    assert rows[-1]["truncated"] is False
+    assert rows[-1]["graph_epoch"] == service.graph.epoch
+
+    # A write ranked behind the page boundary is picked up by the next page.
+    rows = asyncio.run(collect(write_after=1))
+    assert "late_1" in [row["nodes"][-1] for row in rows[:-1]]
+    assert rows[-1]["total_paths"] == 6
+    assert rows[-1]["truncated"] is False
+
+    # One ranked ahead of it would skip or repeat paths, so the stream ends there.
+    rows = asyncio.run(collect(write_after=1, amount=10_000))
+    assert [row["type"] for row in rows] == ["path", "path", "summary"]
+    assert rows[-1]["truncated"] is True
+    assert rows[-1]["total_paths"] == 2
+
+
+def test_streams_read_one_pinned_version_of_a_versioned_backend() -> None:
+    service = TraceService(VersionedGraphBackend())
+    service.stream_page_size = 2
+    for idx in range(5):
+        service.backend.add_edge("crypto_001", f"exit_{idx}", amount=100 * idx)
+    epoch = service.graph.epoch
+
+    async def collect(stream, late):
+        rows = []
+        async for row in await stream:
+            rows.append(row)
+            if len(rows) == 1:
+                service.backend.add_edge("crypto_001", late, amount=10_000)
+                service.backend.add_edge("bank_001", late, amount=10_000)
+        return rows
+
+    rows = asyncio.run(collect(service.stream_trace("bank_001", max_hops=6), "big"))
+    assert [row["nodes"][-1] for row in rows[:-1]] == [f"exit_{idx}" for idx in range(4, -1, -1)]
+    assert rows[-1]["truncated"] is False
+    assert rows[-1]["graph_epoch"] == epoch
+
+    service.stream_page_size = 1
+    rows = asyncio.run(collect(service.stream_graph("bank_001"), "bigger"))
+    assert [row["target"] for row in rows[:-1]] == ["big", "pix_001"]
+    assert rows[-1]["truncated"] is False
+
+
+def test_trace_follows_only_the_requested_channel() -> None:
+    service = TraceService()
+    for idx in range(4):
+        channel = "bridge" if idx % 2 else "pix"
+        service.backend.add_edge("crypto_001", f"exit_{idx}", amount=100 * idx, channel=channel)
+        service.backend.add_edge(f"exit_{idx}", "bank_001", amount=10, channel="bridge")
+
+    result = asyncio.run(service.trace_flow("pix_001", max_hops=6, channel="bridge"))
+    assert sorted(path["nodes"] for path in result["paths"]) == [
+        ["pix_001", "crypto_001", "exit_1", "bank_001"],
+        ["pix_001", "crypto_001", "exit_3", "bank_001"],
+    ]
+    assert all(
+        hop["data"]["channel"] == "bridge" for path in result["paths"] for hop in path["hops"]
+    )
+    assert asyncio.run(service.trace_flow("bank_001", channel="bridge"))["paths"] == []
+
+    page = asyncio.run(service.trace_flow("pix_001", max_hops=6, limit=1, channel="bridge"))
+    resumed = asyncio.run(
+        service.trace_flow(
+            "pix_001", max_hops=6, limit=1, cursor=page["next_cursor"], channel="bridge"
+        )
+    )
+    assert page["paths"] + resumed["paths"] == result["paths"]
+    with pytest.raises(ValidationError):
+        asyncio.run(service.trace_flow("pix_001", max_hops=6, limit=1, cursor=page["next_cursor"]))
+
+
+def test_trace_cursor_survives_writes_behind_its_position() -> None:
+    service = TraceService()
+    for idx in range(4):
+        service.backend.add_edge("crypto_001", f"exit_{idx}", amount=100 * (idx + 1))
+    page = asyncio.run(service.trace_flow("bank_001", limit=2))
+    assert [path["to"] for path in page["paths"]] == ["exit_3", "exit_2"]
+
+    # Ingest off the resume path, or ranked after it, does not expire the cursor.
+    service.backend.add_edge("exit_3", "elsewhere", amount=50)
+    service.backend.add_edge("crypto_001", "late", amount=1)
+    resumed = asyncio.run(service.trace_flow("bank_001", limit=10, cursor=page["next_cursor"]))
+    full = asyncio.run(service.trace_flow("bank_001"))
+    assert resumed["paths"] == full["paths"][2:]
+    assert [path["to"] for path in resumed["paths"]] == ["exit_1", "exit_0", "late"]
+
+    # An edge ranked ahead of the position would shift the walk, so that is stale.
+    service.backend.add_edge("crypto_001", "big", amount=10_000)
+    with pytest.raises(ValidationError) as rejected:
+        asyncio.run(service.trace_flow("bank_001", limit=2, cursor=page["next_cursor"]))
+    assert rejected.value.code == "StaleCursor"
+
+
+def test_trace_cursor_must_be_signed_and_fit_the_graph() -> None:
+    service = TraceService()
+    page = asyncio.run(service.trace_flow("bank_001", max_hops=5, limit=1))
+    body, _ = page["next_cursor"].split(".")
+    query = service._trace_query("bank_001", 5, 0.0, None, None)
+
+    def resume(state):
+        cursor = encode_cursor("trace", service.graph.epoch, query, state)
+        return asyncio.run(service.trace_flow("bank_001", max_hops=5, limit=1, cursor=cursor))
+
+    with pytest.raises(ValidationError, match="Invalid pagination cursor"):
+        asyncio.run(service.trace_flow("bank_001", max_hops=5, limit=1, cursor=body))
+    frames = {
+        "nodes": ["bank_001", "pix_001"],
+        "consumed": [1, 0],
+        "extended": [True, False],
+        "last": ["pix_001", None],
+    }
+    for bad in (
+        {**frames, "consumed": [1, -5]},
+        {**frames, "consumed": [1, 99], "last": ["pix_001", "crypto_001"]},
+        {**frames, "last": ["pix_001", "crypto_001"]},
+        {**frames, "nodes": ["bank_001", "crypto_001"]},
+        {**frames, "nodes": ["pix_001", "crypto_001"]},
+        {**frames, "extended": [True]},
+    ):
+        with pytest.raises(ValidationError) as rejected:
+            resume(bad)
+        assert rejected.value.code == "InvalidCursor"
+
+    # Counters are never restored from a cursor, so limits apply to every page.
+    resumed = resume({**frames, "stats": {"states": -999999970, "truncated": False}})
+    assert 0 < resumed["states_visited"] <= 5
+
+
+def test_graph_endpoint_pages_outgoing_edges(client):
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 1} if cursor is None else {"limit": 1, "cursor": cursor}
+        page = client.get("/api/v2/graph/bank_001", params=params).json()
+        seen.extend(edge["target"] for edge in page["graph"]["outgoing"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ["pix_001"]
+    assert client.get("/api/v2/graph/bank_001", params={"cursor": "garbage"}).status_code == 400
+    epoch = get_trace_service().graph.epoch
+    forged = encode_cursor("graph", epoch, {"entity_id": "bank_001"}, {"offset": -3})
+    assert client.get("/api/v2/graph/bank_001", params={"cursor": forged}).status_code == 400
+
+
+def test_graph_cursor_is_stale_only_when_edges_land_ahead_of_it() -> None:
+    service = TraceService()
+    for idx in range(4):
+        service.backend.add_edge("pix_001", f"out_{idx}", amount=100 * (idx + 1))
+    page = asyncio.run(service.graph_snapshot("pix_001", limit=2))
+    assert [edge["target"] for edge in page["graph"]["outgoing"]] == ["crypto_001", "out_3"]
+
+    service.backend.add_edge("pix_001", "small", amount=1)
+    resumed = asyncio.run(service.graph_snapshot("pix_001", limit=10, cursor=page["next_cursor"]))
+    targets = [edge["target"] for edge in resumed["graph"]["outgoing"]]
+    assert targets == ["out_2", "out_1", "out_0", "small"]
+
+    service.backend.add_edge("pix_001", "big", amount=10_000)
+    with pytest.raises(ValidationError) as rejected:
+        asyncio.run(service.graph_snapshot("pix_001", limit=2, cursor=page["next_cursor"]))
+    assert rejected.value.code == "StaleCursor"